@@ -0,0 +1,74 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import Optional
+
+from app.services.global_leaderboard import global_leaderboard_service, Period
+
+router = APIRouter(
+    prefix="/leaderboards",
+    tags=["leaderboards"],
+    responses={
+        404: {"description": "User not on leaderboard"},
+        400: {"description": "Bad request"},
+    },
+)
+
+@router.get("/global",
+    summary="Get the global leaderboard",
+    description="Top users across every quiz, all-time or for the current week or month",
+)
+async def get_global_leaderboard(
+    period: Period = Period.ALL,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+):
+    """
+    Retrieve a page of the global leaderboard, best first.
+
+    - **period**: `all`, `week` or `month`
+    - **limit**: Page size
+    - **cursor**: `next_cursor` from the previous page
+    """
+    try:
+        return await global_leaderboard_service.get_top(period, limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor {cursor}"
+        )
+
+@router.get("/global/count",
+    summary="Count users on the global leaderboard",
+)
+async def count_global_leaderboard(period: Period = Period.ALL):
+    """
+    Number of users with a score on the global leaderboard.
+
+    - **period**: `all`, `week` or `month`
+    """
+    return {"period": period.value, "total": await global_leaderboard_service.count(period)}
+
+@router.get("/global/users/{username}",
+    summary="Get a user's global rank and neighbours",
+    description="A user's global rank plus the users just above and below them",
+    responses={
+        404: {"description": "User not on leaderboard"},
+    }
+)
+async def get_global_leaderboard_around_user(
+    username: str,
+    period: Period = Period.ALL,
+    window: int = Query(5, ge=0, le=50),
+):
+    """
+    Retrieve a user's rank and up to `window` users on each side of them.
+
+    - **username**: The user to centre on
+    - **period**: `all`, `week` or `month`
+    """
+    result = await global_leaderboard_service.get_around(username, period, window)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User {username} has no global score for period {period.value}"
+        )
+    return result
@@ -1,5 +1,18 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+
+from app.core.streaming import iter_json_array, iter_ndjson
+from app.models.quiz import Quiz
+from app.schemas.quiz import QuizImportResult
+from app.services.analytics import analytics_service
+from app.services.leaderboard import leaderboard_service
+from app.services.lifecycle import quiz_lifecycle_service
+from app.services.quiz_import import quiz_import_service
+from app.services.quiz_state import quiz_state_service
+from app.services.ranking import ranking_service, RankMode
+from app.services.routing import node_routing_service
 
 router = APIRouter(
     prefix="/quizzes",
@@ -9,3 +22,274 @@ router = APIRouter(
         400: {"description": "Bad request"},
     },
 )
+
+@router.post("/import",
+    summary="Import a quiz",
+    description="Create a quiz from a streamed bank of questions, as NDJSON or a JSON array",
+    response_model=QuizImportResult,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        422: {"description": "Invalid question"},
+    }
+)
+async def import_quiz(
+    request: Request,
+    title: str = Query(..., min_length=1, max_length=200),
+    description: Optional[str] = None,
+):
+    """
+    Create a DRAFT quiz from a question bank of any size. The body is read and
+    validated as it arrives and written in batches in one transaction, so memory
+    doesn't grow with the upload and an invalid question creates nothing.
+
+    Send one question per line with `Content-Type: application/x-ndjson`, or a JSON
+    array with `Content-Type: application/json`. Each question is
+    `{"title", "description", "image_url", "time_limit", "points", "answers": [{"text", "is_correct"}]}`.
+
+    - **title**: Title of the new quiz
+    - **description**: Description of the new quiz
+    """
+    content_type = request.headers.get("content-type", "")
+    parse = iter_json_array if content_type.startswith("application/json") else iter_ndjson
+    try:
+        return await quiz_import_service.import_quiz(title, description, parse(request.stream()))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+
+@router.get("/{quiz_id}/questions/{question_id}/analytics",
+    summary="Get live analytics for a question",
+    description="Answer distribution, correct rate and response time histogram of a question",
+)
+async def get_question_analytics(quiz_id: str, question_id: str):
+    """
+    Retrieve live analytics for a question, read in O(1) from incremental counters.
+
+    - **quiz_id**: The ID of the quiz
+    - **question_id**: The ID of the question
+    """
+    return await analytics_service.get_question_stats(quiz_id, question_id)
+
+@router.get("/{quiz_id}/node",
+    summary="Find the node serving a quiz",
+    description="Which WebSocket node participants of a quiz should connect to",
+)
+async def get_quiz_node(quiz_id: str):
+    """
+    Look up the node a quiz's participants are routed to, so clients can connect
+    to it directly instead of being redirected.
+
+    - **quiz_id**: The ID of the quiz
+    """
+    return await node_routing_service.describe(quiz_id)
+
+@router.post("/{quiz_id}/start",
+    summary="Start a quiz",
+    description="Open a quiz and pre-load it on every server",
+    responses={
+        404: {"description": "Quiz not found"},
+    }
+)
+async def start_quiz(quiz_id: str):
+    """
+    Mark a quiz as STARTED. Its questions and answer key are loaded into memory on
+    every server and its Redis state is created up front, so joining doesn't have to.
+
+    - **quiz_id**: The ID of the quiz
+    """
+    quiz = await Quiz.get_or_none(id=quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Quiz {quiz_id} not found"
+        )
+    content = await quiz_lifecycle_service.start(quiz)
+    return {"quiz_id": quiz_id, "status": quiz.status, "questions": len(content.question_ids)}
+
+@router.post("/{quiz_id}/finalize",
+    summary="Finalize a quiz",
+    description="End a quiz and add its results to the global leaderboards",
+    responses={
+        404: {"description": "Quiz not found"},
+    }
+)
+async def finalize_quiz(quiz_id: str):
+    """
+    Mark a quiz as ENDED, save its final leaderboard and add each participant's score
+    to the global leaderboards. Finalizing the same quiz again does not count its
+    scores twice. The quiz's live state stays readable for QUIZ_STATE_ENDED_TTL, then
+    expires, and every server drops it from memory.
+
+    - **quiz_id**: The ID of the quiz
+    """
+    quiz = await Quiz.get_or_none(id=quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Quiz {quiz_id} not found"
+        )
+    ended = await quiz_lifecycle_service.end(quiz)
+    return {"quiz_id": quiz_id, "status": quiz.status, **ended}
+
+@router.post("/{quiz_id}/reset",
+    summary="Reset a quiz",
+    description="Start a quiz over with an empty leaderboard and no answers",
+    responses={
+        404: {"description": "Quiz not found"},
+    }
+)
+async def reset_quiz(quiz_id: str):
+    """
+    Start a new epoch of a quiz. Takes the same time however many participants the
+    quiz had: the previous epoch's live state and answer attempts are no longer read
+    and are deleted in the background.
+
+    - **quiz_id**: The ID of the quiz
+    """
+    if not await Quiz.exists(id=quiz_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Quiz {quiz_id} not found"
+        )
+    epoch = await quiz_state_service.reset(quiz_id)
+    # In-memory boards aren't epoch-scoped, so empty this node's copy directly
+    await ranking_service.clear(quiz_id)
+    await leaderboard_service.publish_reset(quiz_id, epoch)
+    return {"quiz_id": quiz_id, "epoch": epoch}
+
+async def _not_modified(request: Request, response: Response, quiz_id: str) -> Optional[Response]:
+    """
+    Tag the response with the board's ETag, or answer 304 if the client has it.
+    The tag is read before the board, so a response is never older than its tag.
+    """
+    etag = await leaderboard_service.get_version_tag(quiz_id)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+@router.get("/{quiz_id}/leaderboard",
+    summary="Get a quiz leaderboard",
+    description="A page of a quiz's live leaderboard, best first, cursor paginated",
+    responses={
+        304: {"description": "Leaderboard unchanged since the ETag in If-None-Match"},
+    }
+)
+async def get_quiz_leaderboard(
+    quiz_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    mode: RankMode = RankMode.COMPETITION,
+):
+    """
+    Retrieve a page of a quiz's live leaderboard in O(log n + limit).
+
+    - **quiz_id**: The ID of the quiz
+    - **limit**: Page size
+    - **cursor**: `next_cursor` from the previous page
+    - **mode**: `competition`, `dense` or `ordinal` ranks
+    """
+    not_modified = await _not_modified(request, response, quiz_id)
+    if not_modified:
+        return not_modified
+    try:
+        return await leaderboard_service.get_page(quiz_id, limit, cursor, mode)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor {cursor}"
+        )
+
+@router.get("/{quiz_id}/leaderboard/count",
+    summary="Count participants on a quiz leaderboard",
+    responses={
+        304: {"description": "Leaderboard unchanged since the ETag in If-None-Match"},
+    }
+)
+async def count_quiz_leaderboard(quiz_id: str, request: Request, response: Response):
+    """
+    Number of participants on a quiz's live leaderboard.
+
+    - **quiz_id**: The ID of the quiz
+    """
+    not_modified = await _not_modified(request, response, quiz_id)
+    if not_modified:
+        return not_modified
+    return {"quiz_id": quiz_id, "total": await ranking_service.count(quiz_id)}
+
+@router.get("/{quiz_id}/leaderboard/users/{username}",
+    summary="Get a participant's rank and neighbours",
+    description="A participant's rank in a quiz plus the participants just above and below them",
+    responses={
+        304: {"description": "Leaderboard unchanged since the ETag in If-None-Match"},
+        404: {"description": "User not on leaderboard"},
+    }
+)
+async def get_quiz_leaderboard_around_user(
+    quiz_id: str,
+    username: str,
+    request: Request,
+    response: Response,
+    window: int = Query(5, ge=0, le=50),
+    mode: RankMode = RankMode.COMPETITION,
+):
+    """
+    Retrieve a participant's rank and up to `window` participants on each side of
+    them, in O(log n + window).
+
+    - **quiz_id**: The ID of the quiz
+    - **username**: The participant to centre on
+    - **mode**: `competition`, `dense` or `ordinal` ranks
+    """
+    not_modified = await _not_modified(request, response, quiz_id)
+    if not_modified:
+        return not_modified
+    result = await leaderboard_service.get_around(quiz_id, username, window, mode)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User {username} is not on the leaderboard of quiz {quiz_id}"
+        )
+    return result
+
+@router.get("/{quiz_id}/leaderboard/stream",
+    summary="Watch a quiz leaderboard",
+    description="Read-only Server-Sent Events stream of a quiz leaderboard for spectators",
+    response_class=StreamingResponse,
+)
+async def stream_leaderboard(quiz_id: str):
+    """
+    Stream the leaderboard of a quiz as Server-Sent Events, without joining it.
+
+    The current leaderboard is sent first, then every update. All viewers on a server
+    share one pre-encoded snapshot, so a viewer costs no Redis or database work.
+
+    - **quiz_id**: The ID of the quiz
+    """
+    async def events():
+        queue = leaderboard_service.add_viewer(quiz_id)
+        try:
+            version, frame = await leaderboard_service.get_snapshot(quiz_id)
+            yield frame.sse("leaderboard_update", version)
+            while True:
+                try:
+                    version, frame = await asyncio.wait_for(
+                        queue.get(), leaderboard_service.VIEWER_KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield frame.sse("leaderboard_update", version)
+        finally:
+            leaderboard_service.remove_viewer(quiz_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
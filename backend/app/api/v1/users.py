@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from app.models.user import User
-from typing import List
+from typing import Optional
+import json
+import uuid
 
-from app.schemas.user import UserBase
+from app.schemas.user import UserCreate, UserPage, UserResponse
+from app.services.user import decode_cursor, user_service
 
 router = APIRouter(
     prefix="/users",
@@ -14,45 +18,78 @@ router = APIRouter(
 )
 
 @router.post("/", 
-    response_model=UserBase,
+    response_model=UserResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Create a new user",
     description="Create a new user with the following information:",
     response_description="The created user"
 )
-async def create_user(user: UserBase):
+async def create_user(user: UserCreate):
     """
     Create a new user with the following information:
 
     - **username**: unique username
-    - **email**: valid email address
-    - **password_hash**: hashed password
     """
-    user_obj = await User.create(**user.dict(exclude_unset=True))
-    return await UserBase.from_tortoise_orm(user_obj)
+    user_obj = await User.create(**user.model_dump(exclude_unset=True))
+    return UserResponse.model_validate(user_obj)
 
 @router.get("/", 
-    response_model=List[UserBase],
+    response_model=UserPage,
     summary="Get all users",
-    description="Retrieve a list of all users in the system"
+    description="Retrieve users in signup order, a page at a time or as one NDJSON stream",
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+    }
 )
-async def get_users():
+async def get_users(
+    limit: int = Query(user_service.DEFAULT_PAGE_SIZE, ge=1, le=user_service.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+):
     """
-    Retrieve all users.
-    
-    Returns a list of all users in the system.
+    Retrieve users in signup order, with keyset pagination on (created_at, id):
+    every page costs the same however deep it is.
+
+    - **limit**: Page size
+    - **cursor**: `next_cursor` from the previous page
+    - **stream**: Return every user after `cursor` as NDJSON, one user per line, instead of a page
     """
-    return await UserBase.from_queryset(User.all())
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid cursor {cursor}"
+            )
+    if not stream:
+        return await user_service.get_page(limit, cursor)
+
+    async def lines():
+        batch = []
+        async for user in user_service.stream(cursor):
+            batch.append(json.dumps({
+                "id": str(user["id"]),
+                "username": user["username"],
+                "created_at": user["created_at"].isoformat(),
+            }))
+            if len(batch) >= user_service.STREAM_PREFETCH:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get("/{user_id}", 
-    response_model=UserBase,
+    response_model=UserResponse,
     summary="Get a specific user",
     description="Retrieve a specific user by their ID",
     responses={
         404: {"description": "User not found"},
     }
 )
-async def get_user(user_id: int):
+async def get_user(user_id: uuid.UUID):
     """
     Retrieve a specific user by their ID.
 
@@ -64,4 +101,4 @@ async def get_user(user_id: int):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User {user_id} not found"
         )
-    return await UserBase.from_tortoise_orm(user) 
\ No newline at end of file
+    return UserResponse.model_validate(user)
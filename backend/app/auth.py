@@ -1,11 +1,10 @@
 from fastapi import WebSocket, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from app.models import User
+from app.services.hot_queries import hot_query_service, UserRecord
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user_ws(websocket: WebSocket) -> User:
+async def get_current_user_ws(websocket: WebSocket) -> UserRecord:
     """
     Simple username-based authentication
     """
@@ -17,8 +16,7 @@ async def get_current_user_ws(websocket: WebSocket) -> User:
             raise HTTPException(status_code=401, detail="Username is required")
         
         # Find or create user by username
-        user, _ = await User.get_or_create(username=username)
-        return user
+        return await hot_query_service.get_or_create_user(username)
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
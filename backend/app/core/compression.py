@@ -0,0 +1,65 @@
+import zlib
+from fastapi import WebSocket
+from app.core.config import settings
+
+# Clients opt in to compressed frames with ?compression=deflate on the websocket URL
+COMPRESSION_QUERY_PARAM = "compression"
+COMPRESSION_DEFLATE = "deflate"
+
+
+def wants_compression(websocket: WebSocket) -> bool:
+    """Check if the client asked for compressed frames when connecting"""
+    if not settings.WS_COMPRESSION_ENABLED:
+        return False
+    return websocket.query_params.get(COMPRESSION_QUERY_PARAM) == COMPRESSION_DEFLATE
+
+
+class EncodedFrame:
+    """
+    A message encoded once for every recipient of a broadcast.
+
+    Payloads at or above WS_COMPRESSION_THRESHOLD bytes are deflated lazily the
+    first time a compression-enabled recipient needs them, so one broadcast costs
+    at most one compression regardless of the number of sockets. The compressed
+    form is raw deflate (no zlib header), which browsers can inflate with
+    DecompressionStream("deflate-raw"), and is sent as a binary frame.
+    """
+
+    __slots__ = ("text", "_data", "_deflated", "_sse", "_level", "_threshold")
+
+    def __init__(self, text: str, level: int = None, threshold: int = None):
+        self.text = text
+        self._data = text.encode("utf-8")
+        self._deflated = None
+        self._sse = None
+        self._level = settings.WS_COMPRESSION_LEVEL if level is None else level
+        self._threshold = settings.WS_COMPRESSION_THRESHOLD if threshold is None else threshold
+
+    @property
+    def compressible(self) -> bool:
+        return len(self._data) >= self._threshold
+
+    @property
+    def size(self) -> int:
+        return len(self._data)
+
+    def deflated(self) -> bytes:
+        """Return the raw-deflate payload, compressing on first use"""
+        if self._deflated is None:
+            compressor = zlib.compressobj(self._level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self._deflated = compressor.compress(self._data) + compressor.flush()
+        return self._deflated
+
+    def sse(self, event: str, event_id=None) -> bytes:
+        """Return the message as a Server-Sent Events record, encoding on first use"""
+        if self._sse is None:
+            header = f"event: {event}\n" + (f"id: {event_id}\n" if event_id is not None else "")
+            self._sse = header.encode("utf-8") + b"data: " + self._data + b"\n\n"
+        return self._sse
+
+    async def send(self, websocket: WebSocket, compressed: bool = False) -> None:
+        """Send the frame as compressed binary if requested and worthwhile, else as text"""
+        if compressed and self.compressible:
+            await websocket.send_bytes(self.deflated())
+        else:
+            await websocket.send_text(self.text)
@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings
 from typing import Optional, List, Dict, Any
 from pathlib import Path
 import os
+import socket
 
 # Get the base directory of the project
 BASE_DIR = Path(__file__).resolve().parent
@@ -22,19 +23,73 @@ class Settings(BaseSettings):
     DB_USER: str = os.getenv("DB_USER", "hauvo")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "hauvo")
     DB_NAME: str = os.getenv("DB_NAME", "real-time-quiz")
+    # Create missing tables on startup; turn off in production, where the schema comes
+    # from the migrations (aerich upgrade) and workers start without touching the database
+    DB_GENERATE_SCHEMAS: bool = os.getenv("DB_GENERATE_SCHEMAS", "true").lower() == "true"
+
+    # Connection pool of each database, per worker process
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+    DB_POOL_MAX_INACTIVE_LIFETIME: float = 300  # seconds an idle connection is kept open
+
+    # Read replicas as comma-separated host:port; ORM reads are routed to them when set.
+    # A replica more than DB_REPLICA_MAX_LAG behind gets no reads, and a table written
+    # by this process is read from the primary for DB_REPLICA_STICKY_WINDOW afterwards.
+    DB_REPLICA_HOSTS: str = os.getenv("DB_REPLICA_HOSTS", "")
+    DB_REPLICA_MAX_LAG: float = float(os.getenv("DB_REPLICA_MAX_LAG", "2"))  # seconds
+    DB_REPLICA_STICKY_WINDOW: float = 5  # seconds
+    DB_REPLICA_CHECK_INTERVAL: float = 5  # seconds
     
     # Redis settings
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     REDIS_PASSWORD: str = os.getenv("REDIS_PASSWORD", "")
+
+    # Live quiz state in Redis expires this long after the first participant joins,
+    # or QUIZ_STATE_ENDED_TTL after the quiz is finalized, whichever comes first
+    QUIZ_STATE_LIVE_TTL: int = 60 * 60 * 6  # 6 hours
+    QUIZ_STATE_ENDED_TTL: int = 60 * 30     # 30 minutes
+
+    # Quiz leaderboard storage: "redis", or "memory" to keep a single worker's boards in
+    # process memory (the rest of the live state still needs Redis)
+    LEADERBOARD_STORAGE: str = os.getenv("LEADERBOARD_STORAGE", "redis")
+
+    # Quiz-affinity routing: participants of a quiz are sent to the one node that owns it
+    QUIZ_ROUTING_ENABLED: bool = os.getenv("QUIZ_ROUTING_ENABLED", "false").lower() == "true"
+    NODE_ID: str = os.getenv("NODE_ID", f"{socket.gethostname()}:{os.getpid()}")
+    NODE_URL: str = os.getenv("NODE_URL", "")  # Base URL clients reach this node on, e.g. ws://quiz-1:8000
+    NODE_HEARTBEAT_INTERVAL: int = 5  # seconds
+    NODE_TTL: int = 15                # Nodes silent for this long leave the ring
+    ROUTING_VIRTUAL_NODES: int = 128  # Ring points per node
+
+    # Resumable sessions: a participant reconnecting within this window keeps its
+    # progress and is sent only the events it missed, from the last EVENT_BUFFER_SIZE
+    SESSION_RESUME_GRACE: int = 60  # seconds
+    EVENT_BUFFER_SIZE: int = 256    # events kept per quiz per process
+
+    # Score events are queued in this many Redis streams and applied to the leaderboards
+    # by aggregators; turn SCORE_AGGREGATOR_ENABLED off on nodes that should only serve
+    SCORING_STREAM_SHARDS: int = 4
+    SCORE_AGGREGATOR_ENABLED: bool = os.getenv("SCORE_AGGREGATOR_ENABLED", "true").lower() == "true"
+
+    # Global leaderboard settings
+    GLOBAL_LEADERBOARD_SHARDS: int = 16  # Sorted sets per global board, see system-design.md
     
     # WebSocket settings
     WS_PING_INTERVAL: int = 20000        # 20 seconds
     WS_PING_TIMEOUT: int = 20000         # 20 seconds
     WS_CLOSE_TIMEOUT: int = 5000         # 5 seconds
     WS_MAX_MESSAGE_SIZE: int = 1048576   # 1MB
-    
+
+    # WebSocket compression settings
+    WS_COMPRESSION_ENABLED: bool = True
+    WS_COMPRESSION_THRESHOLD: int = 1024  # Only compress frames of at least 1KB
+    WS_COMPRESSION_LEVEL: int = 6         # zlib level, 1 (fastest) to 9 (smallest)
+    # Transport-level permessage-deflate compresses every frame once per socket.
+    # Broadcast frames are already compressed once by the app, so it is off by default.
+    WS_PER_MESSAGE_DEFLATE: bool = False
+
     class Config:
         env_file = os.path.join(BASE_DIR, ".env")
         case_sensitive = True
@@ -42,19 +97,43 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # Tortoise ORM Configuration
+def postgres_connection(host: str, port) -> Dict[str, Any]:
+    return {
+        "engine": "tortoise.backends.asyncpg",
+        "credentials": {
+            "host": host,
+            "port": int(port),
+            "user": settings.DB_USER,
+            "password": settings.DB_PASSWORD,
+            "database": settings.DB_NAME,
+            "minsize": settings.DB_POOL_MIN_SIZE,
+            "maxsize": settings.DB_POOL_MAX_SIZE,
+            "max_inactive_connection_lifetime": settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+        },
+    }
+
+# Replica connections are named replica0, replica1, ...; "default" is the primary
+DB_REPLICAS: Dict[str, Dict[str, Any]] = {}
+for address in filter(None, (a.strip() for a in settings.DB_REPLICA_HOSTS.split(","))):
+    host, _, port = address.partition(":")
+    DB_REPLICAS[f"replica{len(DB_REPLICAS)}"] = postgres_connection(host, port or 5432)
+
 TORTOISE_ORM = {
     "connections": {
-        "default": f"postgres://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+        "default": postgres_connection(settings.DB_HOST, settings.DB_PORT),
+        **DB_REPLICAS,
     },
+    "routers": ["app.core.db_router.ReadReplicaRouter"] if DB_REPLICAS else [],
     "apps": {
         "models": {
             "models": [
-                # "aerich.models",
+                "aerich.models",
                 "app.models.user",
                 "app.models.quiz",
                 "app.models.question",
                 "app.models.answer",
                 "app.models.answer_attempt",
+                "app.models.leaderboard",
             ],
             "default_connection": "default",
         }
@@ -96,4 +175,7 @@ WEBSOCKET_CONFIG = {
     "ping_timeout": settings.WS_PING_TIMEOUT,
     "close_timeout": settings.WS_CLOSE_TIMEOUT,
     "max_message_size": settings.WS_MAX_MESSAGE_SIZE,
+    "per_message_deflate": settings.WS_PER_MESSAGE_DEFLATE,
+    "compression_threshold": settings.WS_COMPRESSION_THRESHOLD,
+    "compression_level": settings.WS_COMPRESSION_LEVEL,
 }
\ No newline at end of file
@@ -1,13 +1,14 @@
 from tortoise.contrib.fastapi import register_tortoise
-from app.core.config import TORTOISE_ORM
+from app.core.config import TORTOISE_ORM, settings
 
 def init_db(app):
     """
-    Initialize database connection and create tables
+    Initialize database connection, and create tables if DB_GENERATE_SCHEMAS is set.
+    Without it no connection is opened until the first query.
     """
     register_tortoise(
         app,
         config=TORTOISE_ORM,
-        generate_schemas=True,
+        generate_schemas=settings.DB_GENERATE_SCHEMAS,
         add_exception_handlers=True,
-    ) 
\ No newline at end of file
+    ) 
@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional
+from tortoise import connections
+from tortoise.backends.base.client import BaseTransactionWrapper
+from app.core.config import settings, DB_REPLICAS
+import asyncio
+import time
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it
+# received, so an idle primary doesn't look like lag
+REPLICA_LAG_SQL = """SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END AS lag
+"""
+
+
+class ReplicaMonitor:
+    """
+    Which read replicas may serve reads right now.
+
+    Every DB_REPLICA_CHECK_INTERVAL each replica reports how far behind the primary it
+    is; only those within DB_REPLICA_MAX_LAG are used, round robin. Until a replica
+    has answered a check, and whenever none is within the limit, reads go to the
+    primary.
+
+    Replication lag still makes a write invisible on replicas for a moment, so a table
+    this process wrote to is read from the primary for DB_REPLICA_STICKY_WINDOW
+    afterwards: a user created and then fetched, or attempts saved and then
+    aggregated, are always read back.
+    """
+
+    def __init__(self):
+        self.REPLICAS: List[str] = list(DB_REPLICAS)
+        self.MAX_LAG = settings.DB_REPLICA_MAX_LAG
+        self.STICKY_WINDOW = settings.DB_REPLICA_STICKY_WINDOW
+        self.CHECK_INTERVAL = settings.DB_REPLICA_CHECK_INTERVAL
+        self.lag: Dict[str, Optional[float]] = {name: None for name in self.REPLICAS}
+        self._healthy: List[str] = []
+        self._next = 0
+        # table -> monotonic time it was last written by this process
+        self._written_at: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record_write(self, table: str) -> None:
+        self._written_at[table] = time.monotonic()
+
+    def replica_for(self, table: str) -> Optional[str]:
+        """Replica connection to read a table from, or None for the primary"""
+        if not self._healthy:
+            return None
+        written_at = self._written_at.get(table)
+        if written_at is not None and time.monotonic() - written_at < self.STICKY_WINDOW:
+            return None
+        self._next = (self._next + 1) % len(self._healthy)
+        return self._healthy[self._next]
+
+    async def check(self) -> Dict[str, Optional[float]]:
+        """Measure every replica's lag and keep the ones within MAX_LAG; None if unreachable"""
+        for name in self.REPLICAS:
+            try:
+                rows = await connections.get(name).execute_query_dict(REPLICA_LAG_SQL)
+                self.lag[name] = float(rows[0]["lag"])
+            except Exception as e:
+                print(f"Error checking replica {name}: {str(e)}")
+                self.lag[name] = None
+        self._healthy = [
+            name for name in self.REPLICAS if self.lag[name] is not None and self.lag[name] <= self.MAX_LAG
+        ]
+        return dict(self.lag)
+
+    def start(self):
+        """Start checking replicas in the background, once per process"""
+        if self.REPLICAS and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._healthy = []
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.CHECK_INTERVAL)
+
+
+class ReadReplicaRouter:
+    """
+    Tortoise router sending ORM reads to a healthy replica and writes to the primary.
+
+    Reads inside a transaction stay on it, so they see its own writes. Raw SQL run on
+    in_transaction("default") or connections.get("default") is never routed.
+    """
+
+    def db_for_read(self, model) -> Optional[str]:
+        if isinstance(connections.get("default"), BaseTransactionWrapper):
+            return None
+        return replica_monitor.replica_for(model._meta.db_table)
+
+    def db_for_write(self, model) -> Optional[str]:
+        replica_monitor.record_write(model._meta.db_table)
+        return None
+
+
+# Create a singleton instance
+replica_monitor = ReplicaMonitor()
@@ -0,0 +1,55 @@
+from bisect import bisect, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes.
+
+    Each node is placed on the ring at `replicas` pseudo-random points and a key
+    belongs to the first node point at or after the key's hash. Adding or removing
+    one of n nodes only moves about 1/n of the keys, all of them to or from that
+    node, and every process building a ring from the same nodes agrees on it.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 128):
+        self._replicas = replicas
+        self._points: List[Tuple[int, str]] = []
+        self._nodes: Dict[str, List[int]] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def add(self, node: str) -> None:
+        if node in self._nodes:
+            return
+        hashes = [self._hash(f"{node}#{i}") for i in range(self._replicas)]
+        self._nodes[node] = hashes
+        for point in hashes:
+            insort(self._points, (point, node))
+
+    def remove(self, node: str) -> None:
+        if self._nodes.pop(node, None) is None:
+            return
+        self._points = [point for point in self._points if point[1] != node]
+
+    def get(self, key: str) -> Optional[str]:
+        """Node a key belongs to, or None if the ring is empty"""
+        if not self._points:
+            return None
+        index = bisect(self._points, (self._hash(key), ""))
+        return self._points[index % len(self._points)][1]
@@ -0,0 +1,179 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class RankedIndex:
+    """
+    In-memory order-statistic index of members sorted by key, smallest first.
+
+    Entries live in sorted buckets of at most 2 * load items, with a Fenwick tree
+    over the bucket sizes, so with n members:
+
+    - set / remove        O(log n) to find the bucket, plus a short list shift
+    - rank(member)        O(log n)
+    - count_below(key)    O(log n), i.e. how many members sort before a key
+    - count_through(k, m) O(log n), how many members sort at or before (k, m)
+    - slice(start, stop)  O(log n + k)
+
+    Members with equal keys are ordered by member. Store scores negated (for
+    example (-points, tiebreak)) to read the index best first.
+    """
+
+    def __init__(self, load: int = 512):
+        self._load = load
+        self._lists: List[List[Tuple[Any, Hashable]]] = []
+        self._maxes: List[Tuple[Any, Hashable]] = []
+        self._tree: List[int] = [0]  # 1-based Fenwick tree over bucket sizes
+        self._keys: Dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, member: Hashable) -> bool:
+        return member in self._keys
+
+    def __iter__(self) -> Iterator[Tuple[Hashable, Any]]:
+        for bucket in self._lists:
+            for key, member in bucket:
+                yield member, key
+
+    def key_of(self, member: Hashable) -> Optional[Any]:
+        return self._keys.get(member)
+
+    def clear(self) -> None:
+        self._lists = []
+        self._maxes = []
+        self._tree = [0]
+        self._keys = {}
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] + [len(bucket) for bucket in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, position: int, delta: int) -> None:
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, position: int) -> int:
+        """Number of entries in the buckets before `position`"""
+        total = 0
+        while position > 0:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """Bucket and offset of the entry at `index`"""
+        position = 0
+        step = 1 << (len(self._lists).bit_length() - 1) if self._lists else 0
+        while step:
+            candidate = position + step
+            if candidate < len(self._tree) and self._tree[candidate] <= index:
+                position = candidate
+                index -= self._tree[candidate]
+            step >>= 1
+        return position, index
+
+    def _insert(self, entry: Tuple[Any, Hashable]) -> None:
+        if not self._lists:
+            self._lists.append([entry])
+            self._maxes.append(entry)
+            self._rebuild_tree()
+            return
+
+        position = bisect_left(self._maxes, entry)
+        if position == len(self._maxes):
+            position -= 1
+            self._lists[position].append(entry)
+            self._maxes[position] = entry
+        else:
+            insort(self._lists[position], entry)
+        self._tree_add(position, 1)
+
+        bucket = self._lists[position]
+        if len(bucket) > 2 * self._load:
+            tail = bucket[self._load:]
+            del bucket[self._load:]
+            self._maxes[position] = bucket[-1]
+            self._lists.insert(position + 1, tail)
+            self._maxes.insert(position + 1, tail[-1])
+            self._rebuild_tree()
+
+    def _delete(self, entry: Tuple[Any, Hashable]) -> None:
+        position = bisect_left(self._maxes, entry)
+        bucket = self._lists[position]
+        del bucket[bisect_left(bucket, entry)]
+        if bucket:
+            self._maxes[position] = bucket[-1]
+            self._tree_add(position, -1)
+        else:
+            del self._lists[position]
+            del self._maxes[position]
+            self._rebuild_tree()
+
+    def set(self, member: Hashable, key: Any) -> None:
+        """Insert a member or move it to a new key"""
+        old = self._keys.get(member)
+        if old is not None:
+            if old == key:
+                return
+            self._delete((old, member))
+        self._keys[member] = key
+        self._insert((key, member))
+
+    def remove(self, member: Hashable) -> bool:
+        """Remove a member, returning whether it was there"""
+        key = self._keys.pop(member, None)
+        if key is None:
+            return False
+        self._delete((key, member))
+        return True
+
+    def rank(self, member: Hashable) -> Optional[int]:
+        """0-based position of a member, or None if it is not in the index"""
+        key = self._keys.get(member)
+        if key is None:
+            return None
+        entry = (key, member)
+        position = bisect_left(self._maxes, entry)
+        return self._prefix(position) + bisect_left(self._lists[position], entry)
+
+    def count_below(self, key: Any) -> int:
+        """Number of members whose key sorts strictly before `key`"""
+        probe = (key,)
+        position = bisect_left(self._maxes, probe)
+        if position == len(self._maxes):
+            return len(self._keys)
+        return self._prefix(position) + bisect_left(self._lists[position], probe)
+
+    def count_through(self, key: Any, member: Hashable) -> int:
+        """Number of members sorting before or at the position (key, member)"""
+        entry = (key, member)
+        position = bisect_right(self._maxes, entry)
+        if position == len(self._maxes):
+            return len(self._keys)
+        return self._prefix(position) + bisect_right(self._lists[position], entry)
+
+    def slice(self, start: int = 0, stop: Optional[int] = None) -> List[Tuple[Hashable, Any]]:
+        """(member, key) pairs at positions [start, stop)"""
+        size = len(self._keys)
+        stop = size if stop is None else min(stop, size)
+        if start >= stop:
+            return []
+
+        position, offset = self._locate(start)
+        result = []
+        remaining = stop - start
+        while remaining > 0:
+            bucket = self._lists[position][offset:offset + remaining]
+            result.extend((member, key) for key, member in bucket)
+            remaining -= len(bucket)
+            position += 1
+            offset = 0
+        return result
@@ -0,0 +1,68 @@
+import os
+import time
+from typing import Dict, Optional
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started, from /proc; None where it isn't available"""
+    try:
+        with open("/proc/self/stat") as stat, open("/proc/uptime") as uptime:
+            # Field 22, after the parenthesised command name, is the start time in clock ticks since boot
+            started = int(stat.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+            return float(uptime.read().split()[0]) - started
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupReport:
+    """
+    How long a worker takes from process start to serving.
+
+    Phases are marked in main.py as startup goes (imports done, database and
+    background tasks initialized, ready) and the first WebSocket accept is marked by
+    StartupReportMiddleware. Times are milliseconds since the process started, or
+    since this module was imported where /proc isn't available.
+    """
+
+    def __init__(self):
+        age = process_age()
+        self.STARTED_AT = time.perf_counter() - (age or 0)
+        self.FROM = "process start" if age is not None else "first import"
+        self.phases: Dict[str, float] = {}
+        self.first_websocket_ms: Optional[float] = None
+
+    def mark(self, phase: str) -> float:
+        """Record a phase as reached now; returns its time"""
+        self.phases[phase] = round((time.perf_counter() - self.STARTED_AT) * 1000, 1)
+        return self.phases[phase]
+
+    def websocket_accepted(self) -> None:
+        if self.first_websocket_ms is None:
+            self.first_websocket_ms = self.mark("first websocket accepted")
+            self.log()
+
+    def log(self) -> None:
+        phases = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.phases.items())
+        print(f"Startup (since {self.FROM}): {phases}")
+
+
+class StartupReportMiddleware:
+    """ASGI middleware marking the first accepted WebSocket, then out of the way"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "websocket" or startup_report.first_websocket_ms is not None:
+            return await self.app(scope, receive, send)
+
+        async def send_marking_accept(message):
+            await send(message)
+            if message["type"] == "websocket.accept":
+                startup_report.websocket_accepted()
+
+        await self.app(scope, receive, send_marking_accept)
+
+
+# Create a singleton instance
+startup_report = StartupReport()
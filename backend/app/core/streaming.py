@@ -0,0 +1,97 @@
+import codecs
+import json
+from typing import Any, AsyncIterator
+
+# Largest single record accepted from a stream; anything bigger is rejected rather
+# than buffered, so memory per request stays bounded however large the upload is
+MAX_RECORD_BYTES = 1024 * 1024  # 1MB
+
+_WHITESPACE = " \t\r\n"
+
+
+class StreamFormatError(ValueError):
+    """A streamed body that isn't valid NDJSON or a JSON array"""
+
+    def __init__(self, record: int, message: str):
+        super().__init__(f"Record {record}: {message}")
+        self.record = record
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_record_bytes: int = MAX_RECORD_BYTES) -> AsyncIterator[Any]:
+    """Parse one JSON value per line from a byte stream, holding at most one partial line"""
+    buffer = b""
+    record = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                record += 1
+                if len(line) > max_record_bytes:
+                    raise StreamFormatError(record, f"longer than {max_record_bytes} bytes")
+                yield _loads(line, record)
+        if len(buffer) > max_record_bytes:
+            raise StreamFormatError(record + 1, f"longer than {max_record_bytes} bytes")
+    if buffer.strip():
+        yield _loads(buffer, record + 1)
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes], max_record_bytes: int = MAX_RECORD_BYTES) -> AsyncIterator[Any]:
+    """
+    Parse the items of a top-level JSON array from a byte stream as they arrive,
+    holding at most one partial item.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    record = 0
+    state = "start"  # start -> item <-> comma -> end
+    async for chunk in chunks:
+        buffer += text.decode(chunk)
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if state == "start":
+                if char != "[":
+                    raise StreamFormatError(0, "expected a JSON array")
+                state = "first"
+                position += 1
+            elif state in ("first", "item"):
+                if char == "]" and state == "first":
+                    state = "end"
+                    position += 1
+                    continue
+                try:
+                    value, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # Usually just incomplete: wait for more unless it is already too big
+                    if len(buffer) - position > max_record_bytes:
+                        raise StreamFormatError(record + 1, f"invalid or longer than {max_record_bytes} bytes")
+                    break
+                record += 1
+                yield value
+                state = "comma"
+            elif state == "comma":
+                if char == ",":
+                    state = "item"
+                elif char == "]":
+                    state = "end"
+                else:
+                    raise StreamFormatError(record, "expected ',' or ']' after it")
+                position += 1
+            else:
+                raise StreamFormatError(record, "unexpected data after the array")
+        buffer = buffer[position:]
+    if state != "end":
+        raise StreamFormatError(record + 1, "unexpected end of the array")
+
+
+def _loads(line: bytes, record: int) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise StreamFormatError(record, f"invalid JSON ({e})")
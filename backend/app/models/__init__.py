@@ -1,8 +1,30 @@
-from .user import User, User_Pydantic, UserIn_Pydantic
-from .quiz import Quiz, Quiz_Pydantic, QuizIn_Pydantic
-from .quiz_attempt import QuizAttempt, QuizAttempt_Pydantic, QuizAttemptIn_Pydantic
-from .question import Question, Question_Pydantic, QuestionIn_Pydantic
-from .answer import Answer, Answer_Pydantic, AnswerIn_Pydantic
+from importlib import import_module
+from .user import User
+from .quiz import Quiz
+from .quiz_attempt import QuizAttempt
+from .question import Question
+from .answer import Answer
+
+# Pydantic models are built by their module on first use, see app/models/lazy.py
+_PYDANTIC_MODULES = {
+    "User_Pydantic": ".user",
+    "UserIn_Pydantic": ".user",
+    "Quiz_Pydantic": ".quiz",
+    "QuizIn_Pydantic": ".quiz",
+    "QuizAttempt_Pydantic": ".quiz_attempt",
+    "QuizAttemptIn_Pydantic": ".quiz_attempt",
+    "Question_Pydantic": ".question",
+    "QuestionIn_Pydantic": ".question",
+    "Answer_Pydantic": ".answer",
+    "AnswerIn_Pydantic": ".answer",
+}
+
+
+def __getattr__(name: str):
+    if name not in _PYDANTIC_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_PYDANTIC_MODULES[name], __name__), name)
+
 
 __all__ = [
     "User",
@@ -20,4 +42,4 @@ __all__ = [
     "Answer",
     "Answer_Pydantic",
     "AnswerIn_Pydantic",
-] 
\ No newline at end of file
+]
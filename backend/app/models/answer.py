@@ -1,5 +1,5 @@
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from app.models.lazy import lazy_pydantic_models
 
 class Answer(models.Model):
     id = fields.UUIDField(pk=True)
@@ -16,8 +16,8 @@ class Answer(models.Model):
     def __str__(self):
         return f"{self.question.title} - Option {self.order}"
 
-# Pydantic models for API
-Answer_Pydantic = pydantic_model_creator(Answer, name="Answer")
-AnswerIn_Pydantic = pydantic_model_creator(
-    Answer, name="AnswerIn", exclude_readonly=True
-) 
\ No newline at end of file
+# Pydantic models for API, built on first use
+__getattr__ = lazy_pydantic_models(__name__, Answer, {
+    "Answer_Pydantic": {"name": "Answer"},
+    "AnswerIn_Pydantic": {"name": "AnswerIn", "exclude_readonly": True},
+})
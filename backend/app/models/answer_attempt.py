@@ -1,5 +1,6 @@
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from app.models.lazy import lazy_pydantic_models
+from typing import List, Optional, Sequence
 from enum import Enum
 
 class AnswerStatus(str, Enum):
@@ -8,6 +9,28 @@ class AnswerStatus(str, Enum):
     TIMEOUT = "TIMEOUT"
     NOT_ANSWERED = "NOT_ANSWERED"
 
+def compute_score(is_correct: bool, points: int, time_limit: int, response_time: Optional[int]) -> int:
+    """Score for one attempt: the question's points plus a bonus for answering quickly"""
+    if not is_correct:
+        return 0
+    score = points
+    # Bonus for quick response (if within time limit)
+    if response_time and response_time <= time_limit:
+        score += int((time_limit - response_time) / 5)
+    return score
+
+def compute_scores(
+    is_correct: Sequence[bool],
+    points: Sequence[int],
+    time_limits: Sequence[int],
+    response_times: Sequence[Optional[int]],
+) -> List[int]:
+    """Column-wise compute_score over whole chunks of attempts, used by bulk rescoring"""
+    return [
+        (p + ((t - r) // 5 if r and r <= t else 0)) if c else 0
+        for c, p, t, r in zip(is_correct, points, time_limits, response_times)
+    ]
+
 class AnswerAttempt(models.Model):
     id = fields.UUIDField(pk=True)
     user = fields.ForeignKeyField('models.User', related_name='answer_attempts')
@@ -19,34 +42,31 @@ class AnswerAttempt(models.Model):
     # start_time = fields.DatetimeField()
     end_time = fields.DatetimeField(null=True)
     response_time = fields.IntField(null=True)  # Response time in seconds
+    epoch = fields.IntField(default=0)  # Quiz epoch the attempt was made in
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
         table = "answer_attempts"
-        # Ensure a user can only attempt each question once per quiz
-        unique_together = (("user", "quiz", "question"),)
+        # Ensure a user can only attempt each question once per quiz epoch
+        unique_together = (("user", "quiz", "question", "epoch"),)
+        indexes = (("quiz", "epoch"),)
 
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title} - Question {self.question.order}"
 
     async def calculate_score(self):
         """Calculate the score based on correctness and response time"""
-        if self.status == AnswerStatus.CORRECT:
-            # Base score from question
-            self.score = self.question.points
-            
-            # Bonus for quick response (if within time limit)
-            if self.response_time and self.response_time <= self.question.time_limit:
-                time_bonus = int((self.question.time_limit - self.response_time) / 5)
-                self.score += time_bonus
-        else:
-            self.score = 0
-        
+        self.score = compute_score(
+            self.status == AnswerStatus.CORRECT,
+            self.question.points,
+            self.question.time_limit,
+            self.response_time,
+        )
         await self.save()
 
-# Pydantic models for API
-AnswerAttempt_Pydantic = pydantic_model_creator(AnswerAttempt, name="AnswerAttempt")
-AnswerAttemptIn_Pydantic = pydantic_model_creator(
-    AnswerAttempt, name="AnswerAttemptIn", exclude_readonly=True
-) 
\ No newline at end of file
+# Pydantic models for API, built on first use
+__getattr__ = lazy_pydantic_models(__name__, AnswerAttempt, {
+    "AnswerAttempt_Pydantic": {"name": "AnswerAttempt"},
+    "AnswerAttemptIn_Pydantic": {"name": "AnswerAttemptIn", "exclude_readonly": True},
+})
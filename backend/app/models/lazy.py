@@ -0,0 +1,26 @@
+import sys
+from typing import Any, Callable, Dict, Type
+from tortoise import models
+
+
+def lazy_pydantic_models(module_name: str, model: Type[models.Model], specs: Dict[str, Dict[str, Any]]) -> Callable:
+    """
+    A module __getattr__ building a model's pydantic_model_creator models on first use.
+
+    `specs` maps each attribute name to its pydantic_model_creator arguments. Building
+    them walks every field and creates a pydantic class, so doing it at import slowed
+    every worker's start while nothing on the request path uses them; now it costs
+    nothing until one is imported, and the result is cached on the module.
+    """
+    module = sys.modules[module_name]
+
+    def __getattr__(name: str):
+        kwargs = specs.get(name)
+        if kwargs is None:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        from tortoise.contrib.pydantic import pydantic_model_creator
+        pydantic_model = pydantic_model_creator(model, **kwargs)
+        setattr(module, name, pydantic_model)
+        return pydantic_model
+
+    return __getattr__
@@ -1,5 +1,5 @@
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from app.models.lazy import lazy_pydantic_models
 from datetime import datetime
 
 class Leaderboard(models.Model):
@@ -18,8 +18,8 @@ class Leaderboard(models.Model):
     def __str__(self):
         return f"Leaderboard {self.id} - Quiz: {self.quiz_id} - User: {self.user_id}"
 
-# Create Pydantic models
-Leaderboard_Pydantic = pydantic_model_creator(Leaderboard, name="Leaderboard")
-LeaderboardIn_Pydantic = pydantic_model_creator(
-    Leaderboard, name="LeaderboardIn", exclude_readonly=True
-) 
\ No newline at end of file
+# Pydantic models, built on first use
+__getattr__ = lazy_pydantic_models(__name__, Leaderboard, {
+    "Leaderboard_Pydantic": {"name": "Leaderboard"},
+    "LeaderboardIn_Pydantic": {"name": "LeaderboardIn", "exclude_readonly": True},
+})
@@ -1,5 +1,5 @@
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from app.models.lazy import lazy_pydantic_models
 from app.models.answer import Answer
 
 
@@ -25,8 +25,8 @@ class Question(models.Model):
     def __str__(self):
         return f"{self.quiz.title} - Question {self.order}"
 
-# Pydantic models for API
-Question_Pydantic = pydantic_model_creator(Question, name="Question")
-QuestionIn_Pydantic = pydantic_model_creator(
-    Question, name="QuestionIn", exclude_readonly=True
-) 
\ No newline at end of file
+# Pydantic models for API, built on first use
+__getattr__ = lazy_pydantic_models(__name__, Question, {
+    "Question_Pydantic": {"name": "Question"},
+    "QuestionIn_Pydantic": {"name": "QuestionIn", "exclude_readonly": True},
+})
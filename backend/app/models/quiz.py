@@ -1,6 +1,6 @@
 # models.py
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from app.models.lazy import lazy_pydantic_models
 from enum import Enum
 
 from app.models.question import Question
@@ -15,6 +15,8 @@ class Quiz(models.Model):
     title = fields.CharField(max_length=200)
     description = fields.TextField(null=True)
     status = fields.CharEnumField(QuizStatus, default=QuizStatus.DRAFT)
+    # Bumped on every reset; live Redis state and answer attempts belong to one epoch
+    epoch = fields.IntField(default=0)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
@@ -28,8 +30,8 @@ class Quiz(models.Model):
     def __str__(self):
         return self.title
 
-# Pydantic models for API
-Quiz_Pydantic = pydantic_model_creator(Quiz, name="Quiz")
-QuizIn_Pydantic = pydantic_model_creator(
-    Quiz, name="QuizIn", exclude_readonly=True
-)
+# Pydantic models for API, built on first use
+__getattr__ = lazy_pydantic_models(__name__, Quiz, {
+    "Quiz_Pydantic": {"name": "Quiz"},
+    "QuizIn_Pydantic": {"name": "QuizIn", "exclude_readonly": True, "exclude": ("epoch",)},
+})
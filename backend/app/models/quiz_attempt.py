@@ -1,5 +1,5 @@
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from app.models.lazy import lazy_pydantic_models
 from datetime import datetime
 
 class QuizAttempt(models.Model):
@@ -18,8 +18,8 @@ class QuizAttempt(models.Model):
     def __str__(self):
         return f"Attempt by {self.user_id} for Quiz {self.quiz_id}"
 
-# Create Pydantic models
-QuizAttempt_Pydantic = pydantic_model_creator(QuizAttempt, name="QuizAttempt")
-QuizAttemptIn_Pydantic = pydantic_model_creator(
-    QuizAttempt, name="QuizAttemptIn", exclude_readonly=True
-) 
\ No newline at end of file
+# Pydantic models, built on first use
+__getattr__ = lazy_pydantic_models(__name__, QuizAttempt, {
+    "QuizAttempt_Pydantic": {"name": "QuizAttempt"},
+    "QuizAttemptIn_Pydantic": {"name": "QuizAttemptIn", "exclude_readonly": True},
+})
@@ -1,5 +1,5 @@
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from app.models.lazy import lazy_pydantic_models
 from datetime import datetime
 
 
@@ -11,12 +11,14 @@ class User(models.Model):
 
     class Meta:
         table = "users"
+        # Keyset pagination order for listing users
+        indexes = (("created_at", "id"),)
 
     def __str__(self):
         return self.username
 
-# Create Pydantic models
-User_Pydantic = pydantic_model_creator(User, name="User")
-UserIn_Pydantic = pydantic_model_creator(
-    User, name="UserIn", exclude_readonly=True
-)
+# Pydantic models, built on first use
+__getattr__ = lazy_pydantic_models(__name__, User, {
+    "User_Pydantic": {"name": "User"},
+    "UserIn_Pydantic": {"name": "UserIn", "exclude_readonly": True},
+})
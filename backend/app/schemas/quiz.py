@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+class AnswerImport(BaseModel):
+    text: str = Field(..., min_length=1, max_length=500)
+    is_correct: bool = False
+
+class QuestionImport(BaseModel):
+    title: str = Field(..., min_length=1, max_length=500)
+    description: Optional[str] = None
+    image_url: Optional[str] = Field(None, max_length=500)
+    time_limit: int = Field(30, gt=0)  # seconds
+    points: int = Field(1, ge=0)
+    answers: List[AnswerImport] = Field(..., min_length=2)
+
+    @field_validator("answers")
+    @classmethod
+    def has_correct_answer(cls, answers: List[AnswerImport]) -> List[AnswerImport]:
+        if not any(answer.is_correct for answer in answers):
+            raise ValueError("at least one answer must be correct")
+        return answers
+
+class QuizImportResult(BaseModel):
+    quiz_id: str
+    questions: int
+    answers: int
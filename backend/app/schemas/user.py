@@ -1,32 +1,27 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, UUID4
+from typing import List, Optional
+from datetime import datetime
 
 class UserBase(BaseModel):
     username: str
-    name: str
-
-    def from_tortoise_orm(cls, obj):
-        return cls(
-            username=obj.username,
-            name=obj.name,
-        )
-
-    def from_queryset(cls, queryset):
-        return [cls.from_tortoise_orm(obj) for obj in queryset]
 
 class UserCreate(UserBase):
-    password: str
+    pass
 
-class UserInDB(UserBase):
-    id: int
-    is_active: bool
+class UserResponse(UserBase):
+    id: UUID4
+    created_at: datetime
 
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
 class UserDelete(BaseModel):
     username: str
 
 class UserLogin(BaseModel):
     username: str
     password: str
-
@@ -0,0 +1,89 @@
+"""
+Benchmark the CPU cost of keeping many idle WebSockets alive.
+
+Compares, over the same wall-clock time and with the same ping interval:
+- wheel:      HeartbeatService, one timing wheel ticking for every socket
+- per-socket: one asyncio task per socket sleeping and pinging on its own
+
+Sockets are in-memory fakes that answer every ping, so only the scheduling
+overhead is measured. Intervals are scaled down from WEBSOCKET_CONFIG so a run
+covers several heartbeats.
+
+Usage:
+    python -m app.scripts.bench_heartbeat [--connections 1000 10000 50000] [--duration 10]
+"""
+import argparse
+import asyncio
+import math
+import time
+
+from app.services.heartbeat import HeartbeatService
+
+
+class FakeWebSocket:
+    def __init__(self, service: HeartbeatService = None):
+        self.service = service
+        self.pings = 0
+
+    async def send_text(self, data: str):
+        self.pings += 1
+        if self.service:
+            # Answer the ping straight away
+            self.service.touch(self)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def bench_wheel(connections: int, interval: float, duration: float):
+    service = HeartbeatService()
+    service.HEARTBEAT_INTERVAL = interval
+    service.HEARTBEAT_TIMEOUT = interval / 2
+    service.TICK = interval / 20
+    service._slots = math.ceil(interval / service.TICK) + 2
+    service._wheel = [set() for _ in range(service._slots)]
+
+    sockets = [FakeWebSocket(service) for _ in range(connections)]
+    start = time.process_time()
+    for websocket in sockets:
+        service.register(websocket)
+    await asyncio.sleep(duration)
+    cpu = time.process_time() - start
+    await service.stop()
+    return sum(websocket.pings for websocket in sockets), cpu, service.reaped
+
+
+async def bench_per_socket(connections: int, interval: float, duration: float):
+    async def keep_alive(websocket: FakeWebSocket):
+        while True:
+            await asyncio.sleep(interval)
+            await websocket.send_text('{"type": "ping"}')
+
+    sockets = [FakeWebSocket() for _ in range(connections)]
+    start = time.process_time()
+    tasks = [asyncio.create_task(keep_alive(websocket)) for websocket in sockets]
+    await asyncio.sleep(duration)
+    cpu = time.process_time() - start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return sum(websocket.pings for websocket in sockets), cpu, 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds of silence before a ping")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    args = parser.parse_args()
+
+    print(f"{'connections':>12} {'mode':>10} {'pings':>10} {'reaped':>7} {'cpu ms':>10} {'cpu %':>7}")
+    for connections in args.connections:
+        for mode, bench in (("wheel", bench_wheel), ("per-socket", bench_per_socket)):
+            pings, cpu, reaped = asyncio.run(bench(connections, args.interval, args.duration))
+            print(f"{connections:>12} {mode:>10} {pings:>10,} {reaped:>7} {cpu * 1000:>10.1f} "
+                  f"{cpu / args.duration * 100:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark the hot-path reads: ORM calls against HotQueryService.
+
+For each query on the join and answer paths, times the ORM call it replaces and
+the raw-SQL fast path on the same data, after checking that both return the same
+thing:
+- quiz:     Quiz.get_or_none                    vs get_quiz
+- content:  Question + Answer values_list       vs get_quiz_content (one round trip)
+- question: Question.get_or_none + Answer.filter vs get_question (one round trip)
+- answer:   Answer.get_or_none                  vs is_correct
+- user:     User.get_or_create (existing)       vs get_or_create_user
+
+A quiz with --questions questions is created for the run and deleted afterwards.
+Runs against the configured database, or any Tortoise URL with --db-url
+(sqlite://:memory: creates its own schema):
+    python -m app.scripts.bench_hot_queries [--iterations 2000] [--questions 20]
+"""
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+from tortoise import Tortoise
+from app.core.config import TORTOISE_ORM
+from app.models.quiz import Quiz
+from app.models.question import Question
+from app.models.answer import Answer
+from app.models.user import User
+from app.services.hot_queries import hot_query_service
+
+
+async def orm_content(quiz_id):
+    questions = await Question.filter(quiz_id=quiz_id).order_by("order").values_list("id", "title", "time_limit")
+    answers = await Answer.filter(question__quiz_id=quiz_id).order_by("order").values_list(
+        "id", "question_id", "text", "is_correct"
+    )
+    return questions, answers
+
+
+async def orm_question(question_id):
+    question = await Question.get_or_none(id=question_id)
+    return question, await Answer.filter(question_id=question.id)
+
+
+async def timed(run, iterations: int) -> float:
+    """Mean microseconds per call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await run()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int, questions: int, db_url: Optional[str]):
+    if db_url:
+        await Tortoise.init(db_url=db_url, modules={"models": TORTOISE_ORM["apps"]["models"]["models"]})
+        await Tortoise.generate_schemas(safe=True)
+    else:
+        await Tortoise.init(config=TORTOISE_ORM)
+    quiz = await Quiz.create(title="Benchmark (hot queries)")
+    user = await User.create(username=f"bench-{quiz.id.hex[:12]}")
+    try:
+        for order in range(1, questions + 1):
+            question = await Question.create(quiz=quiz, title=f"Question {order}", order=order)
+            for i in range(4):
+                await Answer.create(question=question, text=f"Answer {i}", is_correct=i == 0, order=i + 1)
+        question = await Question.filter(quiz_id=quiz.id).order_by("order").first()
+        answer = await Answer.filter(question_id=question.id, is_correct=True).first()
+        quiz_id, question_id, answer_id = str(quiz.id), str(question.id), str(answer.id)
+
+        # Same answers from both paths before timing anything
+        content = await hot_query_service.get_quiz_content(quiz_id)
+        orm_questions, orm_answers = await orm_content(quiz_id)
+        assert [q.id for q in content.questions] == [str(q[0]) for q in orm_questions]
+        assert sum(len(q.answers) for q in content.questions) == len(orm_answers)
+        fast_question = await hot_query_service.get_question(question_id)
+        assert [a.id for a in fast_question.answers] == [str(a.id) for a in (await orm_question(question_id))[1]]
+        assert await hot_query_service.is_correct(question_id, answer_id)
+        assert (await hot_query_service.get_or_create_user(user.username)).id == str(user.id)
+
+        cases = [
+            ("quiz", lambda: Quiz.get_or_none(id=quiz_id), lambda: hot_query_service.get_quiz(quiz_id)),
+            ("content", lambda: orm_content(quiz_id), lambda: hot_query_service.get_quiz_content(quiz_id)),
+            ("question", lambda: orm_question(question_id), lambda: hot_query_service.get_question(question_id)),
+            ("answer", lambda: Answer.get_or_none(id=answer_id, question_id=question_id),
+             lambda: hot_query_service.is_correct(question_id, answer_id)),
+            ("user", lambda: User.get_or_create(username=user.username),
+             lambda: hot_query_service.get_or_create_user(user.username)),
+        ]
+        print(f"{iterations} calls each, quiz of {questions} questions x 4 answers (us per call)")
+        print(f"{'query':>9} {'orm':>9} {'fast':>9} {'speedup':>8}")
+        for name, orm, fast in cases:
+            # Warm statement caches and pools first
+            await orm()
+            await fast()
+            orm_us = await timed(orm, iterations)
+            fast_us = await timed(fast, iterations)
+            print(f"{name:>9} {orm_us:>9.0f} {fast_us:>9.0f} {orm_us / fast_us:>7.1f}x")
+    finally:
+        question_ids = await Question.filter(quiz_id=quiz.id).values_list("id", flat=True)
+        await Answer.filter(question_id__in=question_ids).delete()
+        await Question.filter(quiz_id=quiz.id).delete()
+        await quiz.delete()
+        await user.delete()
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=20, help="questions in the benchmark quiz")
+    parser.add_argument("--db-url", help="Tortoise database URL instead of the configured one")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.questions, args.db_url))
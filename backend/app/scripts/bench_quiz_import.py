@@ -0,0 +1,124 @@
+"""
+Benchmark importing a large question bank.
+
+Compares, for the same generated bank:
+- streamed: QuizImportService fed NDJSON chunk by chunk, as POST /quizzes/import is
+- per-row:  one Question.create and one Answer.create per row, as mock_data.py does
+
+The bank is generated lazily, so the peak memory reported with --memory (tracemalloc)
+is what the import itself holds. Imported quizzes are deleted afterwards.
+
+Runs against the configured database, or any Tortoise URL with --db-url
+(sqlite://:memory: creates its own schema):
+    python -m app.scripts.bench_quiz_import [--questions 10000] [--answers 4] [--per-row] [--memory]
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import AsyncIterator, Optional
+
+from tortoise import Tortoise
+from app.core.config import TORTOISE_ORM
+from app.core.streaming import iter_ndjson
+from app.models.quiz import Quiz
+from app.models.question import Question
+from app.models.answer import Answer
+from app.services.quiz_import import quiz_import_service
+
+CHUNK_SIZE = 64 * 1024
+
+
+def question(number: int, answers: int) -> dict:
+    return {
+        "title": f"Benchmark question {number}",
+        "description": "Generated by bench_quiz_import",
+        "time_limit": 30,
+        "points": 1,
+        "answers": [{"text": f"Answer {i}", "is_correct": i == 0} for i in range(answers)],
+    }
+
+
+async def ndjson_chunks(questions: int, answers: int) -> AsyncIterator[bytes]:
+    """The bank as an upload would arrive: NDJSON in fixed-size chunks"""
+    pending = bytearray()
+    for number in range(1, questions + 1):
+        pending += json.dumps(question(number, answers)).encode() + b"\n"
+        while len(pending) >= CHUNK_SIZE:
+            yield bytes(pending[:CHUNK_SIZE])
+            del pending[:CHUNK_SIZE]
+    if pending:
+        yield bytes(pending)
+
+
+async def import_streamed(questions: int, answers: int) -> str:
+    result = await quiz_import_service.import_quiz(
+        "Benchmark (streamed)", None, iter_ndjson(ndjson_chunks(questions, answers))
+    )
+    return result["quiz_id"]
+
+
+async def import_per_row(questions: int, answers: int) -> str:
+    quiz = await Quiz.create(title="Benchmark (per-row)")
+    for number in range(1, questions + 1):
+        data = question(number, answers)
+        row = await Question.create(
+            quiz=quiz, title=data["title"], description=data["description"],
+            order=number, time_limit=data["time_limit"], points=data["points"],
+        )
+        for order, answer in enumerate(data["answers"], 1):
+            await Answer.create(question=row, text=answer["text"], is_correct=answer["is_correct"], order=order)
+    return str(quiz.id)
+
+
+async def measure(name: str, run, questions: int, answers: int, trace_memory: bool):
+    started = time.perf_counter()
+    quiz_id = await run(questions, answers)
+    elapsed = time.perf_counter() - started
+    stored = await Question.filter(quiz_id=quiz_id).count()
+    await delete_quiz(quiz_id)
+    line = f"{name:>9}: {stored} questions in {elapsed:.2f}s ({stored / elapsed:.0f}/s)"
+
+    if trace_memory:
+        # Separate run: tracing allocations slows the import down several times
+        tracemalloc.start()
+        quiz_id = await run(questions, answers)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await delete_quiz(quiz_id)
+        line += f", peak {peak / 1024 / 1024:.1f} MB"
+    print(line)
+
+
+async def delete_quiz(quiz_id: str):
+    question_ids = await Question.filter(quiz_id=quiz_id).values_list("id", flat=True)
+    await Answer.filter(question_id__in=question_ids).delete()
+    await Question.filter(quiz_id=quiz_id).delete()
+    await Quiz.filter(id=quiz_id).delete()
+
+
+async def main(questions: int, answers: int, per_row: bool, trace_memory: bool, db_url: Optional[str]):
+    if db_url:
+        await Tortoise.init(db_url=db_url, modules={"models": TORTOISE_ORM["apps"]["models"]["models"]})
+        await Tortoise.generate_schemas(safe=True)
+    else:
+        await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        print(f"Importing {questions} questions with {answers} answers each")
+        await measure("streamed", import_streamed, questions, answers, trace_memory)
+        if per_row:
+            await measure("per-row", import_per_row, questions, answers, trace_memory)
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--answers", type=int, default=4, help="answers per question")
+    parser.add_argument("--per-row", action="store_true", help="also time the per-row baseline")
+    parser.add_argument("--memory", action="store_true", help="also report peak memory, in a second traced run")
+    parser.add_argument("--db-url", help="Tortoise database URL instead of the configured one")
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.answers, args.per_row, args.memory, args.db_url))
@@ -0,0 +1,86 @@
+"""
+Measure how fast a worker starts serving: time to the first accepted WebSocket.
+
+Each run starts `uvicorn main:app` on a free port as a new process and connects to
+the leaderboard watch socket until the handshake succeeds. The time from spawning
+the process to that accept is what a client waits for during a scale-out or a
+rolling deploy. The server's own startup report (imports, database, ready, first
+websocket accepted) is printed alongside.
+
+Production startup (DB_GENERATE_SCHEMAS=false) is measured by default;
+--generate-schemas measures the development startup, which needs the database.
+
+Usage:
+    python -m app.scripts.bench_startup [--runs 5] [--generate-schemas]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import websockets
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def time_to_first_websocket(generate_schemas: bool, timeout: float) -> float:
+    """Milliseconds from spawning a server to its first accepted WebSocket"""
+    port = free_port()
+    env = dict(os.environ, DB_GENERATE_SCHEMAS=str(generate_schemas).lower(), PYTHONUNBUFFERED="1")
+    started = time.perf_counter()
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+        cwd=BACKEND_DIR, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+    )
+    url = f"ws://127.0.0.1:{port}/ws/quiz/{uuid.uuid4()}/watch"
+    try:
+        while True:
+            if server.returncode is not None:
+                raise RuntimeError((await server.stdout.read()).decode())
+            try:
+                async with websockets.connect(url, open_timeout=timeout):
+                    elapsed = (time.perf_counter() - started) * 1000
+                break
+            except OSError:
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"no WebSocket accepted within {timeout}s")
+                await asyncio.sleep(0.005)
+        # Give the server a moment to print its report
+        await asyncio.sleep(0.2)
+        return elapsed
+    finally:
+        server.terminate()
+        output, _ = await server.communicate()
+        reports = [line for line in output.decode().splitlines() if line.startswith("Startup")]
+        if reports:
+            print(f"    {reports[-1]}")
+
+
+async def main(runs: int, generate_schemas: bool, timeout: float):
+    mode = "development (generate schemas)" if generate_schemas else "production"
+    print(f"{mode} startup, {runs} runs")
+    results = []
+    for run in range(runs):
+        results.append(await time_to_first_websocket(generate_schemas, timeout))
+        print(f"  run {run + 1}: first WebSocket accepted after {results[-1]:.0f} ms")
+    print(f"min {min(results):.0f} ms, median {statistics.median(results):.0f} ms, max {max(results):.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--generate-schemas", action="store_true", help="create tables on startup, as in development")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for each server")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.generate_schemas, args.timeout))
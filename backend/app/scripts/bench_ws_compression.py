@@ -0,0 +1,80 @@
+"""
+Benchmark bytes on the wire and CPU cost of one leaderboard broadcast.
+
+Compares three ways of sending the same leaderboard frame to every participant:
+- plain:      uncompressed text frames
+- per-socket: permessage-deflate style, one compressor per socket
+- once:       EncodedFrame, compressed once and shared by every socket
+
+Usage:
+    python -m app.scripts.bench_ws_compression [--participants 50 500 5000] [--level 6]
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+
+from app.core.compression import EncodedFrame
+
+
+def build_leaderboard_message(participants: int) -> str:
+    rng = random.Random(participants)
+    leaderboard = [
+        {"username": f"user{i}", "score": rng.randint(0, 50)}
+        for i in range(participants)
+    ]
+    leaderboard.sort(key=lambda x: x["score"], reverse=True)
+    for i, entry in enumerate(leaderboard):
+        entry["rank"] = i + 1
+    return json.dumps({"type": "leaderboard_update", "data": leaderboard})
+
+
+def bench_plain(message: str, sockets: int):
+    start = time.process_time()
+    wire = 0
+    for _ in range(sockets):
+        wire += len(message.encode("utf-8"))
+    return wire, time.process_time() - start
+
+
+def bench_per_socket(message: str, sockets: int, level: int):
+    start = time.process_time()
+    data = message.encode("utf-8")
+    wire = 0
+    for _ in range(sockets):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        wire += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))
+    return wire, time.process_time() - start
+
+
+def bench_once(message: str, sockets: int, level: int):
+    start = time.process_time()
+    frame = EncodedFrame(message, level=level, threshold=0)
+    wire = 0
+    for _ in range(sockets):
+        wire += len(frame.deflated())
+    return wire, time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--level", type=int, default=6)
+    args = parser.parse_args()
+
+    print(f"{'participants':>12} {'frame':>10} {'mode':>10} {'wire bytes':>14} {'cpu ms':>10}")
+    for participants in args.participants:
+        message = build_leaderboard_message(participants)
+        frame_size = len(message.encode("utf-8"))
+        results = [
+            ("plain", bench_plain(message, participants)),
+            ("per-socket", bench_per_socket(message, participants, args.level)),
+            ("once", bench_once(message, participants, args.level)),
+        ]
+        for mode, (wire, cpu) in results:
+            print(f"{participants:>12} {frame_size:>10} {mode:>10} {wire:>14,} {cpu * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
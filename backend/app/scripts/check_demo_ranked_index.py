@@ -0,0 +1,45 @@
+"""
+Check that naive-demo's copy of RankedIndex still matches app/core/ranked_index.py.
+
+The demo is a standalone project and keeps its own copy, so it can be copied and run
+without the backend. Everything below the copy's leading comment header must be
+identical to the backend file; run this after changing either:
+    python -m app.scripts.check_demo_ranked_index [--demo-dir ../naive-demo]
+
+Exits with status 1 and prints a diff if they differ.
+"""
+import argparse
+import difflib
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+SOURCE = BACKEND_DIR / "app" / "core" / "ranked_index.py"
+
+
+def without_header(lines: list) -> list:
+    """Lines after the leading block of comments"""
+    start = 0
+    while start < len(lines) and lines[start].startswith("#"):
+        start += 1
+    return lines[start:]
+
+
+def main(demo_dir: Path) -> int:
+    copy = demo_dir / "ranked_index.py"
+    expected = SOURCE.read_text().splitlines(keepends=True)
+    actual = without_header(copy.read_text().splitlines(keepends=True))
+    diff = list(difflib.unified_diff(expected, actual, str(SOURCE), str(copy)))
+    if diff:
+        sys.stdout.writelines(diff)
+        print(f"\n{copy} differs from {SOURCE}")
+        return 1
+    print(f"{copy} matches {SOURCE}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--demo-dir", type=Path, default=BACKEND_DIR.parent / "naive-demo")
+    args = parser.parse_args()
+    sys.exit(main(args.demo_dir))
@@ -0,0 +1,270 @@
+"""
+Generate a synthetic dataset at production scale for benchmarks.
+
+Creates users, ENDED quizzes with their questions and answers, and the answer
+history of a sample of users in every quiz: one AnswerAttempt per participant and
+question, correct, wrong or unanswered, scored with compute_score. The last
+--live-quizzes quizzes are STARTED instead and their live Redis state is seeded
+from those attempts (question list, deadline and leaderboard), as if they were
+mid-game.
+
+The same --seed always produces the same ids, names, answers and timestamps.
+Rows are generated lazily and written --batch-size at a time, with COPY on
+Postgres and bulk INSERTs elsewhere, so memory stays flat at any size:
+    python -m app.scripts.generate_dataset --users 1000000 --quizzes 1000 \\
+        --participants 500 --live-quizzes 10 [--seed 42] [--db-url sqlite://:memory:]
+
+Expects an empty database (ids are deterministic and would collide otherwise).
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from tortoise import Tortoise, connections
+from tortoise.models import Model
+from app.core.config import TORTOISE_ORM
+from app.models.user import User
+from app.models.quiz import Quiz, QuizStatus
+from app.models.question import Question
+from app.models.answer import Answer
+from app.models.answer_attempt import AnswerAttempt, AnswerStatus, compute_score
+from app.services.lifecycle import quiz_lifecycle_service
+from app.services.ranking import ranking_service
+
+# Generated history spans the DATASET_DAYS days from DATASET_START
+DATASET_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DATASET_DAYS = 365
+
+USER_COLUMNS = ("id", "username", "created_at", "updated_at")
+QUIZ_COLUMNS = ("id", "title", "description", "status", "epoch", "created_at", "updated_at")
+QUESTION_COLUMNS = (
+    "id", "quiz_id", "title", "description", "image_url", "order", "time_limit", "points",
+    "created_at", "updated_at",
+)
+ANSWER_COLUMNS = ("id", "question_id", "text", "is_correct", "order", "created_at", "updated_at")
+ATTEMPT_COLUMNS = (
+    "id", "user_id", "quiz_id", "question_id", "selected_answer_id", "status", "score",
+    "end_time", "response_time", "epoch", "created_at", "updated_at",
+)
+
+
+class Dataset:
+    """Deterministic rows for one seed; every method yields them lazily"""
+
+    def __init__(self, args):
+        self.args = args
+        self.seed = args.seed
+
+    def _uuid(self, kind: str, *parts) -> uuid.UUID:
+        """Stable id for the n-th row of a kind, without keeping earlier ids around"""
+        digest = hashlib.blake2b(f"{self.seed}:{kind}:{':'.join(map(str, parts))}".encode(), digest_size=16)
+        return uuid.UUID(bytes=digest.digest(), version=4)
+
+    def _rng(self, *parts) -> random.Random:
+        return random.Random(f"{self.seed}:{':'.join(map(str, parts))}")
+
+    def user_id(self, number: int) -> uuid.UUID:
+        return self._uuid("user", number)
+
+    @staticmethod
+    def username(number: int) -> str:
+        return f"user{number:09d}"
+
+    def users(self) -> Iterator[tuple]:
+        rng = self._rng("users")
+        span = DATASET_DAYS * 86400
+        # Signups spread over the year, in order, so created_at follows the numbering
+        for number in range(self.args.users):
+            created_at = DATASET_START + timedelta(seconds=number * span / self.args.users + rng.random())
+            yield self.user_id(number), self.username(number), created_at, created_at
+
+    def quiz_started_at(self, quiz: int) -> datetime:
+        return DATASET_START + timedelta(seconds=quiz * DATASET_DAYS * 86400 / self.args.quizzes + 3600)
+
+    def is_live(self, quiz: int) -> bool:
+        return quiz >= self.args.quizzes - self.args.live_quizzes
+
+    def quizzes(self) -> Iterator[tuple]:
+        for quiz in range(self.args.quizzes):
+            created_at = self.quiz_started_at(quiz) - timedelta(hours=1)
+            status = QuizStatus.STARTED if self.is_live(quiz) else QuizStatus.ENDED
+            yield (
+                self._uuid("quiz", quiz), f"Synthetic quiz {quiz}", "Generated by generate_dataset",
+                status.value, 0, created_at, created_at,
+            )
+
+    def content(self, quiz: int) -> List[Tuple[tuple, List[tuple]]]:
+        """(question row, answer rows) for every question of a quiz"""
+        rng = self._rng("content", quiz)
+        created_at = self.quiz_started_at(quiz) - timedelta(hours=1)
+        content = []
+        for order in range(1, self.args.questions + 1):
+            question_id = self._uuid("question", quiz, order)
+            correct = rng.randrange(self.args.answers)
+            question = (
+                question_id, self._uuid("quiz", quiz), f"Synthetic question {quiz}.{order}", None, None,
+                order, rng.choice((10, 20, 30)), rng.choice((1, 1, 2, 3)), created_at, created_at,
+            )
+            answers = [
+                (self._uuid("answer", quiz, order, i), question_id, f"Option {i + 1}", i == correct, i + 1,
+                 created_at, created_at)
+                for i in range(self.args.answers)
+            ]
+            content.append((question, answers))
+        return content
+
+    def participants(self, quiz: int) -> List[int]:
+        return self._rng("participants", quiz).sample(range(self.args.users), min(self.args.participants, self.args.users))
+
+    def attempts(self, quiz: int, content: List[Tuple[tuple, List[tuple]]], totals: Optional[Dict[int, list]] = None) -> Iterator[tuple]:
+        """
+        Every participant's attempt at every question. Skill varies per participant,
+        so scores spread out the way a real leaderboard's do. Per-participant
+        (points, elapsed_ms) are accumulated into totals when given.
+        """
+        rng = self._rng("attempts", quiz)
+        quiz_id = self._uuid("quiz", quiz)
+        started_at = self.quiz_started_at(quiz)
+        for number in self.participants(quiz):
+            user_id = self.user_id(number)
+            skill = rng.betavariate(4, 2)
+            shown_at = started_at
+            for question, answers in content:
+                question_id, order, time_limit, points = question[0], question[5], question[6], question[7]
+                roll = rng.random()
+                if roll < self.args.answer_rate:
+                    response_time = rng.randint(1, time_limit)
+                    if rng.random() < skill:
+                        answer = next(a for a in answers if a[3])
+                    else:
+                        answer = rng.choice([a for a in answers if not a[3]] or answers)
+                    status = AnswerStatus.CORRECT if answer[3] else AnswerStatus.INCORRECT
+                    selected = answer[0]
+                    score = compute_score(answer[3], points, time_limit, response_time)
+                    end_time = shown_at + timedelta(seconds=response_time)
+                else:
+                    response_time = None
+                    status = AnswerStatus.TIMEOUT if roll < (1 + self.args.answer_rate) / 2 else AnswerStatus.NOT_ANSWERED
+                    selected = None
+                    score = 0
+                    end_time = shown_at + timedelta(seconds=time_limit) if status == AnswerStatus.TIMEOUT else None
+                created_at = end_time or shown_at
+                if totals is not None and score:
+                    total = totals.setdefault(number, [0, 0])
+                    total[0] += score
+                    total[1] = int((created_at - started_at).total_seconds() * 1000)
+                yield (
+                    self._uuid("attempt", quiz, number, order), user_id, quiz_id, question_id, selected,
+                    status.value, score, end_time, response_time, 0, created_at, created_at,
+                )
+                shown_at += timedelta(seconds=time_limit)
+
+
+class Writer:
+    """
+    Buffer rows per table and write them batch_size at a time, with COPY on Postgres
+    (asyncpg) and bulk_create on anything else
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.connection = connections.get("default")
+        self.copy = self.connection.capabilities.dialect == "postgres"
+        self.pending: Dict[type[Model], Tuple[Sequence[str], List[tuple]]] = {}
+        self.written: Dict[str, int] = {}
+
+    async def add(self, model: type[Model], columns: Sequence[str], rows: Iterable[tuple]) -> None:
+        _, batch = self.pending.setdefault(model, (columns, []))
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                # Everything, not just this table: its rows may reference rows still pending
+                await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered, parents first so foreign keys resolve"""
+        for model, (columns, batch) in self.pending.items():
+            if batch:
+                await self._write(model, columns, batch)
+                batch.clear()
+
+    async def _write(self, model: type[Model], columns: Sequence[str], batch: List[tuple]) -> None:
+        table = model._meta.db_table
+        if self.copy:
+            async with self.connection.acquire_connection() as raw:
+                await raw.copy_records_to_table(table, records=batch, columns=list(columns))
+        else:
+            await model.bulk_create([model(**dict(zip(columns, row))) for row in batch])
+        self.written[table] = self.written.get(table, 0) + len(batch)
+
+
+async def seed_live_quiz(dataset: Dataset, quiz: int, totals: Dict[int, list]) -> int:
+    """Prepare a STARTED quiz's Redis state and load its leaderboard from the attempts"""
+    quiz_id = str(dataset._uuid("quiz", quiz))
+    await quiz_lifecycle_service.warm(quiz_id)
+    entries = ((dataset.username(number), points, elapsed_ms) for number, (points, elapsed_ms) in totals.items())
+    return await ranking_service.replace_board(quiz_id, entries, int(time.time() * 1000))
+
+
+async def main(args):
+    if args.db_url:
+        await Tortoise.init(db_url=args.db_url, modules={"models": TORTOISE_ORM["apps"]["models"]["models"]})
+        await Tortoise.generate_schemas(safe=True)
+    else:
+        await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        dataset = Dataset(args)
+        writer = Writer(args.batch_size)
+        started = time.perf_counter()
+
+        await writer.add(User, USER_COLUMNS, dataset.users())
+        await writer.add(Quiz, QUIZ_COLUMNS, dataset.quizzes())
+        await writer.flush()
+        print(f"{args.users} users and {args.quizzes} quizzes in {time.perf_counter() - started:.1f}s")
+
+        live: Dict[int, Dict[int, list]] = {}
+        for quiz in range(args.quizzes):
+            content = dataset.content(quiz)
+            await writer.add(Question, QUESTION_COLUMNS, (question for question, _ in content))
+            await writer.add(Answer, ANSWER_COLUMNS, (answer for _, answers in content for answer in answers))
+            totals = live.setdefault(quiz, {}) if dataset.is_live(quiz) and args.seed_redis else None
+            await writer.add(AnswerAttempt, ATTEMPT_COLUMNS, dataset.attempts(quiz, content, totals))
+            if (quiz + 1) % 100 == 0:
+                print(f"{quiz + 1} quizzes, {writer.written.get('answer_attempts', 0)} attempts "
+                      f"in {time.perf_counter() - started:.1f}s")
+        await writer.flush()
+
+        # Loaded the way a node loads a started quiz, so its content must be written first
+        for quiz, totals in live.items():
+            participants = await seed_live_quiz(dataset, quiz, totals)
+            print(f"Seeded live state of quiz {dataset._uuid('quiz', quiz)} with {participants} participants")
+
+        elapsed = time.perf_counter() - started
+        rows = sum(writer.written.values())
+        print(f"Wrote {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f}/s): "
+              + ", ".join(f"{count} {table}" for table, count in writer.written.items()))
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--quizzes", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10, help="per quiz")
+    parser.add_argument("--answers", type=int, default=4, help="per question")
+    parser.add_argument("--participants", type=int, default=500, help="users taking each quiz")
+    parser.add_argument("--answer-rate", type=float, default=0.9, help="share of questions answered in time")
+    parser.add_argument("--live-quizzes", type=int, default=10, help="quizzes left STARTED, last ones first")
+    parser.add_argument("--no-seed-redis", dest="seed_redis", action="store_false",
+                        help="don't create live Redis state for the STARTED quizzes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50000, help="rows per COPY or INSERT")
+    parser.add_argument("--db-url", help="Tortoise database URL instead of the configured one")
+    args = parser.parse_args()
+    asyncio.run(main(args))
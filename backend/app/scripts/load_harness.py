@@ -0,0 +1,181 @@
+"""
+HTTP load harness: keep-alive GETs against a running server, or a sweep over worker
+counts of serve.py.
+
+Clients run in their own processes (--client-procs), each holding --connections
+keep-alive connections that send one request after another for --duration seconds.
+Requests are written by hand on raw asyncio streams so the client stays cheap per
+request and the server is the bottleneck.
+
+Usage:
+    python -m app.scripts.load_harness --url http://127.0.0.1:8000/ [--duration 10]
+    python -m app.scripts.load_harness --sweep 1 2 4 8 [--path /] [--port 8100]
+
+--sweep starts `serve.py --workers N` for each N, waits for it to answer, runs the
+load, then stops it with SIGTERM. Run the clients on other cores or another machine
+when measuring: on a box with fewer cores than workers plus client processes, the
+numbers only show contention.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """Read one response and return its status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def connection(host: str, port: int, request: bytes, until: float, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < until:
+            started = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        writer.close()
+
+
+def client_process(url: str, connections: int, duration: float, results):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n\r\n".encode()
+
+    async def run():
+        latencies, errors = [], []
+        until = time.monotonic() + duration
+        await asyncio.gather(*(
+            connection(host, port, request, until, latencies, errors) for _ in range(connections)
+        ))
+        return latencies, errors
+
+    results.put(asyncio.run(run()))
+
+
+def run_load(url: str, client_procs: int, connections: int, duration: float) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(target=client_process, args=(url, connections, duration, results))
+        for _ in range(client_procs)
+    ]
+    for process in processes:
+        process.start()
+    latencies, errors = [], []
+    for _ in processes:
+        proc_latencies, proc_errors = results.get()
+        latencies += proc_latencies
+        errors += proc_errors
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        "errors": len(errors),
+    }
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"server did not listen on port {port}")
+
+
+def sweep(args) -> None:
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    print(f"{os.cpu_count()} cores, {args.client_procs} client processes x {args.connections} connections, "
+          f"{args.duration}s per run, GET {args.path}\n")
+    print(f"{'workers':>8} {'req/s':>10} {'p50':>9} {'p99':>9} {'errors':>7} {'scaling':>8}")
+    baseline = None
+    for workers in args.sweep:
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND_DIR, "serve.py"), "--app", args.app,
+             "--workers", str(workers), "--host", "127.0.0.1", "--port", str(args.port)],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(args.port)
+            # Let every worker finish starting before measuring
+            time.sleep(1 + workers * 0.5)
+            result = run_load(url, args.client_procs, args.connections, args.duration)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        baseline = baseline or result["rps"]
+        print(f"{workers:>8} {result['rps']:>10.0f} {result['p50_ms']:>6.2f} ms {result['p99_ms']:>6.2f} ms "
+              f"{result['errors']:>7} {result['rps'] / baseline:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load a running server instead of sweeping")
+    parser.add_argument("--sweep", type=int, nargs="+", default=[1, 2, 4, 8], help="worker counts")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--client-procs", type=int, default=max((os.cpu_count() or 2) // 2, 1))
+    parser.add_argument("--connections", type=int, default=64, help="per client process")
+    args = parser.parse_args()
+
+    if args.url:
+        result = run_load(args.url, args.client_procs, args.connections, args.duration)
+        print(f"{result['requests']} requests, {result['rps']:.0f} req/s, p50 {result['p50_ms']:.2f} ms, "
+              f"p99 {result['p99_ms']:.2f} ms, {result['errors']} errors")
+    else:
+        sweep(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare Redis memory per participant for the per-user key layout and the per-quiz one.
+
+Writes a throwaway quiz in each layout to the configured Redis, measures the growth of
+INFO used_memory, then deletes it again:
+    python -m app.scripts.redis_memory_report [--participants 500 50000] [--questions 10]
+
+before: quiz:{id}:user:{username}:score and quiz:{id}:user:{username}:questions
+        strings, each with its own TTL
+after:  one member of the quiz's ranking sorted set plus one field of the quiz's
+        answered hash, with a fixed number of per-quiz keys (see ScoringService)
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from app.core.redis import get_redis
+from app.services.ranking import encode_score
+
+BATCH_SIZE = 1000
+
+
+async def used_memory(redis) -> int:
+    return int((await redis.info("memory"))["used_memory"])
+
+
+async def write_before(redis, quiz_id: str, participants: int, question_ids: list) -> list:
+    keys = []
+    answered = json.dumps(question_ids)
+    for start in range(0, participants, BATCH_SIZE):
+        pipe = redis.pipeline(transaction=False)
+        for i in range(start, min(start + BATCH_SIZE, participants)):
+            score_key = f"quiz:{quiz_id}:user:user{i:08d}:score"
+            questions_key = f"quiz:{quiz_id}:user:user{i:08d}:questions"
+            pipe.set(score_key, i % 100, ex=300)
+            pipe.set(questions_key, answered, ex=300)
+            keys += [score_key, questions_key]
+        await pipe.execute()
+    return keys
+
+
+async def write_after(redis, quiz_id: str, participants: int, question_ids: list) -> list:
+    keys = [
+        f"quiz:{quiz_id}:leaderboard",
+        f"quiz:{quiz_id}:leaderboard:scores",
+        f"quiz:{quiz_id}:leaderboard:counts",
+        f"quiz:{quiz_id}:started_at",
+        f"quiz:{quiz_id}:leaderboard:version",
+        f"quiz:{quiz_id}:answered",
+        f"quiz:{quiz_id}:questions",
+        f"quiz:{quiz_id}:expires_at",
+    ]
+    expire_at = int(time.time()) + 300
+    answered = ",".join(str(position) for position in range(len(question_ids)))
+    counts = {}
+    for start in range(0, participants, BATCH_SIZE):
+        pipe = redis.pipeline(transaction=False)
+        members = {}
+        fields = {}
+        for i in range(start, min(start + BATCH_SIZE, participants)):
+            points = i % 100
+            members[f"user{i:08d}"] = encode_score(points, i)
+            fields[f"user{i:08d}"] = answered
+            counts[points] = counts.get(points, 0) + 1
+        pipe.zadd(keys[0], members)
+        pipe.hset(keys[5], mapping=fields)
+        await pipe.execute()
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.zadd(keys[1], {str(points): points for points in counts})
+    pipe.hset(keys[2], mapping=counts)
+    pipe.set(keys[3], int(time.time() * 1000))
+    pipe.set(keys[4], participants)
+    pipe.set(keys[6], json.dumps(question_ids))
+    pipe.set(keys[7], expire_at)
+    for key in keys:
+        pipe.expireat(key, expire_at)
+    await pipe.execute()
+    return keys
+
+
+async def measure(redis, writer, participants: int, question_ids: list):
+    quiz_id = f"memory-report-{uuid.uuid4().hex}"
+    before = await used_memory(redis)
+    keys = await writer(redis, quiz_id, participants, question_ids)
+    grown = await used_memory(redis) - before
+    for start in range(0, len(keys), BATCH_SIZE):
+        await redis.unlink(*keys[start:start + BATCH_SIZE])
+    return grown, len(keys)
+
+
+async def main(sizes: list, questions: int):
+    redis = await get_redis()
+    question_ids = [str(uuid.uuid4()) for _ in range(questions)]
+    print(f"{questions} answered questions per participant\n")
+    print(f"{'participants':>12} {'layout':>7} {'keys':>8} {'memory':>10} {'bytes/participant':>18}")
+    for participants in sizes:
+        results = {}
+        for name, writer in (("before", write_before), ("after", write_after)):
+            grown, keys = await measure(redis, writer, participants, question_ids)
+            results[name] = grown / participants
+            print(f"{participants:>12} {name:>7} {keys:>8} {grown / 1024 / 1024:>7.2f} MB {results[name]:>18.0f}")
+        print(f"{'':>12} {'saved':>7} {'':>8} {'':>10} {1 - results['after'] / results['before']:>17.0%}\n")
+    await redis.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, nargs="+", default=[500, 50000])
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.participants, args.questions))
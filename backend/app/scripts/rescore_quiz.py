@@ -0,0 +1,43 @@
+"""
+Recompute all scores of a quiz, swap in the rebuilt leaderboard and save the new
+results to the leaderboards table.
+
+Run after correcting an answer key or changing the scoring formula, once the quiz
+has ENDED:
+    python -m app.scripts.rescore_quiz <quiz_id> [--chunk-size 10000]
+
+Quizzes with no answer attempts recorded are refused. The global leaderboards are
+not corrected: they keep the totals added when the quiz ended.
+"""
+import argparse
+import asyncio
+import time
+from tortoise import Tortoise
+from app.core.config import TORTOISE_ORM
+from app.services.rescoring import rescoring_service, RescoringError
+
+
+async def main(quiz_id: str, chunk_size: int):
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        start = time.perf_counter()
+        try:
+            result = await rescoring_service.rescore_quiz(quiz_id, chunk_size)
+        except RescoringError as e:
+            print(f"Error rescoring quiz: {str(e)}")
+            return
+        elapsed = time.perf_counter() - start
+        print(
+            f"Rescored {result['attempts']} attempts ({result['updated']} changed) "
+            f"for {result['participants']} participants, saved {result['results']} results, in {elapsed:.2f}s"
+        )
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("quiz_id")
+    parser.add_argument("--chunk-size", type=int, default=rescoring_service.CHUNK_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.quiz_id, args.chunk_size))
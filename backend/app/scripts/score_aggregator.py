@@ -0,0 +1,46 @@
+"""
+Run a leaderboard aggregator on its own, consuming score events until stopped.
+
+Start as many as the event rate needs; they share the `leaderboard` consumer group.
+Set SCORE_AGGREGATOR_ENABLED=false on web nodes that should not aggregate:
+    python -m app.scripts.score_aggregator [--report-interval 10]
+"""
+import argparse
+import asyncio
+import signal
+from tortoise import Tortoise
+from app.core.config import TORTOISE_ORM
+from app.services.score_events import score_event_service
+
+
+async def main(report_interval: float):
+    await Tortoise.init(config=TORTOISE_ORM)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    # Started here whatever SCORE_AGGREGATOR_ENABLED says: running this is the point
+    score_event_service.ENABLED = True
+    score_event_service.start()
+    print(f"Aggregating score events as {score_event_service.CONSUMER}")
+    try:
+        applied = 0
+        while not stopping.is_set():
+            try:
+                await asyncio.wait_for(stopping.wait(), report_interval)
+            except asyncio.TimeoutError:
+                pass
+            rate = (score_event_service.applied - applied) / report_interval
+            applied = score_event_service.applied
+            print(f"{applied} events applied, {rate:.0f}/s")
+    finally:
+        await score_event_service.stop()
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report-interval", type=float, default=10, help="seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.report_interval))
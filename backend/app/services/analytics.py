@@ -0,0 +1,178 @@
+from typing import Dict, List, Optional, Set
+from app.core.redis import get_redis
+from app.services.quiz_state import quiz_state_service
+import asyncio
+import json
+
+
+class AnalyticsService:
+    """
+    Live per-question answer statistics for quiz hosts.
+
+    Counters are kept incrementally in one Redis hash per question and bumped on every
+    submission, so reading a question's stats is a single HGETALL over a fixed number
+    of fields, never a scan of answer attempts:
+
+    - total / correct             number of submissions and correct ones
+    - rt_count / rt_sum_ms        timed submissions and their summed response time
+    - answer:{answer_id}          submissions per answer option
+    - invalid                     submissions whose answer id isn't one of the question's
+    - rt:{bound}                  response time histogram, by bucket upper bound in seconds
+
+    Each node pushes the stats of questions that changed to the quiz's host channel at
+    most once per ANALYTICS_PUSH_INTERVAL, however many answers arrive in between.
+    The hashes are namespaced by the quiz's epoch and expire with the quiz lifecycle
+    (see QuizStateService).
+    """
+
+    def __init__(self):
+        self.ANALYTICS_PUSH_INTERVAL = 1.0  # seconds
+        self.QUESTION_STATS_KEY = "quiz:{quiz_id}:question:{question_id}:stats"
+        self.ANALYTICS_CHANNEL = "analytics:{quiz_id}"
+        # Upper bounds (seconds) of the response time histogram buckets
+        self.RESPONSE_TIME_BUCKETS = [1, 2, 3, 5, 10, 15, 20, 30]
+        self._dirty: Dict[str, Set[str]] = {}
+        self._publishers: Dict[str, asyncio.Task] = {}
+
+    def state_keys(self, scope: str, question_ids: List[str]) -> List[str]:
+        """Every Redis key holding the stats of a quiz epoch"""
+        return [
+            self.QUESTION_STATS_KEY.format(quiz_id=scope, question_id=question_id)
+            for question_id in question_ids
+        ]
+
+    def _bucket(self, response_time_ms: int) -> str:
+        seconds = response_time_ms / 1000
+        for bound in self.RESPONSE_TIME_BUCKETS:
+            if seconds <= bound:
+                return f"rt:{bound}"
+        return "rt:inf"
+
+    async def record_answer(
+        self,
+        quiz_id: str,
+        question_id: str,
+        answer_id: Optional[str],
+        is_correct: bool,
+        response_time_ms: Optional[int] = None,
+    ) -> None:
+        """
+        Bump the counters of a question for one submission. `answer_id` is None when
+        the submitted id isn't one of the question's answers: it comes from the client,
+        so only known answers get a field of their own.
+        """
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        stats_key = self.QUESTION_STATS_KEY.format(quiz_id=scope, question_id=question_id)
+        pipe = redis.pipeline(transaction=False)
+        pipe.hincrby(stats_key, "total", 1)
+        pipe.hincrby(stats_key, f"answer:{answer_id}" if answer_id is not None else "invalid", 1)
+        if is_correct:
+            pipe.hincrby(stats_key, "correct", 1)
+        if response_time_ms is not None:
+            pipe.hincrby(stats_key, "rt_count", 1)
+            pipe.hincrby(stats_key, "rt_sum_ms", response_time_ms)
+            pipe.hincrby(stats_key, self._bucket(response_time_ms), 1)
+        pipe.expireat(stats_key, await quiz_state_service.get_deadline(quiz_id))
+        await pipe.execute()
+
+        self._dirty.setdefault(quiz_id, set()).add(str(question_id))
+        if quiz_id not in self._publishers:
+            self._publishers[quiz_id] = asyncio.create_task(self._publish_loop(quiz_id))
+
+    def _format(self, question_id: str, raw: Dict[str, str]) -> Dict:
+        total = int(raw.get("total", 0))
+        correct = int(raw.get("correct", 0))
+        rt_count = int(raw.get("rt_count", 0))
+        return {
+            "question_id": question_id,
+            "total": total,
+            "correct": correct,
+            "correct_rate": correct / total if total else 0.0,
+            "avg_response_time_ms": int(raw.get("rt_sum_ms", 0)) / rt_count if rt_count else None,
+            "answers": {
+                field.split(":", 1)[1]: int(count)
+                for field, count in raw.items()
+                if field.startswith("answer:")
+            },
+            "invalid": int(raw.get("invalid", 0)),
+            "response_time_histogram": [
+                {"le": bound, "count": int(raw.get(f"rt:{bound}", 0))}
+                for bound in self.RESPONSE_TIME_BUCKETS + ["inf"]
+            ],
+        }
+
+    async def get_question_stats(self, quiz_id: str, question_id: str) -> Dict:
+        """Get a question's live stats in O(1)"""
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        raw = await redis.hgetall(
+            self.QUESTION_STATS_KEY.format(quiz_id=scope, question_id=question_id)
+        )
+        return self._format(str(question_id), raw)
+
+    async def _publish_loop(self, quiz_id: str):
+        """Push changed question stats to the host channel, throttled"""
+        try:
+            while True:
+                await asyncio.sleep(self.ANALYTICS_PUSH_INTERVAL)
+                question_ids = self._dirty.pop(quiz_id, None)
+                if not question_ids:
+                    # Nothing changed for a whole interval, stop until the next answer
+                    break
+                stats = await self.get_quiz_stats(quiz_id, list(question_ids))
+                redis = await get_redis()
+                await redis.publish(
+                    self.ANALYTICS_CHANNEL.format(quiz_id=quiz_id),
+                    json.dumps({"type": "question_analytics", "data": stats}),
+                )
+        except Exception as e:
+            print(f"Error publishing analytics for quiz {quiz_id}: {str(e)}")
+        finally:
+            # flush() may have replaced this task already
+            if self._publishers.get(quiz_id) is asyncio.current_task():
+                del self._publishers[quiz_id]
+
+    async def flush(self, quiz_id: str) -> None:
+        """Publish a quiz's pending stats now rather than at the next interval"""
+        publisher = self._publishers.pop(quiz_id, None)
+        if publisher:
+            publisher.cancel()
+        question_ids = self._dirty.pop(quiz_id, None)
+        if not question_ids:
+            return
+        stats = await self.get_quiz_stats(quiz_id, list(question_ids))
+        redis = await get_redis()
+        await redis.publish(
+            self.ANALYTICS_CHANNEL.format(quiz_id=quiz_id),
+            json.dumps({"type": "question_analytics", "data": stats}),
+        )
+
+    async def get_quiz_stats(self, quiz_id: str, question_ids: List[str]) -> List[Dict]:
+        """Get the live stats of several questions in one round trip"""
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        pipe = redis.pipeline(transaction=False)
+        for question_id in question_ids:
+            pipe.hgetall(self.QUESTION_STATS_KEY.format(quiz_id=scope, question_id=question_id))
+        return [
+            self._format(question_id, raw)
+            for question_id, raw in zip(question_ids, await pipe.execute())
+        ]
+
+    async def subscribe_host(self, quiz_id: str, websocket) -> None:
+        """Forward analytics pushes for a quiz to a host's websocket until it disconnects"""
+        redis = await get_redis()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(self.ANALYTICS_CHANNEL.format(quiz_id=quiz_id))
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    await websocket.send_text(message["data"])
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+
+
+# Create a singleton instance
+analytics_service = AnalyticsService()
@@ -0,0 +1,243 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from enum import Enum
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.services.ranking import ranking_service, PAGE_SCRIPT
+import heapq
+import time
+import zlib
+
+
+class Period(str, Enum):
+    ALL = "all"
+    WEEK = "week"
+    MONTH = "month"
+
+
+# Composite sort key: total points in the high bits and the inverted time (seconds
+# since GLOBAL_EPOCH) of the last gain in the low 31 bits, so ties go to whoever got
+# there first. Redis scores are doubles, exact up to 2^53, so a user's total points
+# must stay below 2^22 (MAX_TOTAL_POINTS); totals are capped there when ingested.
+GLOBAL_EPOCH = 1704067200  # 2024-01-01T00:00:00Z
+TIME_SCALE = 1 << 31
+MAX_TIME_OFFSET = TIME_SCALE - 1
+MAX_TOTAL_POINTS = (1 << 22) - 1
+
+
+def decode_points(composite) -> int:
+    return int(float(composite)) // TIME_SCALE
+
+
+# KEYS: the quiz's ingested marker and ingest progress hash for one shard, then that
+#       shard's boards to add to (all-time and current periods), all in one slot
+# ARGV: inverted timestamp, progress hash TTL, max total points, then member / points pairs
+# Members already in the progress hash are skipped, and nothing is added once the quiz
+# is marked ingested, so a retried or concurrent ingest never counts anyone twice.
+# Returns how many members were added.
+INGEST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+local scale = 2147483648
+local stamp = tonumber(ARGV[1])
+local max_total = tonumber(ARGV[3])
+local added = 0
+for i = 4, #ARGV, 2 do
+    local member = ARGV[i]
+    local points = tonumber(ARGV[i + 1])
+    if redis.call('HSETNX', KEYS[2], member, points) == 1 then
+        for k = 3, #KEYS do
+            local old = redis.call('ZSCORE', KEYS[k], member)
+            local total = points
+            if old then
+                total = total + math.floor(tonumber(old) / scale)
+            end
+            total = math.min(total, max_total)
+            redis.call('ZADD', KEYS[k], string.format('%.0f', total * scale + stamp), member)
+        end
+        added = added + 1
+    end
+end
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return added
+"""
+
+class GlobalLeaderboardService:
+    """
+    All-time, weekly and monthly leaderboards across every quiz.
+
+    Boards are fed once per quiz when it is finalized, by adding each participant's
+    quiz score to their global totals, so nothing is ever recomputed by scanning
+    attempts. Each board is split into GLOBAL_LEADERBOARD_SHARDS sorted sets by a hash
+    of the username, which keeps every key small enough for the 100M-user target. Keys
+    carry their shard as a Redis Cluster hash tag, so a shard's period boards and the
+    per-quiz ingest marker and progress of that shard share one slot and are updated
+    in one script, while different shards spread across the cluster:
+
+    - top-K pages merge the K best of every shard, with the last (score, user) as cursor
+    - a user's rank is the sum of one ZCOUNT per shard, O(shards * log n)
+    """
+
+    def __init__(self):
+        self.SHARDS = settings.GLOBAL_LEADERBOARD_SHARDS
+        self.BOARD_KEY = "global:leaderboard:{{{shard}}}:{period}"
+        self.INGESTED_KEY = "global:leaderboard:{{{shard}}}:ingested:{quiz_id}"
+        self.INGESTED_EXPIRATION_TIME = 60 * 60 * 24 * 90  # 90 days
+        # Members of a quiz already added, while its ingest is in progress
+        self.INGESTING_KEY = "global:leaderboard:{{{shard}}}:ingesting:{quiz_id}"
+        self.INGESTING_EXPIRATION_TIME = 60 * 60 * 24  # 1 day
+        self.PERIOD_EXPIRATION_TIME = {
+            Period.WEEK: 60 * 60 * 24 * 7 * 5,   # keep the last few weeks
+            Period.MONTH: 60 * 60 * 24 * 31 * 13,  # keep the last year
+        }
+        self.INGEST_BATCH_SIZE = 500
+
+    def _period_suffix(self, period: Period, at: Optional[datetime] = None) -> str:
+        at = at or datetime.now(timezone.utc)
+        if period == Period.WEEK:
+            year, week, _ = at.isocalendar()
+            return f"week:{year}-W{week:02d}"
+        if period == Period.MONTH:
+            return f"month:{at:%Y-%m}"
+        return "all"
+
+    def _shard(self, username: str) -> int:
+        return zlib.crc32(username.encode("utf-8")) % self.SHARDS
+
+    def _shard_keys(self, period: Period) -> List[str]:
+        suffix = self._period_suffix(period)
+        return [self.BOARD_KEY.format(period=suffix, shard=shard) for shard in range(self.SHARDS)]
+
+    async def record_quiz_results(self, quiz_id: str) -> int:
+        """
+        Add a finalized quiz's scores to the global boards, once per quiz.
+
+        Participants added so far are tracked in a progress hash per shard, so a call
+        that fails part way can simply be repeated: it adds only those still missing.
+        Every shard is marked as recorded for the quiz, and its progress hash dropped,
+        once every batch is in. Returns the number of participants added, or 0 if the
+        quiz was already recorded.
+        """
+        redis = await get_redis()
+        markers = [self.INGESTED_KEY.format(shard=shard, quiz_id=quiz_id) for shard in range(self.SHARDS)]
+        pipe = redis.pipeline(transaction=False)
+        for marker in markers:
+            pipe.exists(marker)
+        if all(await pipe.execute()):
+            return 0
+
+        script = redis.register_script(INGEST_SCRIPT)
+        stamp = MAX_TIME_OFFSET - min(max(int(time.time()) - GLOBAL_EPOCH, 0), MAX_TIME_OFFSET)
+        suffixes = [self._period_suffix(period) for period in Period]
+        recorded = 0
+        start = 0
+        while True:
+            page = await ranking_service.get_page(quiz_id, start, self.INGEST_BATCH_SIZE)
+            if not page:
+                break
+            start += len(page)
+
+            by_shard: Dict[int, List] = {}
+            for entry in page:
+                if entry["score"] > 0:
+                    by_shard.setdefault(self._shard(entry["username"]), []).extend(
+                        [entry["username"], entry["score"]]
+                    )
+            for shard, pairs in by_shard.items():
+                keys = [markers[shard], self.INGESTING_KEY.format(shard=shard, quiz_id=quiz_id)] + [
+                    self.BOARD_KEY.format(shard=shard, period=suffix) for suffix in suffixes
+                ]
+                recorded += int(await script(
+                    keys=keys, args=[stamp, self.INGESTING_EXPIRATION_TIME, MAX_TOTAL_POINTS, *pairs]
+                ))
+
+        pipe = redis.pipeline(transaction=False)
+        for period, ttl in self.PERIOD_EXPIRATION_TIME.items():
+            for key in self._shard_keys(period):
+                pipe.expire(key, ttl)
+        for shard, marker in enumerate(markers):
+            pipe.set(marker, 1, ex=self.INGESTED_EXPIRATION_TIME)
+            pipe.delete(self.INGESTING_KEY.format(shard=shard, quiz_id=quiz_id))
+        await pipe.execute()
+        return recorded
+
+    async def _ranked(self, redis, keys: List[str], rows: List[Tuple[str, float]]) -> List[Dict]:
+        """Attach competition ranks to rows, one ZCOUNT per shard per distinct score"""
+        distinct = sorted({decode_points(composite) for _, composite in rows}, reverse=True)
+        pipe = redis.pipeline(transaction=False)
+        for points in distinct:
+            for key in keys:
+                pipe.zcount(key, (points + 1) * TIME_SCALE, "+inf")
+        counts = await pipe.execute()
+        rank_for = {
+            points: sum(counts[i * len(keys):(i + 1) * len(keys)]) + 1
+            for i, points in enumerate(distinct)
+        }
+        return [
+            {"username": username, "score": decode_points(composite), "rank": rank_for[decode_points(composite)]}
+            for username, composite in rows
+        ]
+
+    async def _read_shards(self, redis, keys: List[str], cursor: Tuple[str, str], limit: int, direction: str) -> List[Tuple[str, float]]:
+        """Read up to `limit` rows from every shard on one side of the cursor"""
+        script = redis.register_script(PAGE_SCRIPT)
+        pipe = redis.pipeline(transaction=False)
+        for key in keys:
+            await script(keys=[key], args=[cursor[0], cursor[1], limit, direction], client=pipe)
+        rows = []
+        for flat in await pipe.execute():
+            rows.extend((flat[i], float(flat[i + 1])) for i in range(0, len(flat), 2))
+        return rows
+
+    async def get_top(self, period: Period = Period.ALL, limit: int = 50, cursor: Optional[str] = None) -> Dict:
+        """
+        Get a page of the global board, best first.
+
+        `cursor` is the `next_cursor` of the previous page, the sort key and username
+        of its last entry. Each page reads at most `limit` entries from every shard,
+        starting right after the cursor.
+        """
+        position = ("", "")
+        if cursor:
+            composite, _, username = cursor.partition(":")
+            position = (str(int(composite)), username)
+        redis = await get_redis()
+        keys = self._shard_keys(period)
+        rows = heapq.nlargest(
+            limit, await self._read_shards(redis, keys, position, limit, "after"), key=lambda row: (row[1], row[0])
+        )
+        return {
+            "period": period.value,
+            "items": await self._ranked(redis, keys, rows),
+            "next_cursor": f"{rows[-1][1]:.0f}:{rows[-1][0]}" if len(rows) == limit else None,
+        }
+
+    async def get_around(self, username: str, period: Period = Period.ALL, window: int = 5) -> Optional[Dict]:
+        """Get a user's rank plus up to `window` entries above and below them"""
+        redis = await get_redis()
+        keys = self._shard_keys(period)
+        composite = await redis.zscore(keys[self._shard(username)], username)
+        if composite is None:
+            return None
+
+        position = (f"{composite:.0f}", username)
+        order = lambda row: (row[1], row[0])
+        above = heapq.nsmallest(window, await self._read_shards(redis, keys, position, window, "before"), key=order)
+        below = heapq.nlargest(window, await self._read_shards(redis, keys, position, window, "after"), key=order)
+
+        rows = list(reversed(above)) + [(username, composite)] + below
+        items = await self._ranked(redis, keys, rows)
+        return {"period": period.value, "user": items[len(above)], "items": items}
+
+    async def count(self, period: Period = Period.ALL) -> int:
+        """Number of users on a global board"""
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=False)
+        for key in self._shard_keys(period):
+            pipe.zcard(key)
+        return sum(await pipe.execute())
+
+
+# Create a singleton instance
+global_leaderboard_service = GlobalLeaderboardService()
@@ -0,0 +1,165 @@
+from typing import Callable, Dict, List, Optional, Set
+from app.core.config import WEBSOCKET_CONFIG
+import asyncio
+import json
+import math
+import time
+
+
+class HeartbeatService:
+    """
+    One heartbeat scheduler for every WebSocket a process serves.
+
+    Any frame a client sends counts as a sign of life (touch). A connection silent for
+    heartbeat_interval is sent {"type": "ping"}, which clients answer with
+    {"type": "pong"}; one still silent heartbeat_timeout after that is reaped: taken
+    out of every broadcast list through its on_reap callback, then closed within
+    close_timeout.
+
+    Connections wait in a timing wheel with one slot per TICK, and each tick only
+    looks at the connections due in its slot. Activity only updates a last-seen time;
+    a connection found active when its slot comes up is put back in the wheel for
+    when it would next go silent. Each tick therefore costs about
+    connections / (heartbeat_interval / TICK), with no task or timer per socket.
+    """
+
+    def __init__(self):
+        self.HEARTBEAT_INTERVAL = WEBSOCKET_CONFIG["heartbeat_interval"] / 1000  # seconds
+        self.HEARTBEAT_TIMEOUT = WEBSOCKET_CONFIG["heartbeat_timeout"] / 1000    # seconds
+        self.CLOSE_TIMEOUT = WEBSOCKET_CONFIG["close_timeout"] / 1000            # seconds
+        self.TICK = 1.0  # seconds
+        self.REAP_BATCH_SIZE = 500
+        self.PING_MESSAGE = json.dumps({"type": "ping"})
+        # Enough slots that the longest wait never wraps around the wheel
+        self._slots = math.ceil(max(self.HEARTBEAT_INTERVAL, self.HEARTBEAT_TIMEOUT) / self.TICK) + 2
+        self._wheel: List[Set] = [set() for _ in range(self._slots)]
+        self._tick_count = 0
+        # websocket -> monotonic time it was last heard from
+        self._last_seen: Dict[object, float] = {}
+        # websocket -> monotonic time of its unanswered ping
+        self._pinged_at: Dict[object, float] = {}
+        self._on_reap: Dict[object, Callable[[], None]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.reaped = 0
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+    def _schedule(self, websocket, delay: float) -> None:
+        ticks = max(math.ceil(delay / self.TICK), 1)
+        self._wheel[(self._tick_count + ticks) % self._slots].add(websocket)
+
+    def register(self, websocket, on_reap: Optional[Callable[[], None]] = None) -> None:
+        """Start watching a connection; on_reap removes it from broadcasts if it dies"""
+        self._last_seen[websocket] = time.monotonic()
+        if on_reap:
+            self._on_reap[websocket] = on_reap
+        self._schedule(websocket, self.HEARTBEAT_INTERVAL)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def touch(self, websocket) -> None:
+        """Record that a connection was heard from, in O(1)"""
+        if websocket in self._last_seen:
+            self._last_seen[websocket] = time.monotonic()
+
+    def unregister(self, websocket) -> None:
+        """Stop watching a connection; its wheel entry is dropped when it comes due"""
+        self._last_seen.pop(websocket, None)
+        self._pinged_at.pop(websocket, None)
+        self._on_reap.pop(websocket, None)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in heartbeat tick: {str(e)}")
+            await asyncio.sleep(max(self.TICK - (time.monotonic() - started), 0))
+
+    async def tick(self) -> None:
+        """Check the connections due now: reschedule, ping or reap each"""
+        slot = self._tick_count % self._slots
+        due, self._wheel[slot] = self._wheel[slot], set()
+        now = time.monotonic()
+        to_ping = []
+        to_reap = []
+        for websocket in due:
+            last_seen = self._last_seen.get(websocket)
+            if last_seen is None:
+                continue
+            pinged_at = self._pinged_at.get(websocket)
+            if pinged_at is not None and last_seen < pinged_at:
+                if now - pinged_at >= self.HEARTBEAT_TIMEOUT:
+                    to_reap.append(websocket)
+                else:
+                    self._schedule(websocket, pinged_at + self.HEARTBEAT_TIMEOUT - now)
+            elif now - last_seen >= self.HEARTBEAT_INTERVAL:
+                to_ping.append(websocket)
+            else:
+                self._pinged_at.pop(websocket, None)
+                self._schedule(websocket, last_seen + self.HEARTBEAT_INTERVAL - now)
+        self._tick_count += 1
+
+        if to_ping:
+            to_reap += await self._ping(to_ping, now)
+        for start in range(0, len(to_reap), self.REAP_BATCH_SIZE):
+            await self._reap(to_reap[start:start + self.REAP_BATCH_SIZE])
+
+    async def _ping(self, websockets: List, now: float) -> List:
+        """Ping connections concurrently and return the ones the ping could not reach"""
+        # One task per send and a single deadline for all of them, rather than a
+        # wait_for (and its extra task) per send
+        sends = {
+            asyncio.ensure_future(websocket.send_text(self.PING_MESSAGE)): websocket
+            for websocket in websockets
+        }
+        _, pending = await asyncio.wait(sends, timeout=self.CLOSE_TIMEOUT)
+        for send in pending:
+            send.cancel()
+        failed = []
+        for send, websocket in sends.items():
+            if send in pending or send.exception() is not None:
+                failed.append(websocket)
+            elif websocket in self._last_seen:
+                self._pinged_at[websocket] = now
+                self._schedule(websocket, self.HEARTBEAT_TIMEOUT)
+        return failed
+
+    async def _reap(self, websockets: List) -> None:
+        """Drop dead connections from every broadcast list, then close them"""
+        for websocket in websockets:
+            on_reap = self._on_reap.get(websocket)
+            self.unregister(websocket)
+            if on_reap:
+                try:
+                    on_reap()
+                except Exception as e:
+                    print(f"Error reaping connection: {str(e)}")
+        self.reaped += len(websockets)
+        await asyncio.gather(
+            *(self._close(websocket) for websocket in websockets)
+        )
+
+    async def _close(self, websocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1001), self.CLOSE_TIMEOUT)
+        except Exception:
+            pass
+
+
+# Create a singleton instance
+heartbeat_service = HeartbeatService()
@@ -0,0 +1,161 @@
+from typing import List, Optional
+from datetime import datetime, timezone
+from tortoise import connections
+from app.core.db_router import replica_monitor
+import uuid
+
+# Fixed statements with positional parameters: asyncpg prepares each once per pooled
+# connection and reuses it from its statement cache, and nothing is built per call.
+QUIZ_SQL = "SELECT id, title, status, epoch FROM quizzes WHERE id = $1"
+
+# A quiz, its questions and their answers in one round trip, one row per answer
+QUIZ_CONTENT_SQL = """SELECT qz.id, qz.title, qz.status, qz.epoch,
+    q.id, q.title, q.time_limit, q.points, a.id, a.text, a.is_correct
+FROM quizzes qz
+LEFT JOIN questions q ON q.quiz_id = qz.id
+LEFT JOIN answers a ON a.question_id = q.id
+WHERE qz.id = $1
+ORDER BY q."order", q.id, a."order"
+"""
+
+QUESTION_SQL = """SELECT q.id, q.title, q.time_limit, q.points, a.id, a.text, a.is_correct
+FROM questions q
+LEFT JOIN answers a ON a.question_id = q.id
+WHERE q.id = $1
+ORDER BY a."order"
+"""
+
+IS_CORRECT_SQL = "SELECT is_correct FROM answers WHERE id = $1 AND question_id = $2"
+
+USER_SQL = "SELECT id, username FROM users WHERE username = $1"
+
+CREATE_USER_SQL = """INSERT INTO users (id, username, created_at, updated_at) VALUES ($1, $2, $3, $3)
+ON CONFLICT (username) DO NOTHING
+RETURNING id, username
+"""
+
+
+class UserRecord:
+    __slots__ = ("id", "username")
+
+    def __init__(self, id: str, username: str):
+        self.id = id
+        self.username = username
+
+
+class AnswerRecord:
+    __slots__ = ("id", "text", "is_correct")
+
+    def __init__(self, id: str, text: str, is_correct: bool):
+        self.id = id
+        self.text = text
+        self.is_correct = is_correct
+
+
+class QuestionRecord:
+    __slots__ = ("id", "title", "time_limit", "points", "answers")
+
+    def __init__(self, id: str, title: str, time_limit: int, points: int):
+        self.id = id
+        self.title = title
+        self.time_limit = time_limit
+        self.points = points
+        self.answers: List[AnswerRecord] = []
+
+
+class QuizRecord:
+    __slots__ = ("id", "title", "status", "epoch", "questions")
+
+    def __init__(self, id: str, title: str, status: str, epoch: int):
+        self.id = id
+        self.title = title
+        self.status = status
+        self.epoch = epoch
+        # Only filled in by get_quiz_content
+        self.questions: List[QuestionRecord] = []
+
+
+class HotQueryService:
+    """
+    Raw-SQL reads for the few queries on the join and answer paths.
+
+    Each is one fixed statement, run straight on the connection and read into
+    slotted records (ids as str) instead of building a query and a model instance per
+    row through the ORM. A quiz with all its questions and answers, or a question
+    with its answers, comes back in a single round trip. Reads go to a replica when
+    the ORM's would (see app/core/db_router.py). Benchmarked against the ORM calls
+    they replace by app/scripts/bench_hot_queries.py.
+    """
+
+    def _reader(self, table: str):
+        return connections.get(replica_monitor.replica_for(table) or "default")
+
+    async def get_quiz(self, quiz_id: str) -> Optional[QuizRecord]:
+        """A quiz without its content, or None"""
+        _, rows = await self._reader("quizzes").execute_query(QUIZ_SQL, [str(quiz_id)])
+        if not rows:
+            return None
+        quiz_id, title, status, epoch = rows[0]
+        return QuizRecord(str(quiz_id), title, status, epoch)
+
+    async def get_quiz_content(self, quiz_id: str) -> Optional[QuizRecord]:
+        """A quiz with its questions and their answers, both in order, or None"""
+        _, rows = await self._reader("questions").execute_query(QUIZ_CONTENT_SQL, [str(quiz_id)])
+        if not rows:
+            return None
+        quiz = QuizRecord(str(rows[0][0]), rows[0][1], rows[0][2], rows[0][3])
+        question = None
+        for row in rows:
+            if row[4] is None:
+                # A quiz without questions still comes back as one row
+                break
+            if question is None or question.id != str(row[4]):
+                question = QuestionRecord(str(row[4]), row[5], row[6], row[7])
+                quiz.questions.append(question)
+            if row[8] is not None:
+                question.answers.append(AnswerRecord(str(row[8]), row[9], bool(row[10])))
+        return quiz
+
+    async def get_question(self, question_id: str) -> Optional[QuestionRecord]:
+        """A question with its answers in order, or None"""
+        _, rows = await self._reader("questions").execute_query(QUESTION_SQL, [str(question_id)])
+        if not rows:
+            return None
+        question = QuestionRecord(str(rows[0][0]), rows[0][1], rows[0][2], rows[0][3])
+        question.answers = [
+            AnswerRecord(str(answer_id), text, bool(is_correct))
+            for _, _, _, _, answer_id, text, is_correct in rows
+            if answer_id is not None
+        ]
+        return question
+
+    async def get_answer_correctness(self, question_id: str, answer_id: str) -> Optional[bool]:
+        """Whether an answer of the question is correct; None if it isn't one of its answers"""
+        _, rows = await self._reader("answers").execute_query(IS_CORRECT_SQL, [str(answer_id), str(question_id)])
+        return bool(rows[0][0]) if rows else None
+
+    async def is_correct(self, question_id: str, answer_id: str) -> bool:
+        """Whether an answer is a correct answer of the question; False if it isn't one of its answers"""
+        return bool(await self.get_answer_correctness(question_id, answer_id))
+
+    async def get_or_create_user(self, username: str) -> UserRecord:
+        """
+        The user with a username, created if new. Existing users, the common case,
+        take one read; a new one takes an INSERT that can't race another join.
+        """
+        _, rows = await self._reader("users").execute_query(USER_SQL, [username])
+        if not rows:
+            primary = connections.get("default")
+            replica_monitor.record_write("users")
+            _, rows = await primary.execute_query(
+                CREATE_USER_SQL, [str(uuid.uuid4()), username, datetime.now(timezone.utc)]
+            )
+            if not rows:
+                # Created by a concurrent join since the read
+                _, rows = await primary.execute_query(USER_SQL, [username])
+        user_id, username = rows[0]
+        return UserRecord(str(user_id), username)
+
+
+# Create a singleton instance
+hot_query_service = HotQueryService()
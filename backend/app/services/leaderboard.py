@@ -1,127 +1,427 @@
-from typing import List, Dict
+from collections import deque
+from typing import Deque, List, Dict, Optional, Set, Tuple
+from app.core.config import settings
 from app.core.redis import get_redis
+from app.core.compression import EncodedFrame
+from app.services.quiz_state import quiz_state_service
+from app.services.ranking import ranking_service, RankMode
 from app.models.user import User
 from app.models.leaderboard import Leaderboard
 from app.schemas.leaderboard import LeaderboardResponse, LeaderboardUpdateMessage
 import json
 import asyncio
+import re
+import time
+import uuid
+
+# KEYS: quiz event sequence counter
+# ARGV: channel, message type, JSON data, counter TTL in seconds
+# Numbers and publishes an event in one step, so events are published in sequence order
+PUBLISH_EVENT_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('PUBLISH', ARGV[1], '{"type": "' .. ARGV[2] .. '", "seq": ' .. seq .. ', "data": ' .. ARGV[3] .. '}')
+return seq
+"""
+
+# Type and sequence number at the start of a published event, read without parsing it
+EVENT_HEADER = re.compile(r'\{"type": "(\w+)", "seq": (\d+)')
+
+# KEYS: leader lease
+# ARGV: holder id, lease time in ms
+# Renews the lease if held by the caller, takes it if free
+ACQUIRE_LEASE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# KEYS: leader lease
+# ARGV: holder id
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
 
 class LeaderboardService:
+    """
+    Live quiz leaderboards pushed to participants and viewers.
+
+    Each quiz has one elected publisher across all nodes: the holder of the quiz's
+    Redis lease (quiz:{quiz_id}:leaderboard:leader). Any node with local listeners
+    for a quiz competes for it, renewing every LEASE_RENEW_INTERVAL. Every
+    PUBLISH_INTERVAL the leader compares the board's version with the one it last
+    published and, if it changed, reads and publishes the board once, however many
+    answers arrived on however many nodes. Other nodes only consume the channel. If
+    the leader dies its lease lapses after LEASE_TIME_MS and the next node to renew
+    takes over.
+
+    Every event published for a quiz carries a sequence number, and each process
+    keeps the last EVENT_BUFFER_SIZE events it forwarded, so a resumed session can
+    be sent just the events it missed.
+    """
+
     def __init__(self):
-        self.REDIS_EXPIRATION_TIME = 60 * 5  # 5 minutes
-        self.USER_SCORE_KEY = "quiz:{quiz_id}:user:{username}:score"
         self.LEADERBOARD_CHANNEL = "leaderboard:{quiz_id}"
+        self.LEADER_KEY = "quiz:{quiz_id}:leaderboard:leader"
+        self.LEASE_TIME_MS = 3000
+        self.LEASE_RENEW_INTERVAL = 1.0  # seconds
+        self.PUBLISH_INTERVAL = 0.1      # seconds
+        self.VIEWER_KEEPALIVE_INTERVAL = 15  # seconds
+        self.EVENT_SEQ_KEY = "quiz:{quiz_id}:events:seq"
+        self.EVENT_SEQ_EXPIRATION_TIME = settings.QUIZ_STATE_LIVE_TTL
+        self.EVENT_BUFFER_SIZE = settings.EVENT_BUFFER_SIZE
+        # Reads of a user's window before giving up while their rank keeps moving
+        self.AROUND_ATTEMPTS = 3
+        # quiz_id -> {websocket: whether the client accepts compressed frames}
         self._subscribers = {}
+        # quiz_id -> set of viewer queues, each holding at most the latest snapshot
+        self._viewers: Dict[str, Set[asyncio.Queue]] = {}
+        # One Redis listener per quiz per process, shared by participants and viewers
+        self._listeners: Dict[str, asyncio.Task] = {}
+        # quiz_id -> (version, encoded leaderboard message) last seen on this process
+        self._snapshots: Dict[str, Tuple[int, EncodedFrame]] = {}
+        self._snapshot_loads: Dict[str, asyncio.Future] = {}
+        # quiz_id -> (seq, type, encoded message) of the latest events forwarded here
+        self._events: Dict[str, Deque[Tuple[int, str, EncodedFrame]]] = {}
+        # quiz_id -> (epoch, board version) this process last published
+        self._published: Dict[str, Tuple[int, int]] = {}
+        # Lease holder id, unique per process even when workers share a NODE_ID
+        self._leader_id = uuid.uuid4().hex
+        # quiz_ids this process holds the publisher lease for
+        self._leading: Set[str] = set()
+        self._publisher: Optional[asyncio.Task] = None
 
     async def join_leaderboard(self, quiz_id: str, user: User):
         """Join leaderboard for a quiz"""
-        redis = await get_redis()
-        score_key = self.USER_SCORE_KEY.format(quiz_id=quiz_id, username=user.username)
-        if not await redis.get(score_key):
-            await redis.set(score_key, 0, ex=self.REDIS_EXPIRATION_TIME)
-        print(f'score_key: {score_key}')
-        print(f'redis: {redis}')
+        await ranking_service.add_participant(quiz_id, user.username)
 
-    async def subscribe(self, quiz_id: str, websocket):
+    async def subscribe(self, quiz_id: str, websocket, compression: bool = False):
         """Subscribe to leaderboard updates for a quiz"""
-        redis = await get_redis()
-        channel = self.LEADERBOARD_CHANNEL.format(quiz_id=quiz_id)
-        
-        if quiz_id not in self._subscribers:
-            self._subscribers[quiz_id] = set()
-            # Start listening to Redis channel
-            asyncio.create_task(self._listen_to_channel(quiz_id))
-        
-        self._subscribers[quiz_id].add(websocket)
+        self._subscribers.setdefault(quiz_id, {})[websocket] = compression
+        self._ensure_listener(quiz_id)
 
     def unsubscribe(self, quiz_id: str, websocket):
         """Unsubscribe from leaderboard updates"""
         if quiz_id in self._subscribers:
-            self._subscribers[quiz_id].discard(websocket)
+            self._subscribers[quiz_id].pop(websocket, None)
             if not self._subscribers[quiz_id]:
                 del self._subscribers[quiz_id]
+        self._release_listener(quiz_id)
+
+    def add_viewer(self, quiz_id: str) -> asyncio.Queue:
+        """
+        Register a read-only viewer and return the queue its snapshots arrive on.
+
+        Viewers share this process's listener and snapshot, so they cost no Redis
+        or database work per connection. A slow viewer only ever holds the newest
+        snapshot; older ones it had no time to send are dropped.
+        """
+        queue = asyncio.Queue(maxsize=1)
+        self._viewers.setdefault(quiz_id, set()).add(queue)
+        self._ensure_listener(quiz_id)
+        return queue
+
+    def remove_viewer(self, quiz_id: str, queue: asyncio.Queue):
+        """Unregister a viewer"""
+        if quiz_id in self._viewers:
+            self._viewers[quiz_id].discard(queue)
+            if not self._viewers[quiz_id]:
+                del self._viewers[quiz_id]
+        self._release_listener(quiz_id)
+
+    def _ensure_listener(self, quiz_id: str):
+        if quiz_id not in self._listeners:
+            self._listeners[quiz_id] = asyncio.create_task(self._listen_to_channel(quiz_id))
+        if self._publisher is None:
+            self._publisher = asyncio.create_task(self._run_publisher())
+
+    def _release_listener(self, quiz_id: str):
+        if quiz_id in self._subscribers or quiz_id in self._viewers:
+            return
+        listener = self._listeners.pop(quiz_id, None)
+        if listener:
+            listener.cancel()
+        self._snapshots.pop(quiz_id, None)
+        self._events.pop(quiz_id, None)
+        self._published.pop(quiz_id, None)
+
+    def replay(self, quiz_id: str, last_seq: int) -> Optional[List[EncodedFrame]]:
+        """
+        Events of a quiz published after last_seq, oldest first, or None if this
+        process no longer holds all of them and the client needs a snapshot instead.
+
+        Each leaderboard update holds the whole board, so only the newest missed one
+        is returned; every other event is kept, in order.
+        """
+        events = self._events.get(quiz_id)
+        if not events or events[0][0] > last_seq + 1:
+            return None
+        missed = [event for event in events if event[0] > last_seq]
+        latest_update = max(
+            (index for index, (_, kind, _) in enumerate(missed) if kind == "leaderboard_update"),
+            default=None,
+        )
+        return [
+            frame for index, (_, kind, frame) in enumerate(missed)
+            if kind != "leaderboard_update" or index == latest_update
+        ]
+
+    def _record_event(self, quiz_id: str, message_data: str, frame: EncodedFrame):
+        header = EVENT_HEADER.match(message_data)
+        if header is None:
+            return
+        events = self._events.get(quiz_id)
+        if events is None:
+            events = self._events[quiz_id] = deque(maxlen=self.EVENT_BUFFER_SIZE)
+        events.append((int(header.group(2)), header.group(1), frame))
+
+    async def get_snapshot(self, quiz_id: str) -> Tuple[int, EncodedFrame]:
+        """
+        Get the latest encoded leaderboard message for a quiz.
+
+        Served from memory once this process has seen an update. On a cold cache,
+        concurrent callers share a single Redis read.
+        """
+        snapshot = self._snapshots.get(quiz_id)
+        if snapshot:
+            return snapshot
+        loading = self._snapshot_loads.get(quiz_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load_snapshot(quiz_id))
+            self._snapshot_loads[quiz_id] = loading
+            loading.add_done_callback(lambda _: self._snapshot_loads.pop(quiz_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load_snapshot(self, quiz_id: str) -> Tuple[int, EncodedFrame]:
+        leaderboard = await self.get_leaderboard(quiz_id)
+        frame = EncodedFrame(json.dumps({"type": "leaderboard_update", "data": leaderboard}))
+        if quiz_id in self._listeners:
+            # Don't overwrite a newer snapshot that arrived while loading
+            return self._snapshots.setdefault(quiz_id, (0, frame))
+        return 0, frame
 
     async def _listen_to_channel(self, quiz_id: str):
         """Listen to Redis channel for leaderboard updates"""
         redis = await get_redis()
         channel = self.LEADERBOARD_CHANNEL.format(quiz_id=quiz_id)
+        pubsub = redis.pubsub()
         
         try:
-            pubsub = redis.pubsub()
             await pubsub.subscribe(channel)
-            
-            while True:
-                message = await pubsub.get_message(ignore_subscribe_messages=True)
-                if message and message["type"] == "message":
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                if message["data"].startswith('{"type": "quiz_reset"'):
+                    await self._handle_reset(quiz_id, message["data"])
+                else:
                     # Broadcast to all subscribers
                     await self._broadcast_to_subscribers(quiz_id, message["data"])
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error in Redis subscription for quiz {quiz_id}: {str(e)}")
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
 
     async def _broadcast_to_subscribers(self, quiz_id: str, message_data):
-        """Broadcast message to all subscribers"""
-        if quiz_id not in self._subscribers:
-            return
-            
-        for websocket in self._subscribers[quiz_id]:
+        """Broadcast message to all subscribers and viewers"""
+        # Encode (and compress, if anyone wants it) once for the whole broadcast
+        frame = EncodedFrame(message_data)
+        version = self._snapshots.get(quiz_id, (0, None))[0] + 1
+        self._snapshots[quiz_id] = (version, frame)
+        self._record_event(quiz_id, message_data, frame)
+
+        for queue in list(self._viewers.get(quiz_id, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((version, frame))
+
+        for websocket, compression in list(self._subscribers.get(quiz_id, {}).items()):
             try:
-                await websocket.send_text(message_data)
+                await frame.send(websocket, compression)
             except Exception as e:
                 print(f"Error broadcasting to subscriber: {str(e)}")
 
-    async def get_leaderboard(self, quiz_id: str) -> List[Dict]:
-        """Get current leaderboard for a quiz"""
+    async def _handle_reset(self, quiz_id: str, message_data: str):
+        """Switch this process to a quiz's new epoch and tell its participants"""
+        quiz_state_service.set_epoch(quiz_id, json.loads(message_data)["data"]["epoch"])
+        self._published.pop(quiz_id, None)
+        frame = EncodedFrame(message_data)
+        self._record_event(quiz_id, message_data, frame)
+        for websocket, compression in list(self._subscribers.get(quiz_id, {}).items()):
+            try:
+                await frame.send(websocket, compression)
+            except Exception as e:
+                print(f"Error sending reset to subscriber: {str(e)}")
+
+    async def publish_reset(self, quiz_id: str, epoch: int):
+        """Tell every process a quiz was reset, then publish its now empty leaderboard"""
+        try:
+            await self._publish_event(quiz_id, "quiz_reset", {"epoch": epoch})
+            await self._publish_event(quiz_id, "leaderboard_update", [])
+            self._published.pop(quiz_id, None)
+        except Exception as e:
+            print(f"Error publishing quiz reset: {str(e)}")
+
+    async def _publish_event(self, quiz_id: str, message_type: str, data) -> int:
+        """Publish an event to every process with the quiz's next sequence number"""
         redis = await get_redis()
-        
+        script = redis.register_script(PUBLISH_EVENT_SCRIPT)
+        return await script(
+            keys=[self.EVENT_SEQ_KEY.format(quiz_id=quiz_id)],
+            args=[
+                self.LEADERBOARD_CHANNEL.format(quiz_id=quiz_id),
+                message_type,
+                json.dumps(data),
+                self.EVENT_SEQ_EXPIRATION_TIME,
+            ],
+        )
+
+    async def get_leaderboard(
+        self, quiz_id: str, mode: RankMode = RankMode.COMPETITION, limit: int = -1
+    ) -> List[Dict]:
+        """Get current leaderboard for a quiz, tied users share a rank"""
         try:
-            # Get all user scores from Redis
-            pattern = self.USER_SCORE_KEY.format(quiz_id=quiz_id, username="*")
-            keys = await redis.keys(pattern)
-            print(f'Keys: {keys}')
-            
-            # Build leaderboard
-            leaderboard = []
-            for key in keys:
-                username = key.split(":")[-2]  # Extract username from key
-                score = int(await redis.get(key) or 0)
-                leaderboard.append({
-                    "username": username,
-                    "score": score
-                })
-            
-            # Sort by score
-            leaderboard.sort(key=lambda x: x["score"], reverse=True)
-            
-            # Add ranks
-            for i, entry in enumerate(leaderboard):
-                entry["rank"] = i + 1
-            
-            return leaderboard
-            
+            return await ranking_service.get_page(quiz_id, 0, limit, mode)
         except Exception as e:
             print(f"Error getting leaderboard: {str(e)}")
             return []
 
+    async def get_version_tag(self, quiz_id: str) -> str:
+        """
+        ETag of a quiz's board, which changes whenever the board does. Costs a
+        cached epoch lookup and one GET, so polling clients can be answered 304
+        without reading the board.
+        """
+        epoch = await quiz_state_service.get_epoch(quiz_id)
+        return f'"{epoch}.{await ranking_service.get_version(quiz_id)}"'
+
+    async def get_page(
+        self, quiz_id: str, limit: int = 50, cursor: Optional[str] = None, mode: RankMode = RankMode.COMPETITION
+    ) -> Dict:
+        """
+        Get a page of a quiz's board, best first. `cursor` is the `next_cursor` of
+        the previous page, the sort key and username of its last entry.
+        """
+        after = None
+        if cursor:
+            composite, _, username = cursor.partition(":")
+            after = (int(composite), username)
+        items, last = await ranking_service.get_page_after(quiz_id, after, limit, mode)
+        return {
+            "quiz_id": quiz_id,
+            "items": items,
+            "next_cursor": f"{last[0]}:{last[1]}" if last and len(items) == limit else None,
+        }
+
+    async def get_around(
+        self, quiz_id: str, username: str, window: int = 5, mode: RankMode = RankMode.COMPETITION
+    ) -> Optional[Dict]:
+        """
+        Get a user's rank plus up to `window` entries above and below them, in
+        O(log n + window). The rank and the window are separate reads, so the window
+        is read again if the user moved out of it in between, at most AROUND_ATTEMPTS
+        times; None if they are not on the board or never stayed put long enough.
+        """
+        for _ in range(self.AROUND_ATTEMPTS):
+            position = await ranking_service.get_rank(quiz_id, username, RankMode.ORDINAL)
+            if position is None:
+                return None
+            start = max(position[0] - 1 - window, 0)
+            items = await ranking_service.get_page(quiz_id, start, position[0] - start + window, mode)
+            user = next((item for item in items if item["username"] == username), None)
+            if user is not None:
+                return {"quiz_id": quiz_id, "user": user, "items": items}
+        return None
+
+    async def get_user_rank(
+        self, quiz_id: str, username: str, mode: RankMode = RankMode.COMPETITION
+    ) -> Optional[Dict]:
+        """Get a user's rank and score in O(log n), or None if not on the leaderboard"""
+        result = await ranking_service.get_rank(quiz_id, username, mode)
+        if result is None:
+            return None
+        rank, score = result
+        return {"username": username, "score": score, "rank": rank}
+
     async def broadcast_leaderboard(self, quiz_id: str, active_connections: Dict[str, List]):
-        """Broadcast leaderboard to all connected clients"""
+        """
+        Ask for the leaderboard to reach all connected clients. The quiz's elected
+        publisher notices the change within PUBLISH_INTERVAL; this only makes sure
+        this process takes part in the election.
+        """
+        if quiz_id in active_connections:
+            self._ensure_listener(quiz_id)
+
+    async def _run_publisher(self):
+        """Hold publisher leases for local quizzes and publish the boards they lead"""
+        renewed_at = 0.0
+        try:
+            while self._listeners or self._leading:
+                try:
+                    if time.monotonic() - renewed_at >= self.LEASE_RENEW_INTERVAL:
+                        await self._renew_leases()
+                        renewed_at = time.monotonic()
+                    for quiz_id in list(self._leading):
+                        await self._publish_if_changed(quiz_id)
+                except Exception as e:
+                    print(f"Error in leaderboard publisher: {str(e)}")
+                await asyncio.sleep(self.PUBLISH_INTERVAL)
+        finally:
+            self._publisher = None
+
+    async def _renew_leases(self):
+        """Renew or take the lease of every local quiz and give up the rest"""
+        redis = await get_redis()
+        local = list(self._listeners)
+        released = [quiz_id for quiz_id in self._leading if quiz_id not in self._listeners]
+
+        acquire = redis.register_script(ACQUIRE_LEASE_SCRIPT)
+        release = redis.register_script(RELEASE_LEASE_SCRIPT)
+        pipe = redis.pipeline(transaction=False)
+        for quiz_id in local:
+            await acquire(
+                keys=[self.LEADER_KEY.format(quiz_id=quiz_id)],
+                args=[self._leader_id, self.LEASE_TIME_MS],
+                client=pipe,
+            )
+        for quiz_id in released:
+            await release(keys=[self.LEADER_KEY.format(quiz_id=quiz_id)], args=[self._leader_id], client=pipe)
+        results = await pipe.execute()
+
+        self._leading = {quiz_id for quiz_id, held in zip(local, results) if held}
+        for quiz_id in released:
+            self._published.pop(quiz_id, None)
+
+    async def _publish_if_changed(self, quiz_id: str):
+        """Publish the leaderboard, unless it hasn't changed since this process last did"""
         try:
-            print(f'Active connections: {active_connections.items()}')
-            if quiz_id not in active_connections:
+            # Reading the version is one GET; the board itself is only re-read and
+            # published when it changed since this process last published it
+            # Versions restart with every epoch, so compare both
+            published = (
+                await quiz_state_service.get_epoch(quiz_id),
+                await ranking_service.get_version(quiz_id),
+            )
+            if self._published.get(quiz_id) == published:
                 return
-            
+
             leaderboard = await self.get_leaderboard(quiz_id)
-            print(f"Leaderboard: {leaderboard}")
-            
-            # Create message
-            message = {
-                "type": "leaderboard_update",
-                "data": leaderboard
-            }
             
             # Publish to Redis channel
-            redis = await get_redis()
-            channel = self.LEADERBOARD_CHANNEL.format(quiz_id=quiz_id)
-            await redis.publish(channel, json.dumps(message))
+            await self._publish_event(quiz_id, "leaderboard_update", leaderboard)
+            self._published[quiz_id] = published
             
         except Exception as e:
             print(f"Error broadcasting leaderboard: {str(e)}")
@@ -0,0 +1,257 @@
+from typing import Dict, List, Optional, Set
+from tortoise.transactions import in_transaction
+from app.core.redis import get_redis
+from app.models.leaderboard import Leaderboard
+from app.models.question import Question
+from app.models.quiz import Quiz, QuizStatus
+from app.models.user import User
+from app.services.analytics import analytics_service
+from app.services.global_leaderboard import global_leaderboard_service
+from app.services.hot_queries import hot_query_service
+from app.services.quiz_state import quiz_state_service
+from app.services.ranking import ranking_service
+from app.services.score_events import score_event_service
+from app.services.scoring import scoring_service
+import asyncio
+import json
+
+
+class QuizContent:
+    """A started quiz's questions, pre-encoded, and its answer key"""
+
+    __slots__ = ("question_ids", "messages", "answer_ids", "correct_answers", "scope")
+
+    def __init__(
+        self,
+        question_ids: List[str],
+        messages: Dict[str, str],
+        answer_ids: Dict[str, Set[str]],
+        correct_answers: Dict[str, Set[str]],
+    ):
+        self.question_ids = question_ids
+        # question_id -> the "question" message sent to participants
+        self.messages = messages
+        # question_id -> ids of all its answers, and of its correct ones
+        self.answer_ids = answer_ids
+        self.correct_answers = correct_answers
+        # Epoch scope the quiz's Redis structures were last prepared for
+        self.scope: Optional[str] = None
+
+
+class QuizLifecycleService:
+    """
+    Reacts to a quiz moving between DRAFT, STARTED and ENDED, on every node.
+
+    - start: mark the quiz STARTED, create its Redis structures (question list, expiry
+      deadline) and tell every node to load its content, so the first joiners don't
+      race to fill caches and questions and answers are served from memory
+    - end: mark the quiz ENDED, apply its queued score events, publish pending
+      analytics, snapshot the final board to the leaderboards table, add it to the
+      global boards, shorten the live keys' TTL and tell every node to evict the
+      quiz's content
+    - on startup, quizzes that are already STARTED are loaded again
+
+    Nodes hear about changes on LIFECYCLE_CHANNEL. A quiz that is joined without being
+    started is loaded on first join instead.
+    """
+
+    def __init__(self):
+        self.LIFECYCLE_CHANNEL = "quiz:lifecycle"
+        self.SNAPSHOT_BATCH_SIZE = 1000
+        # quiz_id -> content of a quiz this process has loaded
+        self._content: Dict[str, QuizContent] = {}
+        self._loads: Dict[str, asyncio.Future] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def get_content(self, quiz_id: str) -> Optional[QuizContent]:
+        """A quiz's loaded content, or None if this process hasn't loaded it"""
+        return self._content.get(quiz_id)
+
+    def is_correct(self, quiz_id: str, question_id: str, answer_id: str) -> Optional[bool]:
+        """Check an answer from memory, or None if the quiz isn't loaded here"""
+        content = self._content.get(quiz_id)
+        if content is None or str(question_id) not in content.correct_answers:
+            return None
+        return str(answer_id) in content.correct_answers[str(question_id)]
+
+    def is_answer(self, quiz_id: str, question_id: str, answer_id: str) -> Optional[bool]:
+        """Whether an answer id is one of the question's answers, or None if the quiz isn't loaded here"""
+        content = self._content.get(quiz_id)
+        if content is None or str(question_id) not in content.answer_ids:
+            return None
+        return str(answer_id) in content.answer_ids[str(question_id)]
+
+    async def _load(self, quiz_id: str) -> QuizContent:
+        quiz = await hot_query_service.get_quiz_content(quiz_id)
+        questions = quiz.questions if quiz else []
+        messages = {
+            question.id: json.dumps({
+                "type": "question",
+                "data": {
+                    "id": question.id,
+                    "text": question.title,
+                    "time_limit": question.time_limit,
+                    "answers": [{"id": answer.id, "text": answer.text} for answer in question.answers],
+                },
+            })
+            for question in questions
+        }
+        answer_ids = {question.id: {answer.id for answer in question.answers} for question in questions}
+        correct_answers = {
+            question.id: {answer.id for answer in question.answers if answer.is_correct}
+            for question in questions
+        }
+        return QuizContent([question.id for question in questions], messages, answer_ids, correct_answers)
+
+    async def warm(self, quiz_id: str) -> QuizContent:
+        """
+        Load a quiz's content into this process and prepare its Redis structures for
+        the current epoch. Cheap once done; concurrent callers share one load.
+        """
+        content = self._content.get(quiz_id)
+        if content is None:
+            loading = self._loads.get(quiz_id)
+            if loading is None:
+                loading = asyncio.ensure_future(self._load(quiz_id))
+                self._loads[quiz_id] = loading
+                loading.add_done_callback(lambda _: self._loads.pop(quiz_id, None))
+            content = self._content.setdefault(quiz_id, await asyncio.shield(loading))
+
+        scope = await quiz_state_service.scope(quiz_id)
+        if content.scope != scope:
+            await scoring_service.initialize_quiz_questions(quiz_id, content.question_ids)
+            await quiz_state_service.get_deadline(quiz_id)
+            content.scope = scope
+        return content
+
+    def evict(self, quiz_id: str) -> None:
+        """Drop everything this process holds in memory for a quiz"""
+        self._content.pop(quiz_id, None)
+        quiz_state_service.forget(quiz_id)
+
+    async def start(self, quiz: Quiz) -> QuizContent:
+        """Start a quiz and pre-load it on every node"""
+        if quiz.status != QuizStatus.STARTED:
+            quiz.status = QuizStatus.STARTED
+            await quiz.save(update_fields=["status", "updated_at"])
+        content = await self.warm(str(quiz.id))
+        await self._publish("started", str(quiz.id))
+        return content
+
+    async def end(self, quiz: Quiz) -> Dict:
+        """End a quiz, persist its results and evict it from every node"""
+        quiz_id = str(quiz.id)
+        if quiz.status != QuizStatus.ENDED:
+            quiz.status = QuizStatus.ENDED
+            await quiz.save(update_fields=["status", "updated_at"])
+
+        await score_event_service.drain(quiz_id)
+        await analytics_service.flush(quiz_id)
+        results = await self.snapshot_results(quiz_id)
+        recorded = await global_leaderboard_service.record_quiz_results(quiz_id)
+
+        content = self._content.get(quiz_id)
+        if content:
+            question_ids = content.question_ids
+        else:
+            question_ids = [str(q_id) for q_id in await Question.filter(quiz_id=quiz_id).values_list("id", flat=True)]
+        scope = await quiz_state_service.scope(quiz_id)
+        await quiz_state_service.end(quiz_id, [
+            *ranking_service.state_keys(scope),
+            *scoring_service.state_keys(scope),
+            *analytics_service.state_keys(scope, question_ids),
+        ])
+
+        self.evict(quiz_id)
+        await self._publish("ended", quiz_id)
+        return {"results": results, "recorded": recorded}
+
+    async def snapshot_results(self, quiz_id: str) -> int:
+        """Replace the quiz's rows in the leaderboards table with its final board"""
+        count = 0
+        async with in_transaction("default"):
+            await Leaderboard.filter(quiz_id=quiz_id).delete()
+            start = 0
+            while True:
+                page = await ranking_service.get_page(quiz_id, start, self.SNAPSHOT_BATCH_SIZE)
+                if not page:
+                    break
+                start += len(page)
+                user_ids = dict(await User.filter(
+                    username__in=[entry["username"] for entry in page]
+                ).values_list("username", "id"))
+                rows = [
+                    Leaderboard(
+                        quiz_id=quiz_id,
+                        user_id=user_ids[entry["username"]],
+                        score=entry["score"],
+                        rank=entry["rank"],
+                    )
+                    for entry in page
+                    if entry["username"] in user_ids
+                ]
+                await Leaderboard.bulk_create(rows)
+                count += len(rows)
+        return count
+
+    async def _publish(self, event: str, quiz_id: str) -> None:
+        try:
+            redis = await get_redis()
+            await redis.publish(self.LIFECYCLE_CHANNEL, json.dumps({"type": event, "quiz_id": quiz_id}))
+        except Exception as e:
+            print(f"Error publishing quiz {event} for quiz {quiz_id}: {str(e)}")
+
+    def start_listener(self):
+        """Re-warm STARTED quizzes, then follow lifecycle events, once per process"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop_listener(self):
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    async def rewarm(self) -> int:
+        """Load every quiz that is already STARTED, e.g. after a restart"""
+        quiz_ids = await Quiz.filter(status=QuizStatus.STARTED).values_list("id", flat=True)
+        for quiz_id in quiz_ids:
+            try:
+                await self.warm(str(quiz_id))
+            except Exception as e:
+                print(f"Error warming quiz {quiz_id}: {str(e)}")
+        return len(quiz_ids)
+
+    async def _listen(self):
+        redis = await get_redis()
+        pubsub = redis.pubsub()
+        try:
+            # Subscribe first, so a quiz started while re-warming isn't missed
+            await pubsub.subscribe(self.LIFECYCLE_CHANNEL)
+            await self.rewarm()
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                event = json.loads(message["data"])
+                try:
+                    if event["type"] == "started":
+                        await self.warm(event["quiz_id"])
+                    elif event["type"] == "ended":
+                        self.evict(event["quiz_id"])
+                except Exception as e:
+                    print(f"Error handling quiz {event['type']} for quiz {event['quiz_id']}: {str(e)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error in quiz lifecycle listener: {str(e)}")
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+
+
+# Create a singleton instance
+quiz_lifecycle_service = QuizLifecycleService()
@@ -0,0 +1,88 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import ValidationError
+from tortoise.transactions import in_transaction
+from app.models.quiz import Quiz
+from app.models.question import Question
+from app.models.answer import Answer
+from app.schemas.quiz import QuestionImport
+import uuid
+
+
+class QuizImportError(ValueError):
+    """A question in an import that failed validation"""
+
+    def __init__(self, record: int, message: str):
+        super().__init__(f"Question {record}: {message}")
+        self.record = record
+
+
+class QuizImportService:
+    """
+    Create a quiz from a stream of questions, however many there are.
+
+    Questions are validated one at a time as they arrive and written BATCH_SIZE at a
+    time with one bulk INSERT for the questions and one for their answers, instead of
+    a round trip per row. Only the current batch is held in memory. Everything runs
+    in one transaction, so an invalid question anywhere leaves no quiz behind.
+    """
+
+    def __init__(self):
+        self.BATCH_SIZE = 500
+
+    async def import_quiz(self, title: str, description: Optional[str], items: AsyncIterator[Any]) -> Dict[str, Any]:
+        """Create a DRAFT quiz with the questions in items, in the order they arrive"""
+        questions = 0
+        answers = 0
+        async with in_transaction("default"):
+            quiz = await Quiz.create(title=title, description=description)
+            batch: List[QuestionImport] = []
+            async for item in items:
+                questions += 1
+                try:
+                    batch.append(QuestionImport.model_validate(item))
+                except ValidationError as e:
+                    raise QuizImportError(questions, _describe(e))
+                if len(batch) >= self.BATCH_SIZE:
+                    answers += await self._insert(quiz, batch, questions - len(batch))
+                    batch = []
+            if batch:
+                answers += await self._insert(quiz, batch, questions - len(batch))
+        return {"quiz_id": str(quiz.id), "questions": questions, "answers": answers}
+
+    async def _insert(self, quiz: Quiz, batch: List[QuestionImport], first_order: int) -> int:
+        """Insert a batch of questions and their answers, returning the answer count"""
+        question_rows = []
+        answer_rows = []
+        for order, item in enumerate(batch, start=first_order + 1):
+            # Ids are generated here so answers can reference questions without a read back
+            question = Question(
+                id=uuid.uuid4(),
+                quiz_id=quiz.id,
+                title=item.title,
+                description=item.description,
+                image_url=item.image_url,
+                order=order,
+                time_limit=item.time_limit,
+                points=item.points,
+            )
+            question_rows.append(question)
+            for answer_order, answer in enumerate(item.answers, start=1):
+                answer_rows.append(Answer(
+                    question_id=question.id,
+                    text=answer.text,
+                    is_correct=answer.is_correct,
+                    order=answer_order,
+                ))
+        await Question.bulk_create(question_rows)
+        await Answer.bulk_create(answer_rows)
+        return len(answer_rows)
+
+
+def _describe(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+# Create a singleton instance
+quiz_import_service = QuizImportService()
@@ -0,0 +1,124 @@
+from typing import Dict, List, Tuple
+from tortoise.expressions import F
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.quiz import Quiz
+import time
+
+
+class QuizStateService:
+    """
+    Epoch and expiry of a quiz's live Redis state.
+
+    Every live key of a quiz is namespaced by the quiz's epoch: services format their
+    key patterns with scope(quiz_id), e.g. quiz:{quiz_id}:e{epoch}:leaderboard.
+    Resetting a quiz bumps the epoch, which is instant however much state the quiz
+    has; the keys of older epochs are unreachable from then on and are freed in the
+    background by the reclaimer. The epoch is stored on the quiz row and cached in
+    quiz:{quiz_id}:epoch.
+
+    The first participant to join an epoch fixes an absolute deadline,
+    QUIZ_STATE_LIVE_TTL from then, in quiz:{quiz_id}:e{epoch}:expires_at. Every live key
+    is EXPIREAT that deadline, so all of them expire together and activity never moves
+    it: an idle participant's state can't expire mid-quiz. Finalizing the quiz pulls the
+    deadline in to QUIZ_STATE_ENDED_TTL from then.
+    """
+
+    def __init__(self):
+        self.LIVE_TTL = settings.QUIZ_STATE_LIVE_TTL
+        self.ENDED_TTL = settings.QUIZ_STATE_ENDED_TTL
+        self.EPOCH_KEY = "quiz:{quiz_id}:epoch"
+        self.EPOCH_EXPIRATION_TIME = 60 * 60 * 24 * 7  # reloaded from the quiz row after
+        self.EXPIRES_AT_KEY = "quiz:{quiz_id}:expires_at"
+        self.RECLAIM_QUIZZES_KEY = "reclaim:quizzes"
+        # Cached values are re-read after this long, to notice changes made elsewhere
+        self.EPOCH_CACHE_TIME = 5  # seconds
+        self.DEADLINE_CACHE_TIME = 60  # seconds
+        # quiz_id -> (epoch, monotonic time it was read)
+        self._epochs: Dict[str, Tuple[int, float]] = {}
+        # scope -> (deadline, monotonic time it was read)
+        self._deadlines: Dict[str, Tuple[int, float]] = {}
+
+    async def get_epoch(self, quiz_id: str) -> int:
+        """Current epoch of a quiz, 0 until it is first reset"""
+        cached = self._epochs.get(quiz_id)
+        if cached and time.monotonic() - cached[1] < self.EPOCH_CACHE_TIME:
+            return cached[0]
+
+        redis = await get_redis()
+        key = self.EPOCH_KEY.format(quiz_id=quiz_id)
+        epoch = await redis.get(key)
+        if epoch is None:
+            stored = await Quiz.filter(id=quiz_id).values_list("epoch", flat=True)
+            epoch = stored[0] if stored else 0
+            await redis.set(key, epoch, ex=self.EPOCH_EXPIRATION_TIME, nx=True)
+        self.set_epoch(quiz_id, int(epoch))
+        return int(epoch)
+
+    def set_epoch(self, quiz_id: str, epoch: int) -> None:
+        """Update this process's cached epoch, e.g. when told about a reset"""
+        self._epochs[quiz_id] = (epoch, time.monotonic())
+
+    def forget(self, quiz_id: str) -> None:
+        """Drop this process's cached epoch and deadlines of a quiz"""
+        self._epochs.pop(quiz_id, None)
+        for scope in [scope for scope in self._deadlines if scope.startswith(f"{quiz_id}:")]:
+            del self._deadlines[scope]
+
+    async def scope(self, quiz_id: str) -> str:
+        """What to format a quiz's live key patterns with: quiz_id plus its current epoch"""
+        return f"{quiz_id}:e{await self.get_epoch(quiz_id)}"
+
+    async def reset(self, quiz_id: str) -> int:
+        """
+        Start a new epoch for a quiz and return it.
+
+        Costs one row update and a couple of Redis writes; the old epoch's keys and
+        answer attempts are queued for the reclaimer.
+        """
+        await Quiz.filter(id=quiz_id).update(epoch=F("epoch") + 1)
+        stored = await Quiz.filter(id=quiz_id).values_list("epoch", flat=True)
+        epoch = stored[0] if stored else 0
+
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=False)
+        pipe.set(self.EPOCH_KEY.format(quiz_id=quiz_id), epoch, ex=self.EPOCH_EXPIRATION_TIME)
+        pipe.sadd(self.RECLAIM_QUIZZES_KEY, quiz_id)
+        await pipe.execute()
+        self.set_epoch(quiz_id, epoch)
+        return epoch
+
+    async def get_deadline(self, quiz_id: str) -> int:
+        """Unix time the quiz's live keys expire at, starting the clock on first use"""
+        scope = await self.scope(quiz_id)
+        cached = self._deadlines.get(scope)
+        if cached and time.monotonic() - cached[1] < self.DEADLINE_CACHE_TIME and cached[0] > time.time():
+            return cached[0]
+
+        redis = await get_redis()
+        key = self.EXPIRES_AT_KEY.format(quiz_id=scope)
+        deadline = int(time.time()) + self.LIVE_TTL
+        pipe = redis.pipeline(transaction=True)
+        pipe.set(key, deadline, nx=True, exat=deadline)
+        pipe.get(key)
+        _, current = await pipe.execute()
+        deadline = int(current)
+        self._deadlines[scope] = (deadline, time.monotonic())
+        return deadline
+
+    async def end(self, quiz_id: str, keys: List[str]) -> int:
+        """Expire a finished quiz's keys QUIZ_STATE_ENDED_TTL from now and return that time"""
+        scope = await self.scope(quiz_id)
+        redis = await get_redis()
+        deadline = int(time.time()) + self.ENDED_TTL
+        pipe = redis.pipeline(transaction=False)
+        pipe.set(self.EXPIRES_AT_KEY.format(quiz_id=scope), deadline, exat=deadline)
+        for key in keys:
+            pipe.expireat(key, deadline)
+        await pipe.execute()
+        self._deadlines[scope] = (deadline, time.monotonic())
+        return deadline
+
+
+# Create a singleton instance
+quiz_state_service = QuizStateService()
@@ -0,0 +1,657 @@
+from typing import List, Dict, Iterable, Optional, Tuple
+from enum import Enum
+from app.core.config import settings
+from app.core.ranked_index import RankedIndex
+from app.core.redis import get_redis
+from app.services.quiz_state import quiz_state_service
+import itertools
+import time
+import uuid
+
+
+class RankMode(str, Enum):
+    COMPETITION = "competition"  # Ties share a rank, next rank skips: 1, 1, 3
+    DENSE = "dense"              # Ties share a rank, no gaps: 1, 1, 2
+    ORDINAL = "ordinal"          # Unique ranks, earlier answer wins ties: 1, 2, 3
+
+
+# Composite sort key: points in the high bits, inverted time since quiz start in the
+# low 32 bits, so a higher score ranks first and, for equal scores, whoever reached
+# it earlier ranks first. Redis scores are doubles, so points must stay below 2^21.
+TIME_BITS = 32
+TIME_SCALE = 1 << TIME_BITS
+MAX_TIME_OFFSET = TIME_SCALE - 1
+
+
+def encode_score(points: int, elapsed_ms: int) -> int:
+    """Build the composite sort key for a score reached elapsed_ms after quiz start"""
+    elapsed_ms = min(max(int(elapsed_ms), 0), MAX_TIME_OFFSET)
+    return points * TIME_SCALE + (MAX_TIME_OFFSET - elapsed_ms)
+
+
+def decode_points(composite) -> int:
+    """Extract the points from a composite sort key"""
+    return int(float(composite)) // TIME_SCALE
+
+
+# KEYS: leaderboard zset, distinct scores zset, score counts hash, quiz start key, version
+# ARGV: member, points delta, now in ms, unix time the keys expire at, only-if-new flag
+# Returns the member's points after the update.
+UPDATE_SCORE_SCRIPT = """
+local scale = 4294967296
+local member = ARGV[1]
+local delta = tonumber(ARGV[2])
+local now_ms = tonumber(ARGV[3])
+local expire_at = tonumber(ARGV[4])
+local only_new = ARGV[5] == '1'
+
+redis.call('SET', KEYS[4], now_ms, 'NX')
+local started = tonumber(redis.call('GET', KEYS[4]))
+
+local old = redis.call('ZSCORE', KEYS[1], member)
+local old_points = 0
+local old_elapsed = 0
+if old then
+    old_points = math.floor(tonumber(old) / scale)
+    old_elapsed = scale - 1 - (tonumber(old) % scale)
+    if only_new or delta == 0 then
+        return old_points
+    end
+    local left = redis.call('HINCRBY', KEYS[3], old_points, -1)
+    if left <= 0 then
+        redis.call('HDEL', KEYS[3], old_points)
+        redis.call('ZREM', KEYS[2], old_points)
+    end
+end
+
+local new_points = old_points + delta
+-- Keep the latest time, so updates applied out of order rank the same
+local elapsed = math.min(math.max(now_ms - started, old_elapsed, 0), scale - 1)
+local composite = new_points * scale + (scale - 1 - elapsed)
+
+redis.call('ZADD', KEYS[1], string.format('%.0f', composite), member)
+redis.call('HINCRBY', KEYS[3], new_points, 1)
+redis.call('ZADD', KEYS[2], new_points, new_points)
+redis.call('INCR', KEYS[5])
+if expire_at > 0 then
+    for i = 1, 5 do
+        redis.call('EXPIREAT', KEYS[i], expire_at)
+    end
+end
+return new_points
+"""
+
+# KEYS: as UPDATE_SCORE_SCRIPT, then the stream the event was read from
+# ARGV: as UPDATE_SCORE_SCRIPT, then the consumer group and the event's entry id
+# Applies a streamed score event only if this call is the one acknowledging it, so an
+# event redelivered to another consumer is never counted twice. Returns -1 if skipped.
+APPLY_SCORE_EVENT_SCRIPT = """
+if redis.call('XACK', KEYS[6], ARGV[6], ARGV[7]) == 0 then
+    return -1
+end
+""" + UPDATE_SCORE_SCRIPT
+
+# KEYS: leaderboard zset, distinct scores zset, score counts hash, version
+# ARGV: member
+REMOVE_MEMBER_SCRIPT = """
+local scale = 4294967296
+local old = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not old then
+    return 0
+end
+local old_points = math.floor(tonumber(old) / scale)
+redis.call('ZREM', KEYS[1], ARGV[1])
+local left = redis.call('HINCRBY', KEYS[3], old_points, -1)
+if left <= 0 then
+    redis.call('HDEL', KEYS[3], old_points)
+    redis.call('ZREM', KEYS[2], old_points)
+end
+redis.call('INCR', KEYS[4])
+return 1
+"""
+
+# KEYS: a board sorted set
+# ARGV: cursor score ('' for the top), cursor member, limit, 'after' or 'before'
+# Rows are ordered by score then member, both descending, which is the order Redis
+# itself uses for ZREVRANGE. Equal scores can be common (a whole quiz is ingested into
+# the global boards with one timestamp), so the cursor's place inside a block of ties
+# is binary searched.
+PAGE_SCRIPT = """
+local score = ARGV[1]
+local member = ARGV[2]
+local limit = tonumber(ARGV[3])
+local start = 0
+if score ~= '' then
+    start = redis.call('ZCOUNT', KEYS[1], '(' .. score, '+inf')
+    local lo = start
+    local hi = start + redis.call('ZCOUNT', KEYS[1], score, score)
+    while lo < hi do
+        local mid = math.floor((lo + hi) / 2)
+        local m = redis.call('ZREVRANGE', KEYS[1], mid, mid)[1]
+        if m > member or (ARGV[4] == 'after' and m == member) then
+            lo = mid + 1
+        else
+            hi = mid
+        end
+    end
+    start = lo
+end
+if ARGV[4] == 'before' then
+    if start == 0 then
+        return {}
+    end
+    return redis.call('ZREVRANGE', KEYS[1], math.max(start - limit, 0), start - 1, 'WITHSCORES')
+end
+return redis.call('ZREVRANGE', KEYS[1], start, start + limit - 1, 'WITHSCORES')
+"""
+
+
+class RankingService:
+    """
+    Ranked score index for a quiz, kept in Redis.
+
+    - quiz:{scope}:leaderboard         zset of username -> composite sort key
+    - quiz:{scope}:leaderboard:scores  zset of distinct point values, for dense ranks
+    - quiz:{scope}:leaderboard:counts  hash of point value -> number of users on it
+    - quiz:{scope}:started_at          ms timestamp the time tiebreak is relative to
+    - quiz:{scope}:leaderboard:version bumped on every change, so unchanged boards can be skipped
+
+    where scope is the quiz id and its current epoch (see QuizStateService).
+
+    Every rank lookup is a ZREVRANK or ZCOUNT, i.e. O(log n), and reading a page of
+    the board is O(log n + k); nothing is sorted in Python. All keys expire with the
+    quiz's lifecycle deadline (see QuizStateService).
+    """
+
+    def __init__(self):
+        self.LEADERBOARD_KEY = "quiz:{quiz_id}:leaderboard"
+        self.DISTINCT_SCORES_KEY = "quiz:{quiz_id}:leaderboard:scores"
+        self.SCORE_COUNTS_KEY = "quiz:{quiz_id}:leaderboard:counts"
+        self.QUIZ_STARTED_AT_KEY = "quiz:{quiz_id}:started_at"
+        self.VERSION_KEY = "quiz:{quiz_id}:leaderboard:version"
+        # Staging keys of replace_board outlive an interrupted rebuild by this long
+        self.STAGING_TTL = 60 * 60  # 1 hour
+
+    def state_keys(self, scope: str) -> List[str]:
+        """Every Redis key holding the board of a quiz epoch"""
+        return self._keys(scope)
+
+    def _keys(self, scope: str) -> List[str]:
+        return [
+            self.LEADERBOARD_KEY.format(quiz_id=scope),
+            self.DISTINCT_SCORES_KEY.format(quiz_id=scope),
+            self.SCORE_COUNTS_KEY.format(quiz_id=scope),
+            self.QUIZ_STARTED_AT_KEY.format(quiz_id=scope),
+            self.VERSION_KEY.format(quiz_id=scope),
+        ]
+
+    async def _update(self, quiz_id: str, username: str, delta: int, only_new: bool) -> int:
+        redis = await get_redis()
+        script = redis.register_script(UPDATE_SCORE_SCRIPT)
+        now_ms = int(time.time() * 1000)
+        expire_at = await quiz_state_service.get_deadline(quiz_id)
+        points = await script(
+            keys=self._keys(await quiz_state_service.scope(quiz_id)),
+            args=[username, delta, now_ms, expire_at, 1 if only_new else 0],
+        )
+        return int(points)
+
+    async def add_participant(self, quiz_id: str, username: str) -> None:
+        """Put a user on the board with 0 points, unless already there"""
+        await self._update(quiz_id, username, 0, only_new=True)
+
+    async def add_points(self, quiz_id: str, username: str, points: int) -> int:
+        """Add points to a user's score and return the new total"""
+        return await self._update(quiz_id, username, points, only_new=False)
+
+    async def apply_score_events(
+        self, stream: str, group: str, events: Iterable[Tuple[str, str, str, int, int]]
+    ) -> int:
+        """
+        Apply (entry id, quiz_id, username, points, at_ms) events read from a stream
+        consumer group, acknowledging each, in one round trip. at_ms is when the points
+        were scored, for the time tiebreak. Returns how many were applied; events
+        already acknowledged elsewhere are skipped.
+        """
+        redis = await get_redis()
+        script = redis.register_script(APPLY_SCORE_EVENT_SCRIPT)
+        pipe = redis.pipeline(transaction=False)
+        queued = 0
+        for entry_id, quiz_id, username, points, at_ms in events:
+            await script(
+                keys=self._keys(await quiz_state_service.scope(quiz_id)) + [stream],
+                args=[username, points, at_ms, await quiz_state_service.get_deadline(quiz_id), 0, group, entry_id],
+                client=pipe,
+            )
+            queued += 1
+        if not queued:
+            return 0
+        return sum(1 for result in await pipe.execute() if int(result) >= 0)
+
+    async def remove_participant(self, quiz_id: str, username: str) -> None:
+        """Take a user off the board"""
+        redis = await get_redis()
+        script = redis.register_script(REMOVE_MEMBER_SCRIPT)
+        keys = self._keys(await quiz_state_service.scope(quiz_id))
+        await script(keys=keys[:3] + keys[4:], args=[username])
+
+    async def get_points(self, quiz_id: str, username: str) -> Optional[int]:
+        """Get a user's points, or None if they are not on the board"""
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        composite = await redis.zscore(self.LEADERBOARD_KEY.format(quiz_id=scope), username)
+        return None if composite is None else decode_points(composite)
+
+    async def _rank_for_points(self, redis, scope: str, points: int, mode: RankMode) -> int:
+        """Rank of the first user holding `points`, in O(log n)"""
+        if mode == RankMode.DENSE:
+            higher = await redis.zcount(
+                self.DISTINCT_SCORES_KEY.format(quiz_id=scope), f"({points}", "+inf"
+            )
+        else:
+            higher = await redis.zcount(
+                self.LEADERBOARD_KEY.format(quiz_id=scope), (points + 1) * TIME_SCALE, "+inf"
+            )
+        return higher + 1
+
+    async def get_rank(
+        self, quiz_id: str, username: str, mode: RankMode = RankMode.COMPETITION
+    ) -> Optional[Tuple[int, int]]:
+        """Get a user's (rank, points), or None if they are not on the board"""
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        leaderboard_key = self.LEADERBOARD_KEY.format(quiz_id=scope)
+        if mode == RankMode.ORDINAL:
+            rank = await redis.zrevrank(leaderboard_key, username)
+            if rank is None:
+                return None
+            composite = await redis.zscore(leaderboard_key, username)
+            return rank + 1, decode_points(composite)
+
+        composite = await redis.zscore(leaderboard_key, username)
+        if composite is None:
+            return None
+        points = decode_points(composite)
+        return await self._rank_for_points(redis, scope, points, mode), points
+
+    async def get_page(
+        self, quiz_id: str, start: int = 0, limit: int = -1, mode: RankMode = RankMode.COMPETITION
+    ) -> List[Dict]:
+        """
+        Get a slice of the board, best first, with ranks.
+
+        Ranks are worked out from the rank of the first entry (one ZCOUNT) and the
+        point changes down the page, so the cost is O(log n + k).
+        """
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        end = -1 if limit < 0 else start + limit - 1
+        rows = await redis.zrevrange(
+            self.LEADERBOARD_KEY.format(quiz_id=scope), start, end, withscores=True
+        )
+        if not rows:
+            return []
+
+        page = []
+        previous_points = None
+        rank = 0
+        for offset, (username, composite) in enumerate(rows):
+            points = decode_points(composite)
+            if mode == RankMode.ORDINAL:
+                rank = start + offset + 1
+            elif previous_points is None:
+                rank = await self._rank_for_points(redis, scope, points, mode)
+            elif points != previous_points:
+                rank = rank + 1 if mode == RankMode.DENSE else start + offset + 1
+            previous_points = points
+            page.append({"username": username, "score": points, "rank": rank})
+        return page
+
+    async def get_page_after(
+        self,
+        quiz_id: str,
+        after: Optional[Tuple[int, str]] = None,
+        limit: int = 50,
+        mode: RankMode = RankMode.COMPETITION,
+    ) -> Tuple[List[Dict], Optional[Tuple[int, str]]]:
+        """
+        Get up to `limit` entries ranked below the (composite, username) position
+        `after`, or from the top, plus the position of the last one to continue from.
+
+        Unlike an offset, a position stays put while scores change between pages, so
+        no entry is skipped or repeated for moving. Costs O(log n + k): the position is
+        found with a ZCOUNT, and ranks take one ZCOUNT per distinct score on the page.
+        """
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        leaderboard_key = self.LEADERBOARD_KEY.format(quiz_id=scope)
+        script = redis.register_script(PAGE_SCRIPT)
+        flat = await script(
+            keys=[leaderboard_key],
+            args=[str(after[0]) if after else "", after[1] if after else "", limit, "after"],
+        )
+        rows = [(flat[i], int(float(flat[i + 1]))) for i in range(0, len(flat), 2)]
+        if not rows:
+            return [], None
+
+        pipe = redis.pipeline(transaction=False)
+        if mode == RankMode.ORDINAL:
+            pipe.zrevrank(leaderboard_key, rows[0][0])
+        else:
+            distinct = sorted({decode_points(composite) for _, composite in rows}, reverse=True)
+            for points in distinct:
+                if mode == RankMode.DENSE:
+                    pipe.zcount(self.DISTINCT_SCORES_KEY.format(quiz_id=scope), f"({points}", "+inf")
+                else:
+                    pipe.zcount(leaderboard_key, (points + 1) * TIME_SCALE, "+inf")
+        results = await pipe.execute()
+
+        if mode == RankMode.ORDINAL:
+            # The first row may have moved since; ranks stay consecutive from wherever it is now
+            first = results[0] if results[0] is not None else 0
+            ranks = [first + offset + 1 for offset in range(len(rows))]
+        else:
+            rank_for = {points: higher + 1 for points, higher in zip(distinct, results)}
+            ranks = [rank_for[decode_points(composite)] for _, composite in rows]
+        page = [
+            {"username": username, "score": decode_points(composite), "rank": rank}
+            for (username, composite), rank in zip(rows, ranks)
+        ]
+        return page, rows[-1][::-1]
+
+    async def count(self, quiz_id: str) -> int:
+        """Number of users on the board"""
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        return await redis.zcard(self.LEADERBOARD_KEY.format(quiz_id=scope))
+
+    async def get_version(self, quiz_id: str) -> int:
+        """Counter bumped on every change to the board, 0 if it was never written"""
+        redis = await get_redis()
+        scope = await quiz_state_service.scope(quiz_id)
+        return int(await redis.get(self.VERSION_KEY.format(quiz_id=scope)) or 0)
+
+    async def replace_board(
+        self,
+        quiz_id: str,
+        entries: Iterable[Tuple[str, int, int]],
+        started_at_ms: int,
+        batch_size: int = 5000,
+    ) -> int:
+        """
+        Rebuild a quiz's board from (username, points, elapsed_ms) entries and swap it in.
+
+        The new board is written to staging keys in batches while the live board keeps
+        serving reads, then all keys are RENAMEd over the live ones in one MULTI/EXEC,
+        so readers see either the old board or the new one, never a mix.
+        Points added to the live board while the new one is built are lost, so only
+        call this on a board nothing is scoring on (an ENDED quiz, or one not started).
+        Staging keys expire after STAGING_TTL, in case the rebuild dies half way.
+        Returns the number of users on the new board.
+        """
+        redis = await get_redis()
+        live_keys = self._keys(await quiz_state_service.scope(quiz_id))
+        expire_at = await quiz_state_service.get_deadline(quiz_id)
+        token = uuid.uuid4().hex
+        staging_keys = [f"{key}:staging:{token}" for key in live_keys]
+
+        async def stage(write) -> None:
+            pipe = redis.pipeline(transaction=False)
+            write(pipe)
+            for staging_key in staging_keys[:3]:
+                pipe.expire(staging_key, self.STAGING_TTL)
+            await pipe.execute()
+
+        counts: Dict[int, int] = {}
+        batch: Dict[str, int] = {}
+        for username, points, elapsed_ms in entries:
+            batch[username] = encode_score(points, elapsed_ms)
+            counts[points] = counts.get(points, 0) + 1
+            if len(batch) >= batch_size:
+                await stage(lambda pipe, batch=batch: pipe.zadd(staging_keys[0], batch))
+                batch = {}
+        if batch:
+            await stage(lambda pipe: pipe.zadd(staging_keys[0], batch))
+
+        pipe = redis.pipeline(transaction=True)
+        if counts:
+            await stage(lambda pipe: (
+                pipe.zadd(staging_keys[1], {str(points): points for points in counts}),
+                pipe.hset(staging_keys[2], mapping=counts),
+            ))
+            for staging_key, live_key in zip(staging_keys[:3], live_keys[:3]):
+                pipe.rename(staging_key, live_key)
+        else:
+            pipe.delete(*live_keys[:3])
+        pipe.set(live_keys[3], started_at_ms)
+        pipe.incr(live_keys[4])
+        for live_key in live_keys:
+            pipe.expireat(live_key, expire_at)
+        await pipe.execute()
+        return sum(counts.values())
+
+    async def clear(self, quiz_id: str) -> None:
+        """Drop the whole board for a quiz"""
+        redis = await get_redis()
+        keys = self._keys(await quiz_state_service.scope(quiz_id))
+        pipe = redis.pipeline(transaction=True)
+        pipe.delete(*keys[:4])
+        # Keep counting up, so a cached version never matches the emptied board
+        pipe.incr(keys[4])
+        pipe.expireat(keys[4], await quiz_state_service.get_deadline(quiz_id))
+        await pipe.execute()
+
+
+class _MemoryBoard:
+    __slots__ = ("index", "distinct", "counts", "started_at_ms", "expires_at", "version")
+
+    def __init__(self, started_at_ms: int):
+        self.index = RankedIndex()     # username -> (-points, elapsed_ms)
+        self.distinct = RankedIndex()  # points -> -points, for dense ranks
+        self.counts: Dict[int, int] = {}
+        self.started_at_ms = started_at_ms
+        self.expires_at = 0.0
+        self.version = 0
+
+    def add_points_value(self, points: int) -> None:
+        self.counts[points] = self.counts.get(points, 0) + 1
+        if self.counts[points] == 1:
+            self.distinct.set(points, -points)
+
+    def drop_points_value(self, points: int) -> None:
+        self.counts[points] -= 1
+        if not self.counts[points]:
+            del self.counts[points]
+            self.distinct.remove(points)
+
+
+class MemoryRankingService:
+    """
+    Same interface as RankingService, kept in this process's memory.
+
+    Used when LEADERBOARD_STORAGE=memory, to keep a single worker's quiz boards in
+    process memory. Only the boards move: quiz state, answered questions, sessions,
+    analytics and pub/sub still live in Redis, which must be running. Each board is
+    a RankedIndex ordered by (-points, elapsed_ms), the same order as the Redis
+    composite key, so updates, rank lookups and top-K pages are all O(log n) (plus k
+    for a page). Boards are dropped after QUIZ_STATE_LIVE_TTL without writes.
+    """
+
+    def __init__(self):
+        self.EXPIRATION_TIME = settings.QUIZ_STATE_LIVE_TTL
+        self._boards: Dict[str, _MemoryBoard] = {}
+        self._next_sweep = 0.0
+        # Shared by all boards, so a recreated board never reuses an old version
+        self._versions = itertools.count(1)
+
+    def _board(self, quiz_id: str, create: bool = False) -> Optional[_MemoryBoard]:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.EXPIRATION_TIME
+            for expired in [key for key, board in self._boards.items() if board.expires_at <= now]:
+                del self._boards[expired]
+
+        board = self._boards.get(quiz_id)
+        if board is not None and board.expires_at <= now:
+            del self._boards[quiz_id]
+            board = None
+        if board is None and create:
+            board = self._boards[quiz_id] = _MemoryBoard(int(time.time() * 1000))
+        if board is not None and create:
+            board.expires_at = now + self.EXPIRATION_TIME
+        return board
+
+    async def _update(self, quiz_id: str, username: str, delta: int, only_new: bool) -> int:
+        board = self._board(quiz_id, create=True)
+        key = board.index.key_of(username)
+        old_points = 0
+        if key is not None:
+            old_points = -key[0]
+            if only_new or delta == 0:
+                return old_points
+            board.drop_points_value(old_points)
+
+        new_points = old_points + delta
+        elapsed_ms = min(max(int(time.time() * 1000) - board.started_at_ms, 0), MAX_TIME_OFFSET)
+        board.index.set(username, (-new_points, elapsed_ms))
+        board.add_points_value(new_points)
+        board.version = next(self._versions)
+        return new_points
+
+    async def add_participant(self, quiz_id: str, username: str) -> None:
+        """Put a user on the board with 0 points, unless already there"""
+        await self._update(quiz_id, username, 0, only_new=True)
+
+    async def add_points(self, quiz_id: str, username: str, points: int) -> int:
+        """Add points to a user's score and return the new total"""
+        return await self._update(quiz_id, username, points, only_new=False)
+
+    async def remove_participant(self, quiz_id: str, username: str) -> None:
+        """Take a user off the board"""
+        board = self._board(quiz_id)
+        if board is None:
+            return
+        key = board.index.key_of(username)
+        if key is not None:
+            board.index.remove(username)
+            board.drop_points_value(-key[0])
+            board.version = next(self._versions)
+
+    async def get_points(self, quiz_id: str, username: str) -> Optional[int]:
+        """Get a user's points, or None if they are not on the board"""
+        board = self._board(quiz_id)
+        key = board.index.key_of(username) if board else None
+        return None if key is None else -key[0]
+
+    def _rank_for_points(self, board: _MemoryBoard, points: int, mode: RankMode) -> int:
+        if mode == RankMode.DENSE:
+            return board.distinct.rank(points) + 1
+        return board.index.count_below((-points,)) + 1
+
+    async def get_rank(
+        self, quiz_id: str, username: str, mode: RankMode = RankMode.COMPETITION
+    ) -> Optional[Tuple[int, int]]:
+        """Get a user's (rank, points), or None if they are not on the board"""
+        board = self._board(quiz_id)
+        key = board.index.key_of(username) if board else None
+        if key is None:
+            return None
+        points = -key[0]
+        if mode == RankMode.ORDINAL:
+            return board.index.rank(username) + 1, points
+        return self._rank_for_points(board, points, mode), points
+
+    async def get_page(
+        self, quiz_id: str, start: int = 0, limit: int = -1, mode: RankMode = RankMode.COMPETITION
+    ) -> List[Dict]:
+        """Get a slice of the board, best first, with ranks"""
+        board = self._board(quiz_id)
+        if board is None:
+            return []
+        rows = board.index.slice(start, None if limit < 0 else start + limit)
+
+        page = []
+        previous_points = None
+        rank = 0
+        for offset, (username, key) in enumerate(rows):
+            points = -key[0]
+            if mode == RankMode.ORDINAL:
+                rank = start + offset + 1
+            elif previous_points is None:
+                rank = self._rank_for_points(board, points, mode)
+            elif points != previous_points:
+                rank = rank + 1 if mode == RankMode.DENSE else start + offset + 1
+            previous_points = points
+            page.append({"username": username, "score": points, "rank": rank})
+        return page
+
+    async def get_page_after(
+        self,
+        quiz_id: str,
+        after: Optional[Tuple[int, str]] = None,
+        limit: int = 50,
+        mode: RankMode = RankMode.COMPETITION,
+    ) -> Tuple[List[Dict], Optional[Tuple[int, str]]]:
+        """
+        Get up to `limit` entries ranked below the (composite, username) position
+        `after`, or from the top, plus the position of the last one to continue from
+        """
+        board = self._board(quiz_id)
+        if board is None:
+            return [], None
+        start = 0
+        if after is not None:
+            composite, username = after
+            key = (-decode_points(composite), MAX_TIME_OFFSET - composite % TIME_SCALE)
+            start = board.index.count_through(key, username)
+        page = await self.get_page(quiz_id, start, limit, mode)
+        if not page:
+            return [], None
+        last = page[-1]["username"]
+        points, elapsed_ms = board.index.key_of(last)
+        return page, (encode_score(-points, elapsed_ms), last)
+
+    def state_keys(self, scope: str) -> List[str]:
+        """Boards live in memory, so there are no Redis keys to expire"""
+        return []
+
+    async def count(self, quiz_id: str) -> int:
+        """Number of users on the board"""
+        board = self._board(quiz_id)
+        return len(board.index) if board else 0
+
+    async def get_version(self, quiz_id: str) -> int:
+        """Counter bumped on every change to the board, 0 if there is no board"""
+        board = self._board(quiz_id)
+        return board.version if board else 0
+
+    async def replace_board(
+        self,
+        quiz_id: str,
+        entries: Iterable[Tuple[str, int, int]],
+        started_at_ms: int,
+        batch_size: int = 5000,
+    ) -> int:
+        """Rebuild a quiz's board from (username, points, elapsed_ms) entries and swap it in"""
+        board = _MemoryBoard(started_at_ms)
+        for username, points, elapsed_ms in entries:
+            old = board.index.key_of(username)
+            if old is not None:
+                board.drop_points_value(-old[0])
+            board.index.set(username, (-points, min(max(int(elapsed_ms), 0), MAX_TIME_OFFSET)))
+            board.add_points_value(points)
+        board.expires_at = time.monotonic() + self.EXPIRATION_TIME
+        board.version = next(self._versions)
+        self._boards[quiz_id] = board
+        return len(board.index)
+
+    async def clear(self, quiz_id: str) -> None:
+        """Drop the whole board for a quiz"""
+        self._boards.pop(quiz_id, None)
+
+
+# Create a singleton instance
+if settings.LEADERBOARD_STORAGE == "memory":
+    ranking_service = MemoryRankingService()
+else:
+    ranking_service = RankingService()
@@ -0,0 +1,155 @@
+from typing import Dict, Optional
+from datetime import datetime, timezone
+from tortoise.transactions import in_transaction
+from app.core.redis import get_redis
+from app.models.answer_attempt import AnswerAttempt
+from app.services.quiz_state import quiz_state_service
+import asyncio
+import json
+import re
+import time
+
+# Deletes one bounded batch of a quiz's attempts from past epochs; the caller loops
+# until a batch comes back short, so no single statement holds locks for long.
+PURGE_ATTEMPTS_SQL = """DELETE FROM answer_attempts
+WHERE id IN (
+    SELECT id FROM answer_attempts WHERE quiz_id = $1 AND epoch < $2 LIMIT $3
+)
+"""
+
+
+class ReclaimerService:
+    """
+    Background cleanup of state that resets made unreachable.
+
+    Resets never delete anything on the request path (see QuizStateService), they
+    only queue work here:
+
+    - reclaim:quizzes       set of quiz ids whose past epochs still hold Redis keys
+                            or answer attempts
+    - reclaim:participants  list of {quiz_id, user_id, before} records, one per user
+                            who started a quiz over
+
+    Every RECLAIM_INTERVAL each process drains both queues: past-epoch keys are found
+    with SCAN and UNLINKed (freed off Redis's main thread), attempts are deleted in
+    batches of DELETE_BATCH_SIZE rows, yielding to the event loop in between. Work
+    that fails is queued again for the next round.
+    """
+
+    def __init__(self):
+        self.RECLAIM_INTERVAL = 30  # seconds
+        self.SCAN_COUNT = 500
+        self.UNLINK_BATCH_SIZE = 500
+        self.DELETE_BATCH_SIZE = 5000
+        self.PARTICIPANT_BATCH_SIZE = 100
+        self.RECLAIM_QUIZZES_KEY = quiz_state_service.RECLAIM_QUIZZES_KEY
+        self.RECLAIM_PARTICIPANTS_KEY = "reclaim:participants"
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start reclaiming in the background, once per process"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background loop, abandoning (not losing) queued work"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error reclaiming quiz state: {str(e)}")
+            await asyncio.sleep(self.RECLAIM_INTERVAL)
+
+    async def enqueue_participant(self, quiz_id: str, user_id: str) -> None:
+        """Queue the deletion of a user's attempts made in a quiz until now"""
+        redis = await get_redis()
+        await redis.rpush(
+            self.RECLAIM_PARTICIPANTS_KEY,
+            json.dumps({"quiz_id": str(quiz_id), "user_id": str(user_id), "before": time.time()}),
+        )
+
+    async def run_once(self) -> Dict[str, int]:
+        """Drain both queues once and return how much was reclaimed"""
+        redis = await get_redis()
+        totals = {"quizzes": 0, "keys": 0, "attempts": 0, "participants": 0}
+
+        for quiz_id in await redis.smembers(self.RECLAIM_QUIZZES_KEY):
+            # Removed first: a reset during the reclaim adds the quiz back for next round
+            await redis.srem(self.RECLAIM_QUIZZES_KEY, quiz_id)
+            try:
+                keys, attempts = await self.reclaim_quiz(quiz_id)
+            except Exception as e:
+                print(f"Error reclaiming quiz {quiz_id}: {str(e)}")
+                await redis.sadd(self.RECLAIM_QUIZZES_KEY, quiz_id)
+                continue
+            totals["quizzes"] += 1
+            totals["keys"] += keys
+            totals["attempts"] += attempts
+
+        while True:
+            records = await redis.lpop(self.RECLAIM_PARTICIPANTS_KEY, self.PARTICIPANT_BATCH_SIZE)
+            if not records:
+                break
+            for record in records:
+                try:
+                    totals["attempts"] += await self.reclaim_participant(**json.loads(record))
+                except Exception as e:
+                    print(f"Error reclaiming participant {record}: {str(e)}")
+                    await redis.rpush(self.RECLAIM_PARTICIPANTS_KEY, record)
+                    return totals
+                totals["participants"] += 1
+        return totals
+
+    async def reclaim_quiz(self, quiz_id: str):
+        """Free the Redis keys and attempts of a quiz's past epochs"""
+        epoch = await quiz_state_service.get_epoch(quiz_id)
+        redis = await get_redis()
+        past_epoch = re.compile(rf"^quiz:{re.escape(quiz_id)}:e(\d+):")
+
+        unlinked = 0
+        batch = []
+        async for key in redis.scan_iter(match=f"quiz:{quiz_id}:e*", count=self.SCAN_COUNT):
+            match = past_epoch.match(key)
+            if match and int(match.group(1)) < epoch:
+                batch.append(key)
+            if len(batch) >= self.UNLINK_BATCH_SIZE:
+                unlinked += await redis.unlink(*batch)
+                batch = []
+        if batch:
+            unlinked += await redis.unlink(*batch)
+
+        deleted = 0
+        while True:
+            async with in_transaction("default") as connection:
+                rows, _ = await connection.execute_query(
+                    PURGE_ATTEMPTS_SQL, [quiz_id, epoch, self.DELETE_BATCH_SIZE]
+                )
+            deleted += rows
+            if rows < self.DELETE_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)
+        return unlinked, deleted
+
+    async def reclaim_participant(self, quiz_id: str, user_id: str, before: float) -> int:
+        """Delete a user's attempts in a quiz made before they started over"""
+        return await AnswerAttempt.filter(
+            quiz_id=quiz_id,
+            user_id=user_id,
+            created_at__lt=datetime.fromtimestamp(before, tz=timezone.utc),
+        ).delete()
+
+
+# Create a singleton instance
+reclaimer_service = ReclaimerService()
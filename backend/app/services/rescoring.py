@@ -0,0 +1,168 @@
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from tortoise.transactions import in_transaction
+from app.models.user import User
+from app.models.quiz import Quiz, QuizStatus
+from app.models.question import Question
+from app.models.answer import Answer
+from app.models.answer_attempt import AnswerAttempt, AnswerStatus, compute_scores
+from app.services.lifecycle import quiz_lifecycle_service
+from app.services.quiz_state import quiz_state_service
+from app.services.ranking import ranking_service
+
+# One statement per chunk: the chunk's columns are bound as arrays and joined back
+# to the table by id, instead of one UPDATE (or one CASE branch) per row.
+BULK_UPDATE_SQL = """UPDATE answer_attempts AS a
+SET score = v.score, status = v.status, updated_at = NOW()
+FROM (
+    SELECT UNNEST($1::uuid[]) AS id, UNNEST($2::int[]) AS score, UNNEST($3::varchar[]) AS status
+) AS v
+WHERE a.id = v.id
+"""
+
+
+class RescoringError(ValueError):
+    """A quiz that can't be rescored right now"""
+
+
+class RescoringService:
+    """
+    Recompute every attempt's score for a quiz, rebuild its leaderboard and save the
+    new results to the leaderboards table.
+
+    Attempts are streamed with keyset pagination on id, one chunk at a time, so memory
+    is bounded by the chunk size plus one small aggregate per participant, no matter
+    how many attempts the quiz has. Each chunk is scored column-wise with
+    compute_scores and written back with a single UPDATE in its own transaction.
+    The leaderboard is only swapped once every chunk has been written.
+
+    Only ENDED quizzes with AnswerAttempt rows in their current epoch are rescored.
+    While a quiz is live, points keep arriving on its board without rows behind them,
+    and the swap would drop them; a quiz played without rows would get an empty board.
+
+    The global leaderboards are not corrected: they keep the totals added when the
+    quiz ended.
+    """
+
+    def __init__(self):
+        self.CHUNK_SIZE = 10000
+
+    async def _load_answer_key(self, quiz_id: str) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, Set[str]]]:
+        """question_id -> (points, time_limit) and question_id -> correct answer ids"""
+        questions = {
+            str(question_id): (points, time_limit)
+            for question_id, points, time_limit in await Question.filter(quiz_id=quiz_id)
+            .values_list("id", "points", "time_limit")
+        }
+        correct_answers: Dict[str, Set[str]] = {}
+        for question_id, answer_id in await Answer.filter(
+            question__quiz_id=quiz_id, is_correct=True
+        ).values_list("question_id", "id"):
+            correct_answers.setdefault(str(question_id), set()).add(str(answer_id))
+        return questions, correct_answers
+
+    async def rescore_quiz(self, quiz_id: str, chunk_size: Optional[int] = None) -> Dict:
+        """
+        Rescore all attempts of a quiz, atomically swap in the rebuilt leaderboard and
+        snapshot it to the leaderboards table
+        """
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        quiz = await Quiz.get_or_none(id=quiz_id)
+        if quiz is None:
+            raise RescoringError(f"Quiz {quiz_id} not found")
+        if quiz.status != QuizStatus.ENDED:
+            raise RescoringError(f"Quiz {quiz_id} is {quiz.status.value}; only ENDED quizzes can be rescored")
+        # Attempts from before the quiz's last reset don't count
+        epoch = await quiz_state_service.get_epoch(quiz_id)
+        if not await AnswerAttempt.filter(quiz_id=quiz_id, epoch=epoch).exists():
+            raise RescoringError(f"Quiz {quiz_id} has no answer attempts to rescore")
+        questions, correct_answers = await self._load_answer_key(quiz_id)
+
+        # user_id -> [total score, time of the latest scoring answer]
+        totals: Dict[str, List] = {}
+        started_at: Optional[datetime] = None
+        attempts = 0
+        updated = 0
+        last_id = None
+
+        while True:
+            query = AnswerAttempt.filter(quiz_id=quiz_id, epoch=epoch)
+            if last_id is not None:
+                query = query.filter(id__gt=last_id)
+            rows = await query.order_by("id").limit(chunk_size).values_list(
+                "id", "user_id", "question_id", "selected_answer_id",
+                "status", "score", "response_time", "end_time", "created_at",
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            attempts += len(rows)
+
+            ids, user_ids, question_ids, selected, old_status, old_scores, response_times, end_times, created = zip(*rows)
+            question_ids = [str(question_id) for question_id in question_ids]
+
+            # Unanswered attempts keep their TIMEOUT / NOT_ANSWERED status
+            status = [
+                old if answer_id is None
+                else AnswerStatus.CORRECT if str(answer_id) in correct_answers.get(question_id, ())
+                else AnswerStatus.INCORRECT
+                for old, answer_id, question_id in zip(old_status, selected, question_ids)
+            ]
+            points, time_limits = zip(*(questions.get(question_id, (0, 0)) for question_id in question_ids))
+            scores = compute_scores(
+                [s == AnswerStatus.CORRECT for s in status], points, time_limits, response_times
+            )
+
+            changed = [
+                i for i in range(len(rows))
+                if scores[i] != old_scores[i] or status[i] != old_status[i]
+            ]
+            if changed:
+                async with in_transaction("default") as connection:
+                    await connection.execute_query(
+                        BULK_UPDATE_SQL,
+                        [
+                            [ids[i] for i in changed],
+                            [scores[i] for i in changed],
+                            [AnswerStatus(status[i]).value for i in changed],
+                        ],
+                    )
+                updated += len(changed)
+
+            for user_id, score, end_time, created_at in zip(user_ids, scores, end_times, created):
+                answered_at = end_time or created_at
+                if started_at is None or created_at < started_at:
+                    started_at = created_at
+                total = totals.setdefault(str(user_id), [0, None])
+                if score:
+                    total[0] += score
+                    if total[1] is None or answered_at > total[1]:
+                        total[1] = answered_at
+
+        participants = await self._swap_leaderboard(quiz_id, totals, started_at)
+        results = await quiz_lifecycle_service.snapshot_results(str(quiz_id))
+        return {
+            "quiz_id": str(quiz_id),
+            "attempts": attempts,
+            "updated": updated,
+            "participants": participants,
+            "results": results,
+        }
+
+    async def _swap_leaderboard(
+        self, quiz_id: str, totals: Dict[str, List], started_at: Optional[datetime]
+    ) -> int:
+        started_at_ms = int(started_at.timestamp() * 1000) if started_at else 0
+
+        board = []
+        user_ids = list(totals)
+        for i in range(0, len(user_ids), self.CHUNK_SIZE):
+            batch = user_ids[i:i + self.CHUNK_SIZE]
+            for user_id, username in await User.filter(id__in=batch).values_list("id", "username"):
+                score, reached_at = totals[str(user_id)]
+                elapsed_ms = int(reached_at.timestamp() * 1000) - started_at_ms if reached_at else 0
+                board.append((username, score, elapsed_ms))
+        return await ranking_service.replace_board(quiz_id, board, started_at_ms)
+
+# Create a singleton instance
+rescoring_service = RescoringService()
@@ -0,0 +1,163 @@
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.hash_ring import HashRing
+from app.core.redis import get_redis
+import asyncio
+import time
+
+# KEYS: quiz node key
+# ARGV: node id, ttl in seconds
+# Takes or keeps the pin unless another node holds it
+CLAIM_QUIZ_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner and owner ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+class NodeRoutingService:
+    """
+    Quiz-affinity routing: every participant of a quiz is sent to the same node, so
+    its broadcasts reach local sockets instead of fanning out to every node.
+
+    - nodes:registry      hash of node id -> base URL clients connect to
+    - nodes:heartbeats    zset of node id -> unix time of its last heartbeat
+    - quiz:{quiz_id}:node node a live quiz is pinned to
+
+    Every node heartbeats each NODE_HEARTBEAT_INTERVAL and rebuilds a consistent hash
+    ring from the nodes heard from within NODE_TTL, so all nodes agree on it. A quiz's
+    first participant is sent to the quiz's ring owner, which pins the quiz for as long
+    as it has connections. A node joining therefore only takes new quizzes, and a node
+    leaving only moves its own quizzes, each to its next node on the ring.
+    """
+
+    def __init__(self):
+        self.ENABLED = settings.QUIZ_ROUTING_ENABLED
+        self.NODE_ID = settings.NODE_ID
+        self.NODE_URL = settings.NODE_URL
+        self.HEARTBEAT_INTERVAL = settings.NODE_HEARTBEAT_INTERVAL
+        self.NODE_TTL = settings.NODE_TTL
+        self.REGISTRY_KEY = "nodes:registry"
+        self.HEARTBEATS_KEY = "nodes:heartbeats"
+        self.QUIZ_NODE_KEY = "quiz:{quiz_id}:node"
+        self._ring = HashRing(replicas=settings.ROUTING_VIRTUAL_NODES)
+        # node id -> base URL, for nodes currently on the ring
+        self._urls: Dict[str, str] = {}
+        # quiz_id -> connections this node serves, for quizzes it keeps pinned
+        self._local: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Join the ring and keep heartbeating, once per process"""
+        if self.ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Leave the ring straight away instead of waiting for NODE_TTL"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            redis = await get_redis()
+            pipe = redis.pipeline(transaction=False)
+            pipe.zrem(self.HEARTBEATS_KEY, self.NODE_ID)
+            pipe.hdel(self.REGISTRY_KEY, self.NODE_ID)
+            await pipe.execute()
+        except Exception as e:
+            print(f"Error leaving the node ring: {str(e)}")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error sending node heartbeat: {str(e)}")
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+
+    async def heartbeat(self) -> None:
+        """Announce this node, refresh its quiz pins and rebuild the ring"""
+        redis = await get_redis()
+        now = time.time()
+        pipe = redis.pipeline(transaction=False)
+        pipe.hset(self.REGISTRY_KEY, self.NODE_ID, self.NODE_URL)
+        pipe.zadd(self.HEARTBEATS_KEY, {self.NODE_ID: now})
+        pipe.zremrangebyscore(self.HEARTBEATS_KEY, "-inf", now - self.NODE_TTL)
+        pipe.zrange(self.HEARTBEATS_KEY, 0, -1)
+        pipe.hgetall(self.REGISTRY_KEY)
+        *_, alive, registry = await pipe.execute()
+
+        alive = set(alive)
+        for node in set(self._ring.nodes) - alive:
+            self._ring.remove(node)
+        for node in alive:
+            self._ring.add(node)
+        self._urls = {node: registry.get(node, "") for node in alive}
+        dead = [node for node in registry if node not in alive]
+        if dead:
+            await redis.hdel(self.REGISTRY_KEY, *dead)
+
+        if self._local:
+            script = redis.register_script(CLAIM_QUIZ_SCRIPT)
+            pipe = redis.pipeline(transaction=False)
+            for quiz_id in self._local:
+                await script(
+                    keys=[self.QUIZ_NODE_KEY.format(quiz_id=quiz_id)],
+                    args=[self.NODE_ID, self.NODE_TTL],
+                    client=pipe,
+                )
+            await pipe.execute()
+
+    async def resolve(self, quiz_id: str) -> Optional[str]:
+        """Id of the node a quiz should be served by, or None if no node is known"""
+        redis = await get_redis()
+        pinned = await redis.get(self.QUIZ_NODE_KEY.format(quiz_id=quiz_id))
+        if pinned and pinned in self._urls:
+            return pinned
+        return self._ring.get(quiz_id)
+
+    async def route(self, quiz_id: str) -> Optional[str]:
+        """Base URL to send a quiz's participant to, or None to serve it here"""
+        if not self.ENABLED or not self._ring:
+            return None
+        node = await self.resolve(quiz_id)
+        if node is None or node == self.NODE_ID:
+            return None
+        return self._urls.get(node) or None
+
+    async def claim(self, quiz_id: str) -> None:
+        """Count a connection served here and pin the quiz to this node"""
+        self._local[quiz_id] = self._local.get(quiz_id, 0) + 1
+        if not self.ENABLED or self._local[quiz_id] > 1:
+            return
+        redis = await get_redis()
+        script = redis.register_script(CLAIM_QUIZ_SCRIPT)
+        await script(keys=[self.QUIZ_NODE_KEY.format(quiz_id=quiz_id)], args=[self.NODE_ID, self.NODE_TTL])
+
+    def release(self, quiz_id: str) -> None:
+        """Forget a closed connection; the pin lapses after the quiz's last one"""
+        remaining = self._local.get(quiz_id, 0) - 1
+        if remaining > 0:
+            self._local[quiz_id] = remaining
+        else:
+            self._local.pop(quiz_id, None)
+
+    async def describe(self, quiz_id: str) -> Dict:
+        """Which node serves a quiz and the URL to reach it on"""
+        node = await self.resolve(quiz_id) if self.ENABLED and self._ring else None
+        if node is None:
+            return {"quiz_id": quiz_id, "node_id": self.NODE_ID, "url": self.NODE_URL}
+        return {"quiz_id": quiz_id, "node_id": node, "url": self._urls.get(node, "")}
+
+
+# Create a singleton instance
+node_routing_service = NodeRoutingService()
@@ -0,0 +1,207 @@
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import ResponseError
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.services.quiz_state import quiz_state_service
+from app.services.ranking import ranking_service
+import asyncio
+import time
+import uuid
+import zlib
+
+
+def entry_position(entry_id: str) -> Tuple[int, int]:
+    """A stream entry ID as a comparable (milliseconds, sequence) pair"""
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class ScoreEventService:
+    """
+    Event log between scoring and the leaderboard, in Redis Streams.
+
+    Answer submissions only append a score event (XADD) to the quiz's stream shard,
+    scoring:events:{shard}, and return. Leaderboard aggregators read the shards
+    through the `leaderboard` consumer group in batches of up to BATCH_SIZE and apply
+    each batch to the ranking index in one pipelined round trip, acknowledging every
+    event in the same script that applies it (see APPLY_SCORE_EVENT_SCRIPT), so an
+    event is counted exactly once even when it is delivered twice.
+
+    Aggregators sharing a shard may apply its events out of order, which changes
+    nothing: points add up the same in any order and each event carries the time it
+    was scored, of which the board keeps the latest. Events left pending by an
+    aggregator that died are claimed by another after CLAIM_IDLE_MS.
+
+    Aggregators run in every web process by default (SCORE_AGGREGATOR_ENABLED) or on
+    their own with `python -m app.scripts.score_aggregator`; any number can share the
+    group. A quiz being ended drains its shard (see drain) so its final board counts
+    every event queued before it ended.
+    """
+
+    def __init__(self):
+        # Boards kept in process memory are updated inline instead
+        self.ENABLED = settings.SCORE_AGGREGATOR_ENABLED and settings.LEADERBOARD_STORAGE != "memory"
+        self.STREAM_KEY = "scoring:events:{shard}"
+        self.SHARDS = settings.SCORING_STREAM_SHARDS
+        self.GROUP = "leaderboard"
+        # Approximate cap per shard; events older than this are trimmed even if unread
+        self.STREAM_MAX_LEN = 100000
+        self.BATCH_SIZE = 500
+        self.BLOCK_MS = 1000
+        self.CLAIM_IDLE_MS = 30000
+        self.CLAIM_INTERVAL = 5  # seconds
+        # Unique per process, so workers sharing a NODE_ID don't share pending entries
+        self.CONSUMER = f"{settings.NODE_ID}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self.applied = 0
+
+    def stream_for(self, quiz_id: str) -> str:
+        """Stream shard a quiz's score events go to"""
+        return self.STREAM_KEY.format(shard=zlib.crc32(str(quiz_id).encode()) % self.SHARDS)
+
+    async def publish(self, quiz_id: str, username: str, points: int) -> None:
+        """Queue points scored now for the leaderboard aggregators"""
+        redis = await get_redis()
+        await redis.xadd(
+            self.stream_for(quiz_id),
+            {
+                "quiz_id": quiz_id,
+                "epoch": await quiz_state_service.get_epoch(quiz_id),
+                "username": username,
+                "points": points,
+                "at_ms": int(time.time() * 1000),
+            },
+            maxlen=self.STREAM_MAX_LEN,
+            approximate=True,
+        )
+
+    def start(self):
+        """Start aggregating in the background, once per process"""
+        if self.ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop aggregating; unacknowledged events are claimed by another aggregator"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _create_group(self, redis, stream: str) -> None:
+        try:
+            await redis.xgroup_create(stream, self.GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _create_groups(self, redis) -> None:
+        for shard in range(self.SHARDS):
+            await self._create_group(redis, self.STREAM_KEY.format(shard=shard))
+
+    async def _run(self):
+        streams = {self.STREAM_KEY.format(shard=shard): ">" for shard in range(self.SHARDS)}
+        claimed_at = 0.0
+        groups_ready = False
+        while True:
+            try:
+                redis = await get_redis()
+                if not groups_ready:
+                    await self._create_groups(redis)
+                    groups_ready = True
+                if time.monotonic() - claimed_at >= self.CLAIM_INTERVAL:
+                    await self.claim_stale()
+                    claimed_at = time.monotonic()
+                batches = await redis.xreadgroup(
+                    self.GROUP, self.CONSUMER, streams, count=self.BATCH_SIZE, block=self.BLOCK_MS
+                )
+                for stream, entries in batches or []:
+                    await self.apply(stream, entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error aggregating score events: {str(e)}")
+                groups_ready = False
+                await asyncio.sleep(1)
+
+    async def claim_stale(self) -> int:
+        """Take over and apply events another aggregator read but never acknowledged"""
+        redis = await get_redis()
+        claimed = 0
+        for shard in range(self.SHARDS):
+            stream = self.STREAM_KEY.format(shard=shard)
+            start = "0-0"
+            while True:
+                start, entries, *_ = await redis.xautoclaim(
+                    stream, self.GROUP, self.CONSUMER, self.CLAIM_IDLE_MS, start_id=start, count=self.BATCH_SIZE
+                )
+                await self.apply(stream, entries)
+                claimed += len(entries)
+                if start == "0-0":
+                    break
+        return claimed
+
+    async def drain(self, quiz_id: str) -> int:
+        """
+        Apply every event queued on a quiz's shard up to now, inline, so the board can
+        be read as final. Events no aggregator has read yet are read here; events an
+        aggregator has read but not acknowledged are claimed and applied here too, and
+        that aggregator then finds them acknowledged and skips them. Returns how many
+        were applied, counting events of other quizzes on the same shard.
+        """
+        if settings.LEADERBOARD_STORAGE == "memory":
+            return 0
+        redis = await get_redis()
+        stream = self.stream_for(quiz_id)
+        await self._create_group(redis, stream)
+        end = (await redis.xinfo_stream(stream))["last-generated-id"]
+        applied = 0
+
+        while True:
+            batches = await redis.xreadgroup(self.GROUP, self.CONSUMER, {stream: ">"}, count=self.BATCH_SIZE)
+            entries = batches[0][1] if batches else []
+            applied += await self.apply(stream, entries)
+            if not entries or entry_position(entries[-1][0]) >= entry_position(end):
+                break
+
+        while True:
+            pending = await redis.xpending_range(stream, self.GROUP, min="-", max=end, count=self.BATCH_SIZE)
+            if not pending:
+                break
+            entries = await redis.xclaim(
+                stream, self.GROUP, self.CONSUMER, 0, [entry["message_id"] for entry in pending]
+            )
+            if not entries:
+                break
+            applied += await self.apply(stream, entries)
+        return applied
+
+    async def apply(self, stream: str, entries: List[Tuple[str, Dict[str, str]]]) -> int:
+        """Apply a batch of events read from one stream and acknowledge all of them"""
+        events = []
+        stale = []
+        for entry_id, fields in entries:
+            if not fields:
+                # Trimmed away before it was read again; nothing left to apply
+                stale.append(entry_id)
+                continue
+            quiz_id = fields["quiz_id"]
+            if int(fields["epoch"]) != await quiz_state_service.get_epoch(quiz_id):
+                # Scored before a reset; the board it belonged to is gone
+                stale.append(entry_id)
+                continue
+            events.append((entry_id, quiz_id, fields["username"], int(fields["points"]), int(fields["at_ms"])))
+
+        applied = await ranking_service.apply_score_events(stream, self.GROUP, events)
+        if stale:
+            redis = await get_redis()
+            await redis.xack(stream, self.GROUP, *stale)
+        self.applied += applied
+        return applied
+
+
+# Create a singleton instance
+score_event_service = ScoreEventService()
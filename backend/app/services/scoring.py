@@ -1,102 +1,183 @@
-from typing import List, Dict
-from app.models.user import User
+from typing import List, Dict, Optional
 from app.models.quiz import Quiz
 from app.models.question import Question
-from app.models.answer import Answer
-from app.models.answer_attempt import AnswerAttempt
+from app.core.config import settings
 from app.core.redis import get_redis
+from app.services.hot_queries import hot_query_service
+from app.services.quiz_state import quiz_state_service
+from app.services.ranking import ranking_service
+from app.services.reclaimer import reclaimer_service
+from app.services.score_events import score_event_service
 import json
 
+# KEYS: answered hash, quiz questions list
+# ARGV: username, question id, unix time the hash expires at
+# Answered questions are stored as comma-separated positions in the quiz's question
+# list, e.g. "0,1,3", a few bytes per answer instead of a full question id.
+ADD_ANSWERED_SCRIPT = """
+local questions = cjson.decode(redis.call('GET', KEYS[2]) or '[]')
+local position
+for i, question_id in ipairs(questions) do
+    if question_id == ARGV[2] then
+        position = tostring(i - 1)
+        break
+    end
+end
+if not position then
+    return 0
+end
+local answered = redis.call('HGET', KEYS[1], ARGV[1])
+if answered and answered ~= '' then
+    for seen in string.gmatch(answered, '[^,]+') do
+        if seen == position then
+            return 0
+        end
+    end
+    answered = answered .. ',' .. position
+else
+    answered = position
+end
+redis.call('HSET', KEYS[1], ARGV[1], answered)
+redis.call('EXPIREAT', KEYS[1], ARGV[3])
+return 1
+"""
+
 class ScoringService:
+    """
+    Live per-quiz scoring state in Redis.
+
+    Participants don't get keys of their own: scores are members of the quiz's ranking
+    sorted set and answered questions are fields of one per-quiz hash, so the key
+    count (and its per-key overhead) stays fixed however many people join. Every key
+    is namespaced by the quiz's epoch and expires with the quiz lifecycle (see
+    QuizStateService).
+    """
+
     def __init__(self):
-        self.REDIS_EXPIRATION_TIME = 60 * 5  # 5 minutes
-        self.USER_SCORE_KEY = "quiz:{quiz_id}:user:{username}:score"
-        self.USER_QUESTIONS_KEY = "quiz:{quiz_id}:user:{username}:questions"
+        self.ANSWERED_QUESTIONS_KEY = "quiz:{quiz_id}:answered"
         self.QUIZ_QUESTIONS_KEY = "quiz:{quiz_id}:questions"
 
+    def state_keys(self, scope: str) -> List[str]:
+        """Every Redis key holding the scoring state of a quiz epoch"""
+        return [
+            self.ANSWERED_QUESTIONS_KEY.format(quiz_id=scope),
+            self.QUIZ_QUESTIONS_KEY.format(quiz_id=scope),
+        ]
+
     async def initialize_user_score(self, quiz_id: str, username: str) -> None:
         """Initialize user score in Redis"""
-        redis = await get_redis()
-        score_key = self.USER_SCORE_KEY.format(quiz_id=quiz_id, username=username)
-        if not await redis.exists(score_key):
-            await redis.set(score_key, 0, ex=self.REDIS_EXPIRATION_TIME)
+        await ranking_service.add_participant(quiz_id, username)
 
     async def initialize_user_questions(self, quiz_id: str, username: str) -> None:
         """Initialize user questions in Redis"""
         redis = await get_redis()
-        questions_key = self.USER_QUESTIONS_KEY.format(quiz_id=quiz_id, username=username)
-        if not await redis.exists(questions_key):
-            await redis.set(questions_key, json.dumps([]), ex=self.REDIS_EXPIRATION_TIME)
+        answered_key = self.ANSWERED_QUESTIONS_KEY.format(quiz_id=await quiz_state_service.scope(quiz_id))
+        pipe = redis.pipeline(transaction=False)
+        pipe.hsetnx(answered_key, username, "")
+        pipe.expireat(answered_key, await quiz_state_service.get_deadline(quiz_id))
+        await pipe.execute()
 
-    async def initialize_quiz_questions(self, quiz_id: str) -> None:
-        """Initialize quiz questions in Redis"""
+    async def initialize_quiz_questions(self, quiz_id: str, question_ids: Optional[List[str]] = None) -> None:
+        """Initialize quiz questions in Redis, from `question_ids` if already loaded"""
         redis = await get_redis()
-        quiz_questions_key = self.QUIZ_QUESTIONS_KEY.format(quiz_id=quiz_id)
+        quiz_questions_key = self.QUIZ_QUESTIONS_KEY.format(quiz_id=await quiz_state_service.scope(quiz_id))
         if not await redis.exists(quiz_questions_key):
-            questions = await Question.filter(quiz_id=quiz_id).order_by('order')
-            questions_data = [str(q.id) for q in questions]
-            await redis.set(quiz_questions_key, json.dumps(questions_data), ex=self.REDIS_EXPIRATION_TIME)
+            if question_ids is None:
+                questions = await Question.filter(quiz_id=quiz_id).order_by('order')
+                question_ids = [str(q.id) for q in questions]
+            questions_data = question_ids
+            # NX: the list must not change under the answered positions once written
+            await redis.set(
+                quiz_questions_key,
+                json.dumps(questions_data),
+                nx=True,
+                exat=await quiz_state_service.get_deadline(quiz_id),
+            )
 
-    async def check_answer(self, question_id: int, answer_id: int) -> bool:
-        """Check if answer is correct"""
+    async def check_answer(self, question_id: int, answer_id: int) -> Optional[bool]:
+        """Check if answer is correct; None if it isn't one of the question's answers, or can't be checked"""
         try:
-            answer = await Answer.get_or_none(id=answer_id, question_id=question_id)
-            return answer and answer.is_correct
+            return await hot_query_service.get_answer_correctness(question_id, answer_id)
         except Exception as e:
             print(f"Error checking answer: {str(e)}")
-            return False
+            return None
 
-    async def update_user_score(self, quiz_id: str, username: str, adding_score: int = 0) -> None:
-        """Update user score in Redis"""
-        redis = await get_redis()
-        score_key = self.USER_SCORE_KEY.format(quiz_id=quiz_id, username=username)
-        current_score = int(await redis.get(score_key) or 0)
-        await redis.set(score_key, current_score + adding_score, ex=self.REDIS_EXPIRATION_TIME)
+    async def update_user_score(self, quiz_id: str, username: str, adding_score: int = 0) -> int:
+        """Update user score in Redis and return the new score"""
+        return await ranking_service.add_points(quiz_id, username, adding_score)
+
+    async def submit_score(self, quiz_id: str, username: str, points: int) -> None:
+        """
+        Record points a user just scored. They are queued for the leaderboard
+        aggregators and show on the board once applied, normally within milliseconds;
+        boards kept in memory are updated here instead.
+        """
+        if not points:
+            return
+        if settings.LEADERBOARD_STORAGE == "memory":
+            await ranking_service.add_points(quiz_id, username, points)
+        else:
+            await score_event_service.publish(quiz_id, username, points)
 
-    async def add_answered_question(self, quiz_id: str, username: str, question_id: int) -> None:
-        """Add question to answered questions in Redis"""
+    async def add_answered_question(self, quiz_id: str, username: str, question_id: int) -> bool:
+        """
+        Add question to answered questions in Redis. Returns False if the user had
+        already answered it, or it isn't one of the quiz's questions.
+        """
         redis = await get_redis()
-        questions_key = self.USER_QUESTIONS_KEY.format(quiz_id=quiz_id, username=username)
-        answered_questions = json.loads(await redis.get(questions_key) or "[]")
-        if question_id not in answered_questions:
-            answered_questions.append(question_id)
-            await redis.set(questions_key, json.dumps(answered_questions), ex=self.REDIS_EXPIRATION_TIME)
+        script = redis.register_script(ADD_ANSWERED_SCRIPT)
+        added = await script(
+            keys=self.state_keys(await quiz_state_service.scope(quiz_id)),
+            args=[username, str(question_id), await quiz_state_service.get_deadline(quiz_id)],
+        )
+        return bool(added)
 
     async def get_user_score(self, quiz_id: str, username: str) -> int:
         """Get user's current score"""
-        redis = await get_redis()
-        score_key = self.USER_SCORE_KEY.format(quiz_id=quiz_id, username=username)
-        return int(await redis.get(score_key) or 0)
+        return await ranking_service.get_points(quiz_id, username) or 0
 
-    async def get_answered_questions(self, quiz_id: str, username: str) -> List[int]:
+    async def get_answered_questions(self, quiz_id: str, username: str) -> List[str]:
         """Get list of answered questions"""
         redis = await get_redis()
-        questions_key = self.USER_QUESTIONS_KEY.format(quiz_id=quiz_id, username=username)
-        return json.loads(await redis.get(questions_key) or "[]")
+        scope = await quiz_state_service.scope(quiz_id)
+        pipe = redis.pipeline(transaction=False)
+        pipe.hget(self.ANSWERED_QUESTIONS_KEY.format(quiz_id=scope), username)
+        pipe.get(self.QUIZ_QUESTIONS_KEY.format(quiz_id=scope))
+        answered, questions = await pipe.execute()
+        if not answered:
+            return []
+        questions = json.loads(questions or "[]")
+        return [
+            questions[int(position)]
+            for position in answered.split(",")
+            if int(position) < len(questions)
+        ]
 
     async def get_quiz_questions(self, quiz_id: str) -> List[str]:
         """Get all quiz questions"""
         redis = await get_redis()
-        quiz_questions_key = self.QUIZ_QUESTIONS_KEY.format(quiz_id=quiz_id)
+        quiz_questions_key = self.QUIZ_QUESTIONS_KEY.format(quiz_id=await quiz_state_service.scope(quiz_id))
         return json.loads(await redis.get(quiz_questions_key) or "[]")
 
     async def clear_user_data(self, quiz_id: str, username: str) -> None:
         """Clear user's quiz data from Redis"""
         redis = await get_redis()
-        score_key = self.USER_SCORE_KEY.format(quiz_id=quiz_id, username=username)
-        questions_key = self.USER_QUESTIONS_KEY.format(quiz_id=quiz_id, username=username)
-        await redis.delete(score_key, questions_key)
+        scope = await quiz_state_service.scope(quiz_id)
+        await redis.hdel(self.ANSWERED_QUESTIONS_KEY.format(quiz_id=scope), username)
+        await ranking_service.remove_participant(quiz_id, username)
+
+    async def reset_participant(self, quiz_id: str, user_id: str, username: str) -> None:
+        """
+        Start a user over in a quiz.
 
-    async def clear_answer_attempts(self, quiz_id: str, user_id: str) -> None:
-        """Clear answer attempts for a user"""
+        Only the live board entry is dropped here; the user's earlier answer attempts
+        are queued for the reclaimer to delete off the request path.
+        """
         try:
-            await AnswerAttempt.filter(quiz_id=quiz_id, user_id=user_id).delete()
-            username = (await User.get_or_none(id=user_id)).username
-            redis = await get_redis()
-            score_key = self.USER_SCORE_KEY.format(quiz_id=quiz_id, username=username)
-            await redis.delete(score_key)
+            await ranking_service.remove_participant(quiz_id, username)
+            await reclaimer_service.enqueue_participant(quiz_id, user_id)
         except Exception as e:
-            print(f"Error clearing answer attempts: {str(e)}")
+            print(f"Error resetting participant: {str(e)}")
 
 # Create a singleton instance
 scoring_service = ScoringService()
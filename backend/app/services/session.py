@@ -0,0 +1,70 @@
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.services.hot_queries import UserRecord
+from app.services.quiz_state import quiz_state_service
+import secrets
+
+
+class SessionService:
+    """
+    Resume tokens for quiz participants.
+
+    Joining a quiz issues a token stored in session:{token} with the participant and
+    the quiz epoch it joined. While the participant is connected the token lives as
+    long as the quiz's live state; once the connection closes it has
+    SESSION_RESUME_GRACE seconds left. Reconnecting with the token in that window
+    restores the participant without the join's database queries, progress reset or
+    leaderboard broadcast. Each token resumes once and is replaced by a new one.
+    """
+
+    def __init__(self):
+        self.SESSION_KEY = "session:{token}"
+        self.CONNECTED_EXPIRATION_TIME = settings.QUIZ_STATE_LIVE_TTL
+        self.RESUME_GRACE = settings.SESSION_RESUME_GRACE  # seconds
+
+    async def create(self, quiz_id: str, user: UserRecord) -> str:
+        """Issue a resume token for a participant who just joined or resumed"""
+        token = secrets.token_urlsafe(24)
+        redis = await get_redis()
+        key = self.SESSION_KEY.format(token=token)
+        pipe = redis.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            "quiz_id": quiz_id,
+            "user_id": str(user.id),
+            "username": user.username,
+            "epoch": await quiz_state_service.get_epoch(quiz_id),
+        })
+        pipe.expire(key, self.CONNECTED_EXPIRATION_TIME)
+        await pipe.execute()
+        return token
+
+    async def resume(self, token: str, quiz_id: str, username: Optional[str]) -> Optional[UserRecord]:
+        """
+        Use up a resume token and return its participant, or None if the token is
+        unknown, expired, for another quiz or user, or from before a reset.
+        """
+        redis = await get_redis()
+        key = self.SESSION_KEY.format(token=token)
+        pipe = redis.pipeline(transaction=True)
+        pipe.hgetall(key)
+        pipe.delete(key)
+        session: Dict[str, str] = (await pipe.execute())[0]
+        if not session or session["quiz_id"] != quiz_id or session["username"] != username:
+            return None
+        if int(session["epoch"]) != await quiz_state_service.get_epoch(quiz_id):
+            return None
+        # Not loaded from the database: the session already identifies the participant
+        return UserRecord(session["user_id"], session["username"])
+
+    async def suspend(self, token: str) -> None:
+        """Start a closed connection's grace window"""
+        try:
+            redis = await get_redis()
+            await redis.expire(self.SESSION_KEY.format(token=token), self.RESUME_GRACE)
+        except Exception as e:
+            print(f"Error suspending session: {str(e)}")
+
+
+# Create a singleton instance
+session_service = SessionService()
@@ -0,0 +1,83 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+from app.core.db_router import replica_monitor
+from app.models.user import User
+import uuid
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Row-value comparison so the scan starts at the cursor in the (created_at, id) index;
+# run through a protocol-level cursor, which fetches STREAM_PREFETCH rows at a time
+STREAM_SQL = """SELECT id, username, created_at FROM users
+WHERE (created_at, id) > ($1, $2)
+ORDER BY created_at, id
+"""
+
+
+def encode_cursor(created_at: datetime, user_id) -> str:
+    """Keyset position after a user: microseconds since the epoch and id, URL safe"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return f"{(created_at - EPOCH) // MICROSECOND}_{user_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError for anything it didn't produce"""
+    micros, _, user_id = cursor.partition("_")
+    try:
+        created_at = EPOCH + int(micros) * MICROSECOND
+    except OverflowError:
+        raise ValueError(f"Cursor time out of range: {micros}")
+    return created_at, uuid.UUID(user_id)
+
+
+class UserService:
+    """
+    List users in signup order, however many there are.
+
+    Both modes walk the (created_at, id) index from a keyset cursor instead of an
+    OFFSET, so every request costs the same wherever it starts and holds at most a
+    page (or STREAM_PREFETCH rows) in memory:
+    - pages of up to MAX_PAGE_SIZE users, each returning the cursor of the next
+    - a stream of every user after a cursor, read through a server-side cursor
+    """
+
+    def __init__(self):
+        self.DEFAULT_PAGE_SIZE = 100
+        self.MAX_PAGE_SIZE = 1000
+        self.STREAM_PREFETCH = 1000
+
+    async def get_page(self, limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get up to `limit` users after `cursor`, the `next_cursor` of the previous page"""
+        query = User.all()
+        if cursor:
+            created_at, user_id = decode_cursor(cursor)
+            # Same rows as (created_at, id) > cursor, written so the index range starts
+            # at created_at instead of being filtered from the beginning
+            query = query.filter(created_at__gte=created_at).filter(
+                Q(created_at__gt=created_at) | Q(id__gt=user_id)
+            )
+        items: List[Dict[str, Any]] = await query.order_by("created_at", "id").limit(limit).values(
+            "id", "username", "created_at"
+        )
+        last = items[-1] if len(items) == limit else None
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(last["created_at"], last["id"]) if last else None,
+        }
+
+    async def stream(self, cursor: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every user after `cursor`, in order, from one server-side cursor"""
+        created_at, user_id = decode_cursor(cursor) if cursor else (EPOCH, uuid.UUID(int=0))
+        # asyncpg cursors only live inside a transaction; a read-only one can be on a replica
+        async with in_transaction(replica_monitor.replica_for(User._meta.db_table) or "default") as connection:
+            async with connection.acquire_connection() as raw:
+                async for record in raw.cursor(STREAM_SQL, created_at, user_id, prefetch=self.STREAM_PREFETCH):
+                    yield dict(record)
+
+
+# Create a singleton instance
+user_service = UserService()
@@ -1,109 +1,210 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
 from typing import List, Dict
-from app.models.user import User
-from app.models.quiz import Quiz
-from app.models.question import Question
-from app.models.answer import Answer
 from app.core.redis import get_redis
+from app.core.compression import wants_compression
 from app.services.scoring import scoring_service
 from app.services.leaderboard import leaderboard_service
+from app.services.analytics import analytics_service
+from app.services.heartbeat import heartbeat_service
+from app.services.hot_queries import hot_query_service, UserRecord
+from app.services.lifecycle import quiz_lifecycle_service
+from app.services.routing import node_routing_service
+from app.services.session import session_service
+import asyncio
 import json
+import time
 from app.auth import get_current_user_ws
 
-REDIS_EXPIRATION_TIME = 60 * 5  # 5 minutes
-
 router = APIRouter(prefix="/ws")
 
 # Store active connections
 active_connections: Dict[str, List[WebSocket]] = {}
 
-# Redis key patterns
-USER_SCORE_KEY = "quiz:{quiz_id}:user:{username}:score"
-USER_QUESTIONS_KEY = "quiz:{quiz_id}:user:{username}:questions"
-QUIZ_QUESTIONS_KEY = "quiz:{quiz_id}:questions"
+def drop_connection(quiz_id: str, websocket: WebSocket):
+    """Stop broadcasting to a participant; safe to call more than once"""
+    connections = active_connections.get(quiz_id)
+    if connections and websocket in connections:
+        connections.remove(websocket)
+        if not connections:
+            del active_connections[quiz_id]
+    leaderboard_service.unsubscribe(quiz_id, websocket)
 
 @router.websocket("/quiz/{quiz_id}", "Join a quiz")
 async def initialize_joining_quiz(websocket: WebSocket, quiz_id: str):
     await websocket.accept()
-    
-    try:
-        # Get current user from websocket
-        user = await get_current_user_ws(websocket)
-        
-        # Get quiz
-        quiz = await Quiz.get_or_none(id=quiz_id)
-        if not quiz:
-            await websocket.close(code=4004, reason="Quiz not found")
+
+    # Send participants to the node serving the quiz, once: a redirected client
+    # reconnects with ?routed=1 and is served wherever it lands
+    if not websocket.query_params.get("routed"):
+        target = await node_routing_service.route(quiz_id)
+        if target:
+            await websocket.send_text(json.dumps({
+                "type": "redirect",
+                "data": {"url": target}
+            }))
+            await websocket.close(code=4307, reason="Quiz is served by another node")
             return
+
+    claimed = False
+    session_token = None
+    try:
+        # A reconnect within the grace window presents its resume token and is
+        # restored as it was; anything else is a fresh join
+        user = None
+        resume_token = websocket.query_params.get("resume")
+        if resume_token:
+            user = await session_service.resume(resume_token, quiz_id, websocket.query_params.get("username"))
+        resumed = user is not None
+
+        if not resumed:
+            # Get current user from websocket
+            user = await get_current_user_ws(websocket)
+
+            # Get quiz
+            quiz = await hot_query_service.get_quiz(quiz_id)
+            if not quiz:
+                await websocket.close(code=4004, reason="Quiz not found")
+                return
         
+        await node_routing_service.claim(quiz_id)
+        claimed = True
+
         # Add connection to active connections
         if quiz_id not in active_connections:
             active_connections[quiz_id] = []
         active_connections[quiz_id].append(websocket)
 
-        await leaderboard_service.subscribe(quiz_id, websocket)
+        await leaderboard_service.subscribe(quiz_id, websocket, wants_compression(websocket))
+        heartbeat_service.register(websocket, lambda: drop_connection(quiz_id, websocket))
 
-        # Initialize user data in Redis
-        await scoring_service.initialize_user_score(quiz_id, user.username)
-        await scoring_service.initialize_user_questions(quiz_id, user.username)
-        await scoring_service.initialize_quiz_questions(quiz_id)
+        # question_id -> monotonic time it was sent, for response times
+        sent_at: Dict[str, float] = {}
 
-        await scoring_service.clear_answer_attempts(quiz_id, user.id)
-        
-        # Send initial question
-        await send_next_question(websocket, quiz_id, user)
+        if resumed:
+            # Progress and place on the board are kept; only this client is caught up
+            session_token = await session_service.create(quiz_id, user)
+            await send_session(websocket, session_token, resumed=True)
+            await replay_missed_events(websocket, quiz_id)
+            await quiz_lifecycle_service.warm(quiz_id)
+            await send_next_question(websocket, quiz_id, user, sent_at)
+        else:
+            # Initialize user data in Redis
+            await scoring_service.initialize_user_score(quiz_id, user.username)
+            await scoring_service.initialize_user_questions(quiz_id, user.username)
+            # Already done if the quiz was started; otherwise the first joiner loads it
+            await quiz_lifecycle_service.warm(quiz_id)
+
+            await scoring_service.reset_participant(quiz_id, user.id, user.username)
+
+            session_token = await session_service.create(quiz_id, user)
+            await send_session(websocket, session_token, resumed=False)
 
-        # Subscribe to leaderboard updates
-        await leaderboard_service.join_leaderboard(quiz_id, user)
-        # Send initial leaderboard
-        await leaderboard_service.broadcast_leaderboard(quiz_id, active_connections)
+            # Send initial question
+            await send_next_question(websocket, quiz_id, user, sent_at)
+
+            # Subscribe to leaderboard updates
+            await leaderboard_service.join_leaderboard(quiz_id, user)
+            # Send initial leaderboard from the shared snapshot, then let everyone know
+            # if this join changed the board
+            version, frame = await leaderboard_service.get_snapshot(quiz_id)
+            await frame.send(websocket, wants_compression(websocket))
+            await leaderboard_service.broadcast_leaderboard(quiz_id, active_connections)
 
         # Handle messages
         while True:
             try:
                 data = await websocket.receive_text()
+                heartbeat_service.touch(websocket)
                 message = json.loads(data)
                 
                 if message["type"] == "submit_answer":
+                    question_id = message["data"]["question_id"]
+                    response_time_ms = None
+                    if question_id in sent_at:
+                        response_time_ms = int((time.monotonic() - sent_at.pop(question_id)) * 1000)
                     await handle_answer_submission(
-                        websocket, quiz_id, user, message["data"]["question_id"], message["data"]["answer_id"]
+                        websocket, quiz_id, user, question_id, message["data"]["answer_id"], response_time_ms
                     )
                 elif message["type"] == "request_next_question":
-                    await send_next_question(websocket, quiz_id, user)
+                    await send_next_question(websocket, quiz_id, user, sent_at)
                 
             except WebSocketDisconnect:
                 break
             except json.JSONDecodeError:
                 continue
             except Exception as e:
+                if websocket.application_state == WebSocketState.DISCONNECTED:
+                    # Closed under us, e.g. reaped by the heartbeat
+                    break
                 print(f"Error handling message: {str(e)}")
                 continue
                 
     except Exception as e:
         print(f"Error in join_quiz: {str(e)}")
     finally:
-        # Remove connection from active connections
-        if quiz_id in active_connections:
-            active_connections[quiz_id].remove(websocket)
-            if not active_connections[quiz_id]:
-                del active_connections[quiz_id]
-        
-        # Unsubscribe from leaderboard updates
-        leaderboard_service.unsubscribe(quiz_id, websocket)
-        await websocket.close()
+        if claimed:
+            node_routing_service.release(quiz_id)
+        heartbeat_service.unregister(websocket)
+        if session_token:
+            await session_service.suspend(session_token)
 
-async def handle_answer_submission(websocket: WebSocket, quiz_id: str, user: User, question_id: int, answer_id: int):
+        # Remove connection from active connections and leaderboard updates
+        drop_connection(quiz_id, websocket)
+        if websocket.application_state != WebSocketState.DISCONNECTED:
+            await websocket.close()
+
+async def send_session(websocket: WebSocket, session_token: str, resumed: bool):
+    """Give the client the token to resume this session with after a disconnect"""
+    await websocket.send_text(json.dumps({
+        "type": "session",
+        "data": {
+            "resume_token": session_token,
+            "resumed": resumed,
+            "grace_seconds": session_service.RESUME_GRACE
+        }
+    }))
+
+async def replay_missed_events(websocket: WebSocket, quiz_id: str):
+    """Send a resumed client the events after its last_seq, or the current board if they are gone"""
+    compression = wants_compression(websocket)
+    try:
+        last_seq = int(websocket.query_params.get("last_seq", ""))
+    except ValueError:
+        last_seq = None
+    frames = leaderboard_service.replay(quiz_id, last_seq) if last_seq is not None else None
+    if frames is None:
+        version, frame = await leaderboard_service.get_snapshot(quiz_id)
+        frames = [frame]
+    for frame in frames:
+        await frame.send(websocket, compression)
+
+async def handle_answer_submission(
+    websocket: WebSocket, quiz_id: str, user: UserRecord, question_id: int, answer_id: int, response_time_ms: int = None
+):
     """Handle answer submission and update score"""
     try:
-        # Check if answer is correct
-        is_correct = await scoring_service.check_answer(question_id, answer_id)
+        # Check if answer is correct, and one of the question's answers at all, from
+        # memory when the quiz is loaded
+        is_correct = quiz_lifecycle_service.is_correct(quiz_id, question_id, answer_id)
+        is_answer = quiz_lifecycle_service.is_answer(quiz_id, question_id, answer_id)
+        if is_correct is None:
+            is_correct = await scoring_service.check_answer(question_id, answer_id)
+            is_answer = is_correct is not None
+            is_correct = bool(is_correct)
+
+        # Only a user's first answer to a question counts: a resubmission is answered
+        # but neither scored nor recorded in the question's stats
+        if await scoring_service.add_answered_question(quiz_id, user.username, question_id):
+            await analytics_service.record_answer(
+                quiz_id, question_id, answer_id if is_answer else None, is_correct, response_time_ms
+            )
 
-        # TODO: Handle more complex scoring logic
-        score = 1 if is_correct else 0
+            # TODO: Handle more complex scoring logic
+            score = 1 if is_correct else 0
 
-        # Update score and answered questions
-        await scoring_service.update_user_score(quiz_id, user.username, score)
-        await scoring_service.add_answered_question(quiz_id, user.username, question_id)
+            # Queue the score for the leaderboard
+            await scoring_service.submit_score(quiz_id, user.username, score)
     
         if is_correct:
             # Send success message
@@ -136,11 +237,15 @@ async def handle_answer_submission(websocket: WebSocket, quiz_id: str, user: Use
             }
         }))
 
-async def send_next_question(websocket: WebSocket, quiz_id: str, user: User):
+async def send_next_question(websocket: WebSocket, quiz_id: str, user: UserRecord, sent_at: Dict[str, float] = None):
     """Send next unanswered question to user"""
     try:
         # Get all quiz questions and answered questions
-        all_questions = await scoring_service.get_quiz_questions(quiz_id)
+        content = quiz_lifecycle_service.get_content(quiz_id)
+        if content:
+            all_questions = content.question_ids
+        else:
+            all_questions = await scoring_service.get_quiz_questions(quiz_id)
         answered_questions = await scoring_service.get_answered_questions(quiz_id, user.username)
         
         # Find next unanswered question
@@ -150,28 +255,32 @@ async def send_next_question(websocket: WebSocket, quiz_id: str, user: User):
                 next_question_id = q_id
                 break
         
-        if next_question_id:
+        if next_question_id and content and next_question_id in content.messages:
+            await websocket.send_text(content.messages[next_question_id])
+            if sent_at is not None:
+                sent_at[next_question_id] = time.monotonic()
+        elif next_question_id:
             # Get question data
-            question = await Question.get_or_none(id=next_question_id)
+            question = await hot_query_service.get_question(next_question_id)
             if question:
-                answers = await Answer.filter(question_id=question.id)
-                
                 # Send question data
                 await websocket.send_text(json.dumps({
                     "type": "question",
                     "data": {
-                        "id": str(question.id),
+                        "id": question.id,
                         "text": question.title,
                         "time_limit": question.time_limit,
                         "answers": [
                             {
-                                "id": str(answer.id),
+                                "id": answer.id,
                                 "text": answer.text
                             }
-                            for answer in answers
+                            for answer in question.answers
                         ]
                     }
                 }))
+                if sent_at is not None:
+                    sent_at[question.id] = time.monotonic()
         else:
             # No more questions
             await websocket.send_text(json.dumps({
@@ -192,6 +301,77 @@ async def send_next_question(websocket: WebSocket, quiz_id: str, user: User):
             }
         }))
 
+@router.websocket("/quiz/{quiz_id}/watch", "Watch a quiz leaderboard")
+async def watch_quiz_leaderboard(websocket: WebSocket, quiz_id: str):
+    """
+    Read-only spectator channel: the current leaderboard, then every update.
+    Viewers never join the quiz and share one cached snapshot per server.
+    """
+    await websocket.accept()
+    compression = wants_compression(websocket)
+    queue = leaderboard_service.add_viewer(quiz_id)
+    heartbeat_service.register(websocket, lambda: leaderboard_service.remove_viewer(quiz_id, queue))
+    # Viewers only answer pings, so only a pending receive notices them leaving
+    received = asyncio.create_task(websocket.receive())
+    update = None
+    try:
+        version, frame = await leaderboard_service.get_snapshot(quiz_id)
+        await frame.send(websocket, compression)
+        while True:
+            if update is None:
+                update = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({update, received}, return_when=asyncio.FIRST_COMPLETED)
+            if received in done:
+                if received.result()["type"] == "websocket.disconnect":
+                    break
+                # Anything a viewer sends only shows it is still there
+                heartbeat_service.touch(websocket)
+                received = asyncio.create_task(websocket.receive())
+            if update in done:
+                version, frame = update.result()
+                update = None
+                await frame.send(websocket, compression)
+    except Exception as e:
+        print(f"Error in watch_quiz_leaderboard: {str(e)}")
+    finally:
+        received.cancel()
+        if update:
+            update.cancel()
+        heartbeat_service.unregister(websocket)
+        leaderboard_service.remove_viewer(quiz_id, queue)
+
+@router.websocket("/quiz/{quiz_id}/host", "Watch live question analytics")
+async def watch_quiz_analytics(websocket: WebSocket, quiz_id: str):
+    """Host channel: current per-question stats on connect, then throttled live updates"""
+    await websocket.accept()
+    forwarder = None
+    try:
+        quiz = await hot_query_service.get_quiz_content(quiz_id)
+        if not quiz:
+            await websocket.close(code=4004, reason="Quiz not found")
+            return
+
+        question_ids = [question.id for question in quiz.questions]
+        await websocket.send_text(json.dumps({
+            "type": "question_analytics",
+            "data": await analytics_service.get_quiz_stats(quiz_id, question_ids)
+        }))
+
+        forwarder = asyncio.create_task(analytics_service.subscribe_host(quiz_id, websocket))
+        heartbeat_service.register(websocket)
+        # Hosts only listen; receiving just tells us when they go away or answer a ping
+        while True:
+            await websocket.receive_text()
+            heartbeat_service.touch(websocket)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Error in watch_quiz_analytics: {str(e)}")
+    finally:
+        heartbeat_service.unregister(websocket)
+        if forwarder:
+            forwarder.cancel()
+
 async def broadcast_leaderboard(quiz_id: str):
     """Broadcast leaderboard to all connected clients"""
     await leaderboard_service.broadcast_leaderboard(quiz_id, active_connections)
@@ -1,10 +1,20 @@
+# Imported first, so the startup report covers every other import
+from app.core.startup import startup_report, StartupReportMiddleware
 from fastapi import FastAPI
 from app.api.v1 import router as api_v1_router
 from app.core.config import settings
+from app.core.db_router import replica_monitor
 from app.core.database import init_db
+from app.services.heartbeat import heartbeat_service
+from app.services.lifecycle import quiz_lifecycle_service
+from app.services.reclaimer import reclaimer_service
+from app.services.routing import node_routing_service
+from app.services.score_events import score_event_service
 from app.websocket.v1.websocket import router as websocket_router
 from fastapi.middleware.cors import CORSMiddleware
 
+startup_report.mark("imports")
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="""
@@ -44,6 +54,28 @@ app.add_middleware(
         allow_methods=["*"],
         allow_headers=["*"],
     )
+app.add_middleware(StartupReportMiddleware)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Runs after register_tortoise's startup handler
+    startup_report.mark("database")
+    replica_monitor.start()
+    reclaimer_service.start()
+    quiz_lifecycle_service.start_listener()
+    node_routing_service.start()
+    score_event_service.start()
+    startup_report.mark("ready")
+    startup_report.log()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await node_routing_service.stop()
+    await score_event_service.stop()
+    await reclaimer_service.stop()
+    await heartbeat_service.stop()
+    await quiz_lifecycle_service.stop_listener()
+    await replica_monitor.stop()
 
 @app.get("/", tags=["root"])
 async def root():
@@ -54,4 +86,12 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+        ws_ping_interval=settings.WS_PING_INTERVAL / 1000,
+        ws_ping_timeout=settings.WS_PING_TIMEOUT / 1000,
+    ) 
\ No newline at end of file
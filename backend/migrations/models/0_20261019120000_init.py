@@ -0,0 +1,73 @@
+from tortoise import BaseDBAsyncClient
+
+
+# The schema as generate_schemas created it before migrations were introduced. Every
+# statement is IF NOT EXISTS, so databases created that way can run it as is.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "users" (
+            "id" UUID NOT NULL  PRIMARY KEY,
+            "username" VARCHAR(50) NOT NULL UNIQUE,
+            "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "quizzes" (
+            "id" UUID NOT NULL  PRIMARY KEY,
+            "title" VARCHAR(200) NOT NULL,
+            "description" TEXT,
+            "status" VARCHAR(7) NOT NULL  DEFAULT 'DRAFT',
+            "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+        );
+        COMMENT ON COLUMN "quizzes"."status" IS 'DRAFT: DRAFT\\nSTARTED: STARTED\\nENDED: ENDED';
+        CREATE TABLE IF NOT EXISTS "questions" (
+            "id" UUID NOT NULL  PRIMARY KEY,
+            "title" VARCHAR(500) NOT NULL,
+            "description" TEXT,
+            "image_url" VARCHAR(500),
+            "order" INT NOT NULL,
+            "time_limit" INT NOT NULL  DEFAULT 30,
+            "points" INT NOT NULL  DEFAULT 1,
+            "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "quiz_id" UUID NOT NULL REFERENCES "quizzes" ("id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "answers" (
+            "id" UUID NOT NULL  PRIMARY KEY,
+            "text" VARCHAR(500) NOT NULL,
+            "is_correct" BOOL NOT NULL  DEFAULT False,
+            "order" INT NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "question_id" UUID NOT NULL REFERENCES "questions" ("id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "answer_attempts" (
+            "id" UUID NOT NULL  PRIMARY KEY,
+            "status" VARCHAR(12) NOT NULL  DEFAULT 'NOT_ANSWERED',
+            "score" INT NOT NULL  DEFAULT 0,
+            "end_time" TIMESTAMPTZ,
+            "response_time" INT,
+            "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "question_id" UUID NOT NULL REFERENCES "questions" ("id") ON DELETE CASCADE,
+            "quiz_id" UUID NOT NULL REFERENCES "quizzes" ("id") ON DELETE CASCADE,
+            "selected_answer_id" UUID REFERENCES "answers" ("id") ON DELETE CASCADE,
+            "user_id" UUID NOT NULL REFERENCES "users" ("id") ON DELETE CASCADE,
+            CONSTRAINT "uid_answer_atte_user_id_6f88fd" UNIQUE ("user_id", "quiz_id", "question_id")
+        );
+        COMMENT ON COLUMN "answer_attempts"."status" IS 'CORRECT: CORRECT\\nINCORRECT: INCORRECT\\nTIMEOUT: TIMEOUT\\nNOT_ANSWERED: NOT_ANSWERED';
+        CREATE TABLE IF NOT EXISTS "aerich" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "version" VARCHAR(255) NOT NULL,
+            "app" VARCHAR(100) NOT NULL,
+            "content" JSONB NOT NULL
+        );"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "answer_attempts";
+        DROP TABLE IF EXISTS "answers";
+        DROP TABLE IF EXISTS "questions";
+        DROP TABLE IF EXISTS "quizzes";
+        DROP TABLE IF EXISTS "users";"""
@@ -0,0 +1,28 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Quiz epochs: live state and answer attempts belong to one epoch of a quiz, bumped on
+# every reset. Idempotent, for databases generate_schemas already brought up to date.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "quizzes" ADD COLUMN IF NOT EXISTS "epoch" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "answer_attempts" ADD COLUMN IF NOT EXISTS "epoch" INT NOT NULL DEFAULT 0;
+        ALTER TABLE "answer_attempts" DROP CONSTRAINT IF EXISTS "uid_answer_atte_user_id_6f88fd";
+        CREATE UNIQUE INDEX IF NOT EXISTS "uid_answer_atte_user_id_4f8cfa" ON "answer_attempts" ("user_id", "quiz_id", "question_id", "epoch");
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uid_answer_atte_user_id_4f8cfa') THEN
+                ALTER TABLE "answer_attempts" ADD CONSTRAINT "uid_answer_atte_user_id_4f8cfa" UNIQUE USING INDEX "uid_answer_atte_user_id_4f8cfa";
+            END IF;
+        END $$;
+        CREATE INDEX IF NOT EXISTS "idx_answer_atte_quiz_id_918607" ON "answer_attempts" ("quiz_id", "epoch");"""
+
+
+# Fails if a user has attempts at the same question in several epochs; delete the
+# attempts of earlier epochs first.
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_answer_atte_quiz_id_918607";
+        ALTER TABLE "answer_attempts" DROP CONSTRAINT IF EXISTS "uid_answer_atte_user_id_4f8cfa";
+        ALTER TABLE "answer_attempts" ADD CONSTRAINT "uid_answer_atte_user_id_6f88fd" UNIQUE ("user_id", "quiz_id", "question_id");
+        ALTER TABLE "answer_attempts" DROP COLUMN IF EXISTS "epoch";
+        ALTER TABLE "quizzes" DROP COLUMN IF EXISTS "epoch";"""
@@ -0,0 +1,22 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Final quiz results, saved when a quiz ends.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "leaderboards" (
+            "id" UUID NOT NULL  PRIMARY KEY,
+            "quiz_id" UUID NOT NULL,
+            "user_id" UUID NOT NULL,
+            "score" INT NOT NULL  DEFAULT 0,
+            "rank" INT NOT NULL  DEFAULT 0,
+            "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS "idx_leaderboard_quiz_id_547ea3" ON "leaderboards" ("quiz_id", "user_id");
+        CREATE INDEX IF NOT EXISTS "idx_leaderboard_quiz_id_0e3395" ON "leaderboards" ("quiz_id", "score");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "leaderboards";"""
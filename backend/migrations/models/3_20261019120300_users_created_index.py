@@ -0,0 +1,12 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Keyset pagination of the user listing, ordered by (created_at, id).
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_users_created_eeb5e9" ON "users" ("created_at", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_users_created_eeb5e9";"""
@@ -0,0 +1,182 @@
+"""
+Production entry point: one uvicorn worker process per core, sharing a port.
+
+Every worker binds its own listening socket with SO_REUSEPORT and the kernel spreads
+incoming connections across them, so workers share nothing: each has its own event
+loop (uvloop when installed), connection registry, caches and Redis listeners, and
+anything that must reach sockets on other workers goes through Redis pub/sub, as it
+does across machines.
+
+The supervisor restarts workers that die. On SIGTERM or SIGINT it stops restarting,
+forwards SIGTERM to every worker and waits for them: each stops accepting, lets open
+requests finish, runs the app's shutdown handlers (leaving the node ring, stopping
+background tasks) and closes remaining connections after --graceful-timeout.
+
+Workers never create tables (DB_GENERATE_SCHEMAS=false): the schema comes from the
+aerich migrations in migrations/. Apply them with `aerich upgrade` as a deploy step, or
+pass --migrate to apply pending ones once here before any worker starts.
+
+Usage:
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8000] [--migrate]
+
+With QUIZ_ROUTING_ENABLED, every worker is a routing node of its own. Give each one a
+private port to be redirected to with --node-port-base; worker i then also listens
+on node-port-base + i and advertises ws://{--advertise-host}:{port}.
+"""
+import argparse
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+RESTART_DELAY = 1  # seconds between restarts of a crashing worker
+STARTUP_FAILURE = 3  # uvicorn's exit code when the app fails to start; not worth retrying
+
+
+def create_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def migrate(app_dir: str) -> None:
+    """Apply pending migrations, in the supervisor, before any worker starts"""
+    from aerich import Command
+    from tortoise import Tortoise
+    from app.core.config import TORTOISE_ORM
+
+    async def upgrade():
+        # Versions already applied are read from the primary, never a lagging replica
+        command = Command(
+            tortoise_config=dict(TORTOISE_ORM, routers=[]),
+            app="models",
+            location=os.path.join(app_dir, "migrations"),
+        )
+        await command.init()
+        try:
+            return await command.upgrade(run_in_transaction=True)
+        finally:
+            await Tortoise.close_connections()
+
+    applied = asyncio.run(upgrade())
+    print(f"Applied migrations: {', '.join(applied)}" if applied else "No migrations to apply")
+
+
+def run_worker(index: int, args: argparse.Namespace) -> None:
+    """Body of one worker process"""
+    import uvicorn
+
+    sys.path.insert(0, args.app_dir)
+    sockets = [create_socket(args.host, args.port, reuse_port=True)]
+    if args.node_port_base:
+        node_port = args.node_port_base + index
+        sockets.append(create_socket(args.host, node_port, reuse_port=False))
+        os.environ.setdefault("NODE_URL", f"ws://{args.advertise_host}:{node_port}")
+
+    # The schema comes from migrations (aerich upgrade or --migrate); workers start without touching the database
+    os.environ.setdefault("DB_GENERATE_SCHEMAS", "false")
+
+    # Settings are read at import, so the environment above must be in place first
+    from app.core.config import settings
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    config = uvicorn.Config(
+        args.app,
+        loop=loop,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+        ws_ping_interval=settings.WS_PING_INTERVAL / 1000,
+        ws_ping_timeout=settings.WS_PING_TIMEOUT / 1000,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+    print(f"Worker {index} (pid {os.getpid()}) serving on port {args.port} with {loop}")
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--app-dir", default=os.getcwd(), help="directory to import the app from")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--graceful-timeout", type=int, default=10, help="seconds")
+    parser.add_argument("--node-port-base", type=int, default=0)
+    parser.add_argument("--advertise-host", default=socket.gethostname())
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--migrate", action="store_true", help="apply pending database migrations before starting workers")
+    args = parser.parse_args()
+
+    if args.workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        sys.exit("SO_REUSEPORT is not available on this platform, run a single worker")
+
+    sys.path.insert(0, args.app_dir)
+    from app.core.config import settings
+
+    if args.workers > 1 and settings.LEADERBOARD_STORAGE == "memory":
+        # Every worker would keep, score and reset its own copy of each board
+        sys.exit("LEADERBOARD_STORAGE=memory keeps boards in one process, run a single worker")
+
+    if args.migrate:
+        migrate(args.app_dir)
+
+    # Spawned workers start from a clean interpreter, with no event loop or
+    # connections copied from the supervisor
+    context = multiprocessing.get_context("spawn")
+    workers = {}
+    stopping = False
+
+    def start(index: int):
+        process = context.Process(target=run_worker, args=(index, args), name=f"worker-{index}")
+        process.start()
+        workers[index] = process
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(args.workers):
+        start(index)
+    print(f"Supervisor (pid {os.getpid()}) started {args.workers} workers on port {args.port}")
+
+    while not stopping:
+        time.sleep(0.5)
+        for index, process in list(workers.items()):
+            if process.is_alive() or stopping:
+                continue
+            if process.exitcode == STARTUP_FAILURE:
+                print(f"Worker {index} failed to start the app, stopping")
+                stopping = True
+            else:
+                print(f"Worker {index} exited with {process.exitcode}, restarting")
+                time.sleep(RESTART_DELAY)
+                start(index)
+
+    print("Shutting down workers")
+    for process in workers.values():
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+    deadline = time.monotonic() + args.graceful_timeout + 5
+    for process in workers.values():
+        process.join(max(deadline - time.monotonic(), 0))
+        if process.is_alive():
+            print(f"Worker pid {process.pid} did not stop in time, killing it")
+            process.kill()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+#!/bin/bash
+# Let the postgres-replica service stream WAL from this server (runs on first init only)
+echo "host replication all all md5" >> "$PGDATA/pg_hba.conf"
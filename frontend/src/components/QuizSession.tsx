@@ -76,58 +76,95 @@ export default function QuizSession({ username, quizId }: QuizSessionProps) {
   const theme = useTheme()
 
   useEffect(() => {
-    // Connect to WebSocket with username
-    ws.current = new WebSocket(`ws://localhost:8000/ws/quiz/${quizId}?username=${encodeURIComponent(username)}`)
+    // Resume token of this session and the last quiz event seen, to pick up
+    // where we left off after a dropped connection
+    let resumeToken: string | null = null
+    let lastSeq = 0
+    let closed = false
 
-    ws.current.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data)
-        if (data.type === 'leaderboard_update') {
-          setLeaderboard(data.data)
-          // Update user's score and rank
-          const userEntry = data.data.find((entry: LeaderboardEntry) => entry.username === username)
-          if (userEntry) {
-            setUserScore(userEntry.score)
-            setUserRank(userEntry.rank)
+    const connect = (baseUrl: string, routed: boolean) => {
+      // Connect to WebSocket with username
+      const resume = resumeToken ? `&resume=${encodeURIComponent(resumeToken)}&last_seq=${lastSeq}` : ''
+      const socket = new WebSocket(
+        `${baseUrl}/ws/quiz/${quizId}?username=${encodeURIComponent(username)}${routed ? '&routed=1' : ''}${resume}`
+      )
+      ws.current = socket
+
+      socket.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data)
+          if (typeof data.seq === 'number') {
+            // Skip events already seen before a resume
+            if (data.seq <= lastSeq) return
+            lastSeq = data.seq
           }
-        } else if (data.type === 'question') {
-          setCurrentQuestion(data.data)
-          setTimeLeft(data.data.time_limit)
-          setSelectedAnswer('')
-        } else if (data.type === 'answer_result') {
-          // Show notification for answer result
-          setNotification({
-            message: data.data.message,
-            type: data.data.correct ? 'success' : 'error',
-            duration: 2000  // Reduced duration to make it less intrusive
-          })
-          
-          // Move to next question after a short delay
-          setTimeout(() => {
-            if (ws.current && ws.current.readyState === WebSocket.OPEN) {
-              ws.current.send(JSON.stringify({
-                type: 'request_next_question'
-              }))
+          if (data.type === 'session') {
+            resumeToken = data.data.resume_token
+          } else if (data.type === 'redirect') {
+            // The quiz is served by another node, reconnect there
+            ws.current?.close()
+            connect(data.data.url, true)
+          } else if (data.type === 'ping') {
+            // Answer the server's heartbeat so the connection is not reaped
+            ws.current?.send(JSON.stringify({ type: 'pong' }))
+          } else if (data.type === 'leaderboard_update') {
+            setLeaderboard(data.data)
+            // Update user's score and rank
+            const userEntry = data.data.find((entry: LeaderboardEntry) => entry.username === username)
+            if (userEntry) {
+              setUserScore(userEntry.score)
+              setUserRank(userEntry.rank)
             }
-          }, 1000)  // Wait 1 second before requesting next question
-        } else if (data.type === 'quiz_complete') {
-          setIsQuizComplete(true)
-          setNotification({
-            message: data.data.message,
-            type: 'info',
-            duration: 5000
-          })
+          } else if (data.type === 'question') {
+            setCurrentQuestion(data.data)
+            setTimeLeft(data.data.time_limit)
+            setSelectedAnswer('')
+          } else if (data.type === 'answer_result') {
+            // Show notification for answer result
+            setNotification({
+              message: data.data.message,
+              type: data.data.correct ? 'success' : 'error',
+              duration: 2000  // Reduced duration to make it less intrusive
+            })
+          
+            // Move to next question after a short delay
+            setTimeout(() => {
+              if (ws.current && ws.current.readyState === WebSocket.OPEN) {
+                ws.current.send(JSON.stringify({
+                  type: 'request_next_question'
+                }))
+              }
+            }, 1000)  // Wait 1 second before requesting next question
+          } else if (data.type === 'quiz_complete') {
+            setIsQuizComplete(true)
+            setNotification({
+              message: data.data.message,
+              type: 'info',
+              duration: 5000
+            })
+          }
+        } catch (err) {
+          console.error('Error parsing WebSocket message:', err)
         }
-      } catch (err) {
-        console.error('Error parsing WebSocket message:', err)
       }
-    }
 
-    ws.current.onerror = () => {
-      setError('Failed to connect to the server')
+      socket.onerror = () => {
+        setError('Failed to connect to the server')
+      }
+
+      socket.onclose = () => {
+        // Resume a dropped session, unless we were redirected or are leaving
+        if (closed || socket !== ws.current || !resumeToken) return
+        setTimeout(() => {
+          if (!closed) connect(baseUrl, true)
+        }, 1000)
+      }
     }
 
+    connect('ws://localhost:8000', false)
+
     return () => {
+      closed = true
       if (ws.current && ws.current.readyState === WebSocket.OPEN) {
         ws.current.close()
       }
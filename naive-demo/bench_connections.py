@@ -0,0 +1,74 @@
+# bench_connections.py - Memory and lookup cost of the ConnectionManager registry
+#
+# Usage: python bench_connections.py [connections] [sessions]
+import logging
+import sys
+import time
+import tracemalloc
+
+from main import ConnectionManager, session_participants
+
+
+class FakeWebSocket:
+    """Stands in for a WebSocket; its own size is reported separately"""
+    __slots__ = ()
+
+
+def linear_lookup(user_connections, connection_id):
+    """How the manager used to find a connection's user"""
+    for uid, cid in user_connections.items():
+        if cid == connection_id:
+            return uid
+    return None
+
+
+def main():
+    logging.getLogger("main").setLevel(logging.WARNING)
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    websockets = [FakeWebSocket() for _ in range(connections)]
+    connection_ids = [f"conn-{i:08d}" for i in range(connections)]
+    user_ids = [f"user-{i:08d}" for i in range(connections)]
+    session_ids = [f"session-{i % sessions}" for i in range(connections)]
+
+    manager = ConnectionManager()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for websocket, connection_id, user_id, session_id in zip(websockets, connection_ids, user_ids, session_ids):
+        manager.register(websocket, connection_id)
+        manager.map_user(user_id, connection_id, session_id)
+    connect_time = time.perf_counter() - started
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for connection_id in connection_ids:
+        manager.get_user_id(connection_id)
+    indexed_time = time.perf_counter() - started
+
+    sample = connection_ids[:: max(connections // 200, 1)]
+    started = time.perf_counter()
+    for connection_id in sample:
+        linear_lookup(manager.user_connections, connection_id)
+    linear_time = (time.perf_counter() - started) / len(sample) * connections
+
+    started = time.perf_counter()
+    for connection_id in connection_ids:
+        manager.disconnect(connection_id)
+    disconnect_time = time.perf_counter() - started
+
+    print(f"{connections} connections across {sessions} sessions")
+    print(f"  registry memory:     {(after - before) / 1024 / 1024:8.2f} MiB  "
+          f"({(after - before) / connections:.0f} B/connection, peak {(peak - before) / 1024 / 1024:.2f} MiB)")
+    print(f"  connect + join:      {connect_time * 1000:8.2f} ms")
+    print(f"  lookup (indexed):    {indexed_time * 1000:8.2f} ms for all connections")
+    print(f"  lookup (linear scan):{linear_time * 1000:8.2f} ms for all connections (extrapolated)")
+    print(f"  disconnect:          {disconnect_time * 1000:8.2f} ms")
+    print(f"  left over: {len(manager.active_connections)} connections, "
+          f"{len(manager.user_connections)} users, {sum(map(len, session_participants.values()))} members")
+
+
+if __name__ == "__main__":
+    main()
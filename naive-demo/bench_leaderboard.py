@@ -0,0 +1,56 @@
+# bench_leaderboard.py - In-memory leaderboard: RankedIndex vs sorting on every call
+#
+# Each operation is what one score update costs the demo without Redis:
+# update the score, read the user's rank, then read the top 20.
+#
+# Usage: python bench_leaderboard.py [users ...]
+import itertools
+import random
+import sys
+import time
+
+from ranked_index import RankedIndex
+
+TOP = 20
+
+
+def sort_per_call(users: int, updates):
+    """The previous fallback: a dict of scores, sorted for every read"""
+    scores = {f"user-{i}": 0 for i in range(users)}
+    started = time.perf_counter()
+    for user_id, points in updates:
+        scores[user_id] += points
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        next(index for index, (uid, _) in enumerate(ranked) if uid == user_id)
+        sorted(scores.items(), key=lambda x: x[1], reverse=True)[:TOP]
+    return time.perf_counter() - started
+
+
+def ranked_index(users: int, updates):
+    index = RankedIndex()
+    sequence = itertools.count()
+    for i in range(users):
+        index.set(f"user-{i}", (0, next(sequence)))
+    started = time.perf_counter()
+    for user_id, points in updates:
+        score = -index.key_of(user_id)[0] + points
+        index.set(user_id, (-score, next(sequence)))
+        index.rank(user_id)
+        index.slice(0, TOP)
+    return time.perf_counter() - started
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    random.seed(42)
+    print(f"{'users':>10} {'sort per call':>16} {'RankedIndex':>14} {'speedup':>9}")
+    for users in sizes:
+        updates = [(f"user-{random.randrange(users)}", random.choice((5, 10, 20))) for _ in range(2_000)]
+        # Sorting is O(n log n) per call, so time a sample and report per operation
+        naive = sort_per_call(users, updates[:max(20, 200_000 // users)]) / max(20, 200_000 // users)
+        indexed = ranked_index(users, updates) / len(updates)
+        print(f"{users:>10} {naive * 1e6:>13.1f} us {indexed * 1e6:>11.1f} us {naive / indexed:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 # main.py - FastAPI Real-Time Leaderboard Server
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Union
 import redis.asyncio as redis
 import json
 import asyncio
@@ -11,6 +11,9 @@ import logging
 from datetime import datetime
 import uuid
 import os
+import itertools
+
+from ranked_index import RankedIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -75,66 +78,156 @@ demo_users = {
 }
 
 # Global variables
-connected_clients: Dict[str, WebSocket] = {}
-user_sessions: Dict[str, str] = {}  # websocket_id -> user_id
-session_participants: Dict[str, Set[str]] = {"DEMO123": set()}
+DEMO_SESSION_ID = "DEMO123"
+session_participants: Dict[str, Set[str]] = {DEMO_SESSION_ID: set()}  # session_id -> user_ids
 
 # Redis connection with fallback to in-memory
 redis_client: Optional[redis.Redis] = None
-in_memory_leaderboard: Dict[str, Dict[str, int]] = {}
+# session_id -> user_id ranked by (-score, update order): best first, earlier score wins ties
+in_memory_leaderboard: Dict[str, RankedIndex] = {}
+score_updates = itertools.count()
+
+class ConnectionRecord:
+    """One open WebSocket and the user / session it joined, if any"""
+    __slots__ = ("connection_id", "websocket", "user_id", "session_id")
+
+    def __init__(self, connection_id: str, websocket: WebSocket):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.user_id: Optional[str] = None
+        self.session_id: Optional[str] = None
 
 class ConnectionManager:
+    """
+    Indexed registry of WebSocket connections.
+
+    Connections, users and sessions point at each other through dicts, so connect,
+    join, disconnect and user/connection lookups are all O(1), and a broadcast only
+    touches the members of its own session.
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.active_connections: Dict[str, ConnectionRecord] = {}  # connection_id -> record
         self.user_connections: Dict[str, str] = {}  # user_id -> connection_id
+        self.sessions = session_participants  # session_id -> user_ids
+        # Called with a session_id whenever its members change
+        self.on_membership_change: Optional[Callable[[str], None]] = None
 
     async def connect(self, websocket: WebSocket, connection_id: str):
         await websocket.accept()
-        self.active_connections[connection_id] = websocket
+        self.register(websocket, connection_id)
         logger.info(f"🔌 New connection: {connection_id}")
 
-    def disconnect(self, connection_id: str):
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
-        
-        # Remove user mapping
-        user_id = None
-        for uid, cid in self.user_connections.items():
-            if cid == connection_id:
-                user_id = uid
-                break
-        
-        if user_id:
-            del self.user_connections[user_id]
-            session_participants["DEMO123"].discard(user_id)
-            logger.info(f"👋 User {user_id} disconnected")
-
-    def map_user(self, user_id: str, connection_id: str):
+    def register(self, websocket: WebSocket, connection_id: str) -> ConnectionRecord:
+        record = ConnectionRecord(connection_id, websocket)
+        self.active_connections[connection_id] = record
+        return record
+
+    def get_record(self, connection_id: str) -> Optional[ConnectionRecord]:
+        return self.active_connections.get(connection_id)
+
+    def get_user_id(self, connection_id: str) -> Optional[str]:
+        record = self.active_connections.get(connection_id)
+        return record.user_id if record else None
+
+    def get_connection_id(self, user_id: str) -> Optional[str]:
+        return self.user_connections.get(user_id)
+
+    def _unmap(self, record: ConnectionRecord):
+        """Drop a record's user and session membership"""
+        user_id = record.user_id
+        # A user who reconnected elsewhere now belongs to the newer connection
+        if user_id is None or self.user_connections.get(user_id) != record.connection_id:
+            return
+        del self.user_connections[user_id]
+        members = self.sessions.get(record.session_id)
+        if members is not None:
+            members.discard(user_id)
+            if not members and record.session_id != DEMO_SESSION_ID:
+                del self.sessions[record.session_id]
+        if self.on_membership_change:
+            self.on_membership_change(record.session_id)
+
+    def disconnect(self, connection_id: str) -> Optional[ConnectionRecord]:
+        """Forget a connection, returning its record so callers can notify its session"""
+        record = self.active_connections.pop(connection_id, None)
+        if record is None:
+            return None
+        self._unmap(record)
+        if record.user_id:
+            logger.info(f"👋 User {record.user_id} disconnected")
+        return record
+
+    def map_user(self, user_id: str, connection_id: str, session_id: str = DEMO_SESSION_ID):
+        record = self.active_connections.get(connection_id)
+        if record is None:
+            return
+        self._unmap(record)
+        previous_id = self.user_connections.get(user_id)
+        if previous_id is not None and previous_id != connection_id:
+            # Same user joined from another tab: the old connection stops representing them
+            previous = self.active_connections[previous_id]
+            self._unmap(previous)
+            previous.user_id = previous.session_id = None
+        record.user_id = user_id
+        record.session_id = session_id
         self.user_connections[user_id] = connection_id
-        session_participants["DEMO123"].add(user_id)
+        self.sessions.setdefault(session_id, set()).add(user_id)
+        if self.on_membership_change:
+            self.on_membership_change(session_id)
 
-    async def send_personal_message(self, message: dict, connection_id: str):
-        if connection_id in self.active_connections:
+    def session_size(self, session_id: str) -> int:
+        return len(self.sessions.get(session_id, ()))
+
+    async def send_personal_message(self, message: Union[dict, str], connection_id: str):
+        record = self.active_connections.get(connection_id)
+        if record:
             try:
-                await self.active_connections[connection_id].send_text(json.dumps(message))
+                await record.websocket.send_text(message if isinstance(message, str) else json.dumps(message))
             except Exception as e:
                 logger.error(f"Error sending message to {connection_id}: {e}")
 
-    async def broadcast_to_session(self, message: dict, session_id: str = "DEMO123"):
-        """Broadcast message to all users in a session"""
-        for user_id in session_participants.get(session_id, set()):
-            connection_id = self.user_connections.get(user_id)
-            if connection_id and connection_id in self.active_connections:
+    async def broadcast_to_session(self, message: Union[dict, str], session_id: str = DEMO_SESSION_ID):
+        """Broadcast message (a dict, or already encoded JSON) to all users in a session"""
+        text = message if isinstance(message, str) else json.dumps(message)
+        for user_id in list(self.sessions.get(session_id, ())):
+            record = self.active_connections.get(self.user_connections.get(user_id))
+            if record:
                 try:
-                    await self.active_connections[connection_id].send_text(json.dumps(message))
+                    await record.websocket.send_text(text)
                 except Exception as e:
                     logger.error(f"Error broadcasting to {user_id}: {e}")
 
 manager = ConnectionManager()
 
+class LeaderboardSnapshot:
+    """A rendered leaderboard, JSON-encoded once and shared until the next change"""
+    __slots__ = ("version", "entries", "encoded")
+
+    def __init__(self, version: int, entries: Optional[List[dict]]):
+        self.version = version
+        self.entries = entries or []
+        self.encoded = json.dumps(self.entries)
+
+    def message(self, **data) -> str:
+        """Encoded leaderboard-update message; only the extra fields are encoded per call"""
+        extra = "".join(f", {json.dumps(key)}: {json.dumps(value)}" for key, value in data.items())
+        return f'{{"type": "leaderboard-update", "data": {{"leaderboard": {self.encoded}{extra}}}}}'
+
 class LeaderboardService:
+    """
+    Scores per session in Redis (or in memory), plus a cached rendered snapshot.
+
+    Every change that affects the rendered board (scores, resets, who is connected)
+    bumps the session's version. Until the next bump, REST reads, join messages and
+    broadcasts all reuse the same encoded snapshot for a given limit. Versions live in
+    this process, which is the only writer in the demo.
+    """
+
     def __init__(self):
         self.session_key = lambda session_id: f"leaderboard:{session_id}"
+        self.versions: Dict[str, int] = {}  # session_id -> leaderboard version
+        self.snapshots: Dict[str, Dict[int, LeaderboardSnapshot]] = {}  # session_id -> limit -> snapshot
 
     async def update_score(self, session_id: str, user_id: str, score: int) -> bool:
         """Update user score in leaderboard"""
@@ -145,8 +238,9 @@ class LeaderboardService:
             else:
                 # Fallback to in-memory storage
                 if session_id not in in_memory_leaderboard:
-                    in_memory_leaderboard[session_id] = {}
-                in_memory_leaderboard[session_id][user_id] = score
+                    in_memory_leaderboard[session_id] = RankedIndex()
+                in_memory_leaderboard[session_id].set(user_id, (-score, next(score_updates)))
+            self.bump_version(session_id)
             
             logger.info(f"📊 Score updated: {user_id} = {score} points in {session_id}")
             return True
@@ -154,8 +248,28 @@ class LeaderboardService:
             logger.error(f"Error updating score: {e}")
             return False
 
-    async def get_leaderboard(self, session_id: str, limit: int = 20) -> List[LeaderboardEntry]:
-        """Get current leaderboard with user details"""
+    def bump_version(self, session_id: str) -> int:
+        """Mark a session's leaderboard as changed, dropping its cached snapshots"""
+        self.versions[session_id] = self.versions.get(session_id, 0) + 1
+        self.snapshots.pop(session_id, None)
+        return self.versions[session_id]
+
+    async def get_snapshot(self, session_id: str, limit: int = 20) -> LeaderboardSnapshot:
+        """Get the current leaderboard, rendered and encoded at most once per version"""
+        version = self.versions.get(session_id, 0)
+        cached = self.snapshots.get(session_id, {}).get(limit)
+        if cached is not None and cached.version == version:
+            return cached
+
+        entries = await self.render_leaderboard(session_id, limit)
+        snapshot = LeaderboardSnapshot(version, entries)
+        # Only cache if nothing changed while rendering
+        if entries is not None and self.versions.get(session_id, 0) == version:
+            self.snapshots.setdefault(session_id, {})[limit] = snapshot
+        return snapshot
+
+    async def render_leaderboard(self, session_id: str, limit: int = 20) -> Optional[List[dict]]:
+        """Get current leaderboard with user details, or None on error"""
         try:
             results = []
             
@@ -171,38 +285,31 @@ class LeaderboardService:
                     results.append({"userId": user_id, "score": int(score)})
             else:
                 # Fallback to in-memory storage
-                session_data = in_memory_leaderboard.get(session_id, {})
+                session_data = in_memory_leaderboard.get(session_id, RankedIndex())
                 results = [
-                    {"userId": user_id, "score": score}
-                    for user_id, score in sorted(session_data.items(), key=lambda x: x[1], reverse=True)
-                ][:limit]
+                    {"userId": user_id, "score": -key[0]}
+                    for user_id, key in session_data.slice(0, limit)
+                ]
             
-            # Add user details and ranking
+            # Add user details and ranking, as plain dicts shaped like LeaderboardEntry
+            connected = session_participants.get(session_id, set())
             leaderboard = []
             for index, item in enumerate(results):
                 user = demo_users.get(item["userId"])
-                if not user:
-                    user = User(
-                        id=item["userId"],
-                        username=f"User {item['userId']}",
-                        avatar="👤",
-                        color="#666666"
-                    )
-                
-                leaderboard.append(LeaderboardEntry(
-                    rank=index + 1,
-                    userId=item["userId"],
-                    username=user.username,
-                    avatar=user.avatar,
-                    color=user.color,
-                    score=item["score"],
-                    isConnected=item["userId"] in session_participants.get(session_id, set())
-                ))
+                leaderboard.append({
+                    "rank": index + 1,
+                    "userId": item["userId"],
+                    "username": user.username if user else f"User {item['userId']}",
+                    "avatar": user.avatar if user else "👤",
+                    "color": user.color if user else "#666666",
+                    "score": item["score"],
+                    "isConnected": item["userId"] in connected
+                })
             
             return leaderboard
         except Exception as e:
             logger.error(f"Error getting leaderboard: {e}")
-            return []
+            return None
 
     async def get_user_rank(self, session_id: str, user_id: str) -> UserRank:
         """Get user's current rank and score"""
@@ -216,15 +323,11 @@ class LeaderboardService:
                 score = int(redis_score) if redis_score else 0
                 rank = redis_rank + 1 if redis_rank is not None else None
             else:
-                session_data = in_memory_leaderboard.get(session_id, {})
-                score = session_data.get(user_id, 0)
-                
-                # Calculate rank from in-memory data
-                sorted_users = sorted(session_data.items(), key=lambda x: x[1], reverse=True)
-                for index, (uid, _) in enumerate(sorted_users):
-                    if uid == user_id:
-                        rank = index + 1
-                        break
+                session_data = in_memory_leaderboard.get(session_id, RankedIndex())
+                key = session_data.key_of(user_id)
+                if key is not None:
+                    score = -key[0]
+                    rank = session_data.rank(user_id) + 1
             
             return UserRank(userId=user_id, score=score, rank=rank)
         except Exception as e:
@@ -233,6 +336,8 @@ class LeaderboardService:
 
 # Initialize services
 leaderboard_service = LeaderboardService()
+# isConnected is part of the rendered board, so joins and leaves change it too
+manager.on_membership_change = leaderboard_service.bump_version
 
 async def init_redis():
     """Initialize Redis connection with fallback"""
@@ -280,29 +385,23 @@ async def websocket_endpoint(websocket: WebSocket):
                 }, connection_id)
                 
     except WebSocketDisconnect:
-        manager.disconnect(connection_id)
+        record = manager.disconnect(connection_id)
         
         # Notify other users about disconnect
-        user_id = None
-        for uid, cid in manager.user_connections.items():
-            if cid == connection_id:
-                user_id = uid
-                break
-        
-        if user_id and user_id in demo_users:
+        if record and record.user_id in demo_users:
             await manager.broadcast_to_session({
                 "type": "participant-left",
                 "data": {
-                    "userId": user_id,
-                    "username": demo_users[user_id].username,
-                    "totalParticipants": len(session_participants["DEMO123"])
+                    "userId": record.user_id,
+                    "username": demo_users[record.user_id].username,
+                    "totalParticipants": manager.session_size(record.session_id)
                 }
-            })
+            }, record.session_id)
 
 async def handle_join_demo(connection_id: str, data: dict):
     """Handle user joining demo"""
     user_id = data.get("userId")
-    session_id = data.get("sessionId", "DEMO123")
+    session_id = data.get("sessionId") or DEMO_SESSION_ID
     
     if user_id not in demo_users:
         await manager.send_personal_message({
@@ -312,24 +411,18 @@ async def handle_join_demo(connection_id: str, data: dict):
         return
     
     # Map user to connection
-    manager.map_user(user_id, connection_id)
+    manager.map_user(user_id, connection_id, session_id)
     
     logger.info(f"👥 {user_id} joined leaderboard demo")
     
     # Send current leaderboard
-    leaderboard = await leaderboard_service.get_leaderboard(session_id)
-    await manager.send_personal_message({
-        "type": "leaderboard-update",
-        "data": {
-            "leaderboard": [entry.dict() for entry in leaderboard],
-            "sessionInfo": {
-                "id": session_id,
-                "title": "English Grammar Challenge",
-                "status": "active",
-                "participants": len(session_participants[session_id])
-            }
-        }
-    }, connection_id)
+    snapshot = await leaderboard_service.get_snapshot(session_id)
+    await manager.send_personal_message(snapshot.message(sessionInfo={
+        "id": session_id,
+        "title": "English Grammar Challenge",
+        "status": "active",
+        "participants": manager.session_size(session_id)
+    }), connection_id)
     
     # Send user's current rank
     user_rank = await leaderboard_service.get_user_rank(session_id, user_id)
@@ -345,29 +438,25 @@ async def handle_join_demo(connection_id: str, data: dict):
             "userId": user_id,
             "username": demo_users[user_id].username,
             "avatar": demo_users[user_id].avatar,
-            "totalParticipants": len(session_participants[session_id])
+            "totalParticipants": manager.session_size(session_id)
         }
-    })
+    }, session_id)
 
 async def handle_update_score(connection_id: str, data: dict):
     """Handle score update"""
     points = data.get("points", 0)
     
-    # Find user_id from connection
-    user_id = None
-    for uid, cid in manager.user_connections.items():
-        if cid == connection_id:
-            user_id = uid
-            break
+    record = manager.get_record(connection_id)
     
-    if not user_id:
+    if not record or not record.user_id:
         await manager.send_personal_message({
             "type": "error",
             "data": {"message": "Not connected to demo session"}
         }, connection_id)
         return
     
-    session_id = "DEMO123"
+    user_id = record.user_id
+    session_id = record.session_id
     
     # Get current score and add points
     current_rank = await leaderboard_service.get_user_rank(session_id, user_id)
@@ -377,23 +466,17 @@ async def handle_update_score(connection_id: str, data: dict):
     await leaderboard_service.update_score(session_id, user_id, new_score)
     
     # Get updated leaderboard and broadcast to all users
-    updated_leaderboard = await leaderboard_service.get_leaderboard(session_id)
+    snapshot = await leaderboard_service.get_snapshot(session_id)
     updated_user_rank = await leaderboard_service.get_user_rank(session_id, user_id)
     
-    await manager.broadcast_to_session({
-        "type": "leaderboard-update",
-        "data": {
-            "leaderboard": [entry.dict() for entry in updated_leaderboard],
-            "lastUpdate": {
-                "userId": user_id,
-                "username": demo_users[user_id].username,
-                "pointsEarned": points,
-                "newScore": new_score,
-                "oldRank": current_rank.rank,
-                "newRank": updated_user_rank.rank
-            }
-        }
-    })
+    await manager.broadcast_to_session(snapshot.message(lastUpdate={
+        "userId": user_id,
+        "username": demo_users[user_id].username,
+        "pointsEarned": points,
+        "newScore": new_score,
+        "oldRank": current_rank.rank,
+        "newRank": updated_user_rank.rank
+    }), session_id)
     
     # Send updated rank to user
     await manager.send_personal_message({
@@ -438,29 +521,30 @@ async def get_demo_info():
         ],
         "availableUsers": [user.dict() for user in demo_users.values()],
         "activeSessions": {
-            "DEMO123": {
-                "id": "DEMO123",
+            session_id: {
+                "id": session_id,
                 "title": "English Grammar Challenge",
                 "status": "active",
-                "participants": len(session_participants["DEMO123"])
+                "participants": len(members)
             }
+            for session_id, members in session_participants.items()
         }
     }
 
 @app.get("/api/leaderboard/{session_id}")
-async def get_leaderboard(session_id: str, limit: int = 20):
-    """Get current leaderboard"""
-    leaderboard = await leaderboard_service.get_leaderboard(session_id, limit)
-    return {
-        "sessionId": session_id,
-        "leaderboard": [entry.dict() for entry in leaderboard],
-        "timestamp": datetime.now().isoformat()
-    }
+async def get_leaderboard(session_id: str, limit: int = Query(20, ge=1, le=100)):
+    """Get current leaderboard; `limit` is bounded since a snapshot is cached per limit"""
+    snapshot = await leaderboard_service.get_snapshot(session_id, limit)
+    # Splice the cached encoded board into the response instead of re-serializing it
+    return Response(
+        content=f'{{"sessionId": {json.dumps(session_id)}, "version": {snapshot.version}, '
+                f'"leaderboard": {snapshot.encoded}, "timestamp": "{datetime.now().isoformat()}"}}',
+        media_type="application/json"
+    )
 
 @app.post("/api/demo/populate")
-async def populate_demo():
+async def populate_demo(session_id: str = DEMO_SESSION_ID):
     """Populate demo data"""
-    session_id = "DEMO123"
     
     # Sample data for demo
     sample_data = [
@@ -475,53 +559,41 @@ async def populate_demo():
     for data in sample_data:
         await leaderboard_service.update_score(session_id, data["userId"], data["score"])
     
-    leaderboard = await leaderboard_service.get_leaderboard(session_id)
+    snapshot = await leaderboard_service.get_snapshot(session_id)
     
     # Broadcast update to all connected clients
-    await manager.broadcast_to_session({
-        "type": "leaderboard-update",
-        "data": {
-            "leaderboard": [entry.dict() for entry in leaderboard],
-            "lastUpdate": {
-                "type": "demo_data_populated",
-                "message": "Demo data populated!"
-            }
-        }
-    })
+    await manager.broadcast_to_session(snapshot.message(lastUpdate={
+        "type": "demo_data_populated",
+        "message": "Demo data populated!"
+    }), session_id)
     
     return {
         "message": "Demo data populated successfully",
-        "leaderboard": [entry.dict() for entry in leaderboard]
+        "leaderboard": snapshot.entries
     }
 
 @app.post("/api/demo/reset")
-async def reset_demo():
+async def reset_demo(session_id: str = DEMO_SESSION_ID):
     """Reset leaderboard"""
-    session_id = "DEMO123"
     
     try:
         if redis_client:
             await redis_client.delete(f"leaderboard:{session_id}")
         else:
-            in_memory_leaderboard[session_id] = {}
+            in_memory_leaderboard[session_id] = RankedIndex()
+        leaderboard_service.bump_version(session_id)
         
-        leaderboard = await leaderboard_service.get_leaderboard(session_id)
+        snapshot = await leaderboard_service.get_snapshot(session_id)
         
         # Broadcast reset to all connected clients
-        await manager.broadcast_to_session({
-            "type": "leaderboard-update",
-            "data": {
-                "leaderboard": [entry.dict() for entry in leaderboard],
-                "lastUpdate": {
-                    "type": "leaderboard_reset",
-                    "message": "Leaderboard reset!"
-                }
-            }
-        })
+        await manager.broadcast_to_session(snapshot.message(lastUpdate={
+            "type": "leaderboard_reset",
+            "message": "Leaderboard reset!"
+        }), session_id)
         
         return {
             "message": "Leaderboard reset successfully",
-            "leaderboard": [entry.dict() for entry in leaderboard]
+            "leaderboard": snapshot.entries
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to reset leaderboard")
@@ -533,7 +605,7 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "storage": "Redis" if redis_client else "In-Memory",
-        "connectedUsers": len(session_participants["DEMO123"]),
+        "connectedUsers": len(manager.user_connections),
         "activeConnections": len(manager.active_connections)
     }
 